@@ -1,31 +1,270 @@
-from pydantic_ai import Agent
-from config.llm import companion_llm
-from tools.date_time import get_date, get_time
+from pydantic_ai import Agent, BinaryContent, RunContext
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+from config.llm import companion_llm, companion_image_profile
+from config.settings import (
+    COMPANION_TIME_TOOLS,
+    CRISIS_DETECTOR_ENABLED,
+    DEFAULT_TIMEZONE,
+    RETRIEVAL_ENABLED,
+    USER_PROFILE_ENABLED,
+)
+from tools import date_time
+from tools.date_time import current_time_context
 from pydantic import BaseModel,Field
 from prompts.companion.companion import companion_prompt
 from states.system_state import SystemState
 from pydantic_ai.usage import UsageLimits
 from .history import CompanionAgentHistory
-from typing import Dict, Any
-from utils.file_input import file_to_prompt_parts
+from .crisis import detect_crisis, crisis_response, resolve_country
+from storage.redis.user_profile import UserProfileCache
+from storage.conversation_index import retrieve_past_sessions
+from storage.redis.admission import Admission, AdmissionControl
+from typing import Dict, Any, List
+from dataclasses import dataclass, replace
+from utils.file_input import attachment_placeholder, file_to_prompt_parts
+from utils import metrics
+from utils.tracing import record_usage
 import logging
 
 class OutputModel(BaseModel):
     response: str = Field(..., description="The response from the agent")
     confidence: int = Field(..., description="The confidence level for the response with understanding user's input out of 5.")
 
+@dataclass
+class CompanionDeps:
+    companion_name: str = ""
+    companion_gender: str = ""
+    timezone: str = ""
+    user_profile: str = ""
+    past_sessions: str = ""
+
+THROTTLED_RESPONSE = "I'm getting a lot of messages right now. Give me a few seconds and send that again?"
+
+# Date/time is injected as system prompt context; the tools are only an opt-in fallback
+TIME_TOOL_NAMES = {"get_date", "get_time"}
+
+def get_date(ctx: RunContext[CompanionDeps]) -> str:
+    """
+    Get the current date in the user's timezone.
+
+    Returns:
+        str: Current date in format 'DD-MM-YYYY'
+    """
+    return date_time.get_date(ctx.deps.timezone)
+
+def get_time(ctx: RunContext[CompanionDeps]) -> str:
+    """
+    Get the current time in the user's timezone.
+
+    Returns:
+        str: Current time in format 'HH:MM AM/PM'
+    """
+    return date_time.get_time(ctx.deps.timezone)
+
 agent = Agent(
     companion_llm,
     system_prompt=companion_prompt,
+    deps_type=CompanionDeps,
     retries=5,
     output_retries=5,
-    tools=[
-        get_date,
-        get_time,
-    ],
-    output_type=OutputModel
+    tools=[get_date, get_time] if COMPANION_TIME_TOOLS else [],
+    output_type=OutputModel,
+    defer_model_check=True,
 )
 
+@agent.system_prompt(dynamic=True)
+def companion_persona(ctx: RunContext[CompanionDeps]) -> str:
+    """Persona details, re-evaluated on every run so replayed history stays current."""
+    return f"companion_name: {ctx.deps.companion_name}\ncompanion_gender: {ctx.deps.companion_gender}"
+
+@agent.system_prompt(dynamic=True)
+def companion_memory(ctx: RunContext[CompanionDeps]) -> str:
+    """
+    The user's long-term profile and relevant past sessions.
+
+    Re-evaluated on every run and saved empty (see without_system_prompt), so the
+    conversation analyzer never reads it back as something the user said.
+    """
+    return "\n\n".join(section for section in (ctx.deps.user_profile, ctx.deps.past_sessions) if section)
+
+@agent.system_prompt(dynamic=True)
+def companion_time_context(ctx: RunContext[CompanionDeps]) -> str:
+    """Current date and time in the user's timezone, saving a get_date/get_time round trip."""
+    return current_time_context(ctx.deps.timezone)
+
+DYNAMIC_PROMPTS = (companion_persona, companion_memory, companion_time_context)
+
+def with_system_prompt(messages: List[ModelMessage]) -> List[ModelMessage]:
+    """
+    Restore the static companion system prompt at the head of a stored history.
+
+    pydantic-ai only adds system prompts when the history is empty, while the
+    stored history omits the static prompt to keep Redis payloads small.
+    """
+    if not messages:
+        return messages
+    first = messages[0]
+    first_parts = first.parts if isinstance(first, ModelRequest) else []
+    if any(isinstance(p, SystemPromptPart) and not p.dynamic_ref for p in first_parts):
+        return messages
+    system_parts = [SystemPromptPart(companion_prompt)]
+    present = {p.dynamic_ref for p in first_parts if isinstance(p, SystemPromptPart) and p.dynamic_ref}
+    # Older histories lack some dynamic parts; pydantic-ai only re-evaluates parts that exist
+    system_parts.extend(
+        SystemPromptPart("", dynamic_ref=prompt.__qualname__)
+        for prompt in DYNAMIC_PROMPTS
+        if prompt.__qualname__ not in present
+    )
+    if isinstance(first, ModelRequest):
+        return [replace(first, parts=[*system_parts, *first_parts]), *messages[1:]]
+    return [ModelRequest(parts=system_parts), *messages]
+
+def without_system_prompt(messages: List[ModelMessage]) -> List[ModelMessage]:
+    """
+    Drop the static system prompt before saving and empty the memory part.
+
+    Persona and time parts are kept. The profile and past sessions are re-evaluated
+    on every run anyway; saving them would feed them back into the analyzer's
+    transcript and, from there, into the next profile and index entries.
+    """
+    if not messages or not isinstance(messages[0], ModelRequest):
+        return messages
+    first = messages[0]
+    parts = [
+        replace(p, content="")
+        if isinstance(p, SystemPromptPart) and p.dynamic_ref == companion_memory.__qualname__
+        else p
+        for p in first.parts
+        if not (isinstance(p, SystemPromptPart) and not p.dynamic_ref)
+    ]
+    return [replace(first, parts=parts), *messages[1:]]
+
+def without_attachment_bytes(messages: List[ModelMessage]) -> List[ModelMessage]:
+    """Replace binary attachments in user prompts with a short placeholder before saving."""
+    stripped = []
+    for message in messages:
+        if isinstance(message, ModelRequest) and any(
+            isinstance(p, UserPromptPart) and not isinstance(p.content, str) for p in message.parts
+        ):
+            message = replace(message, parts=[
+                replace(p, content=[
+                    attachment_placeholder(item) if isinstance(item, BinaryContent) else item
+                    for item in p.content
+                ])
+                if isinstance(p, UserPromptPart) and not isinstance(p.content, str) else p
+                for p in message.parts
+            ])
+        stripped.append(message)
+    return stripped
+
+async def prefetch_turn_context(state: SystemState) -> Dict[str, Any]:
+    """
+    Run the independent pre-LLM steps of a companion turn concurrently.
+
+    Each step is timed under `companion.prefetch.<step>` in utils.metrics.
+
+    Args:
+        state (SystemState): The current system state
+
+    Returns:
+        dict: Dictionary containing:
+            - history: The CompanionAgentHistory, with the system prompt restored
+            - parts: Prompt parts for the user's message and optional attachment
+            - user_profile: The rendered long-term profile ("" when there is none)
+            - past_sessions: Rendered past sessions relevant to the message ("" when none)
+    """
+    user_input = state.get("user_input", {})
+    steps = {}
+    if USER_PROFILE_ENABLED:
+        # Long-term profile, pre-rendered within its token budget (one HGET)
+        steps["user_profile"] = UserProfileCache.get_prompt(state.get("user_id"))
+    if RETRIEVAL_ENABLED:
+        # Top-k similar past conversations from the local index (CPU, in a worker thread)
+        steps["past_sessions"] = retrieve_past_sessions(
+            state.get("user_id"), user_input.get("response", ""), exclude_workflow_id=state.get("workflow_id")
+        )
+    results, timings = await metrics.gather_timed(
+        "companion.prefetch",
+        **steps,
+        # Conversation history (replayed as native pydantic-ai messages)
+        history=CompanionAgentHistory.load_or_create(state.get("workflow_id")),
+        # Prompt parts with optional file attachment
+        parts=file_to_prompt_parts(
+            user_input.get("response", ""),
+            user_input.get("file", None),
+            image_profile=companion_image_profile,
+        ),
+    )
+    logging.debug(
+        "companion_agent: prefetch timings ms=%s",
+        {name: round(seconds * 1000, 2) for name, seconds in timings.items()},
+    )
+    results["history"].messages = with_system_prompt(results["history"].messages)
+    results.setdefault("user_profile", "")
+    results.setdefault("past_sessions", "")
+    return results
+
+async def respond_to_crisis(state: SystemState, crisis_phrase: str) -> Dict[str, Any]:
+    """
+    Reply with the localized crisis escalation message and record the turn in history.
+
+    Args:
+        state (SystemState): The current system state
+        crisis_phrase: The normalized phrase that triggered the escalation
+
+    Returns:
+        dict: Same shape as companion_agent's return value
+    """
+    user_input = state.get("user_input", {})
+    country = resolve_country(user_input.get("country"), user_input.get("timezone"), DEFAULT_TIMEZONE)
+    response = crisis_response(country)
+
+    # Log the event without the message text
+    logging.warning(
+        "companion_agent: crisis escalation; workflow_id=%s user_id=%s phrase=%s country=%s",
+        state.get("workflow_id"),
+        state.get("user_id"),
+        crisis_phrase,
+        country,
+    )
+    metrics.increment("companion.crisis_escalations")
+
+    history = await CompanionAgentHistory.load_or_create(state.get("workflow_id"))
+    history.messages.extend([
+        ModelRequest(parts=[UserPromptPart(content=user_input.get("response", ""))]),
+        ModelResponse(parts=[TextPart(content=response)]),
+    ])
+    await history.save(workflow_id=state.get("workflow_id"), user_id=state.get("user_id"))
+
+    return {
+        "agent_response": response,
+        "previous_agent": "companion_agent",
+        "throttled": None
+    }
+
+def throttled_response(admission: Admission) -> Dict[str, Any]:
+    """
+    Reply to a request rejected by admission control, without an LLM call.
+
+    The message is not added to the history, so the user can simply resend it.
+
+    Returns:
+        dict: Same shape as companion_agent's return value, plus `throttled`
+    """
+    return {
+        "agent_response": THROTTLED_RESPONSE,
+        "previous_agent": "companion_agent",
+        "throttled": admission.as_state()
+    }
+
 async def companion_agent(state: SystemState) -> Dict[str,Any]:
     """
     Companion agent that provides personalized emotional support and companionship to users.
@@ -41,34 +280,37 @@ async def companion_agent(state: SystemState) -> Dict[str,Any]:
                 - response: The user's message/response
                 - companion_name: Name of the companion (e.g., "Emma", "Alex")
                 - companion_gender: Gender of the companion ("male", "female", etc.)
-                - file: Optional file attachment (currently unused)
+                - timezone: Optional IANA timezone of the user (e.g., "Europe/London")
+                - country: Optional ISO country code used for localized crisis hotlines
+                - file: Optional file attachment sent alongside the message
     
     Returns:
         dict: Dictionary containing:
             - agent_response: The companion's response to the user
             - previous_agent: The name of this agent for state tracking
+            - throttled: Scope and retry delay when admission control rejected the
+              message (agent_response is then a short "try again" reply), else None
     """
-    # Conversation history
-    history = await CompanionAgentHistory.load_or_create(state.get("workflow_id"))
-    
     user_input = state.get("user_input", {})
     user_resposne = user_input.get("response", "")
     companion_name = user_input.get("companion_name", "")
     companion_gender = user_input.get("companion_gender", "")
-    file = user_input.get("file", None)
-    
-    composed_input = f"""
-        # Conversation History: 
-        {history.messages}
-        
-        # User's Input:
-        - user_response: {user_resposne}
-        - companion_name: {companion_name}
-        - companion_gender: {companion_gender}
-    """
-
-    # Build prompt parts with optional file attachment
-    parts = await file_to_prompt_parts(composed_input, file)
+    timezone = user_input.get("timezone", "")
+
+    # Crisis phrases are answered in-process, without waiting for the LLM
+    crisis_phrase = detect_crisis(user_resposne) if CRISIS_DETECTOR_ENABLED else None
+    if crisis_phrase:
+        return await respond_to_crisis(state, crisis_phrase)
+
+    # Admission control after crisis detection (never throttled), before any lookup or LLM call
+    admission = await AdmissionControl.admit(state.get("user_id"), "companion")
+    if not admission.admitted:
+        return throttled_response(admission)
+
+    # Pre-LLM stage: independent lookups run concurrently
+    prefetched = await prefetch_turn_context(state)
+    history = prefetched["history"]
+    parts = prefetched["parts"]
     try:
         has_attachment = any(not isinstance(p, str) for p in parts)
         attachment_types = [type(p).__name__ for p in parts if not isinstance(p, str)]
@@ -85,18 +327,38 @@ async def companion_agent(state: SystemState) -> Dict[str,Any]:
         # Use async version of the agent
         result = await agent.run(
             parts,
+            message_history=history.messages or None,
+            deps=CompanionDeps(
+                companion_name=companion_name,
+                companion_gender=companion_gender,
+                timezone=timezone,
+                user_profile=prefetched["user_profile"],
+                past_sessions=prefetched["past_sessions"],
+            ),
             usage_limits=UsageLimits(request_limit=None)
         )
     except Exception as e:
         raise Exception(f"Agent failed: {e}")
 
-    history.messages.append({
-        "user": user_input,
-        "assistant": result.output.response
-    })
+    record_usage(result.usage())
+    new_messages = result.new_messages()
+    time_tool_calls = sum(
+        1
+        for message in new_messages
+        for part in getattr(message, "parts", [])
+        if isinstance(part, ToolCallPart) and part.tool_name in TIME_TOOL_NAMES
+    )
+    metrics.increment("companion.time_context_injected")
+    if time_tool_calls:
+        metrics.increment("companion.time_tool_calls", time_tool_calls)
+    else:
+        metrics.increment("companion.turns_without_time_tool")
+
+    history.messages = without_system_prompt([*history.messages, *without_attachment_bytes(new_messages)])
     await history.save(workflow_id=state.get("workflow_id"), user_id=state.get("user_id"))
 
     return {
         "agent_response": result.output.response,
-        "previous_agent": "companion_agent"
+        "previous_agent": "companion_agent",
+        "throttled": None
     }
\ No newline at end of file
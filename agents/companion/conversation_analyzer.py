@@ -7,8 +7,11 @@ from states.system_state import SystemState
 from pydantic_ai.usage import UsageLimits
 from .history import GeneralAgentHistory,CompanionAgentHistory
 from prompts.companion.conversation_analyzer import conversation_analyzer_promot
-import os
-import asyncio
+from config.settings import RETRIEVAL_ENABLED, USER_PROFILE_ENABLED
+from storage.analysis_store import save_analysis
+from storage.conversation_index import index_analysis
+from storage.redis.user_profile import UserProfileCache
+from utils.tracing import record_usage
 
 class SessionMetadata(BaseModel):
     companion_name: str = Field(..., description="Companion name used in the session")
@@ -106,6 +109,7 @@ agent = Agent(
     output_type=ConversationAnalyzed,
     retries=5,
     output_retries=5,
+    defer_model_check=True,
 )
 
 # Getting the different agnet histories dynamically
@@ -146,9 +150,13 @@ async def conversation_analyzer_agent(state: SystemState) -> Dict[str,Any]:
         state (SystemState): The current system state containing:
             - previous_agent: The name of the agent whose conversation to analyze
             - workflow_id: Unique identifier for the conversation session
+            - user_id: The user whose long-term profile the analysis is merged into
     
     Returns:
-        dict: Empty dictionary (analysis results are saved to file)
+        dict: Dictionary containing:
+            - conversation_analyzed: Reference to the stored analysis (kind, workflow_id,
+              created_at and summary fields); load the full result with
+              storage.analysis_store.load_analysis
     """
     # Conversation history
     agent_history = await get_conversation_history(state.get("previous_agent"))
@@ -156,7 +164,7 @@ async def conversation_analyzer_agent(state: SystemState) -> Dict[str,Any]:
     
     prompt = f"""
     # Conversation History:
-    {history.messages}
+    {history.transcript(assistant_label="Companion")}
 
     Analyze the conversation.
     """
@@ -168,22 +176,33 @@ async def conversation_analyzer_agent(state: SystemState) -> Dict[str,Any]:
             usage_limits=UsageLimits(request_limit=None)
         )
 
-        # Ensure directory exists (async)
-        await asyncio.to_thread(os.makedirs, "conversation_analyzed", exist_ok=True)
+        record_usage(result.usage())
 
         data = result.output
 
-        markdown_content = format_analysis_to_markdown(data)
+        # Only the reference goes into the state, and from there into every later checkpoint
+        reference = await save_analysis(
+            "conversation",
+            state.get("workflow_id"),
+            state.get("user_id"),
+            data,
+            format_analysis_to_markdown(data),
+            summary={
+                "interaction_type": data.session_metadata.interaction_type,
+                "primary_intent": data.intent_analysis.primary_intent,
+                "final_state": data.emotional_profile.final_state,
+            },
+        )
+
+        # Fold the session into the long-term profile the companion reads
+        if USER_PROFILE_ENABLED:
+            await UserProfileCache.merge_analysis(state.get("user_id"), state.get("workflow_id"), data.model_dump())
+        # And into the index the companion retrieves relevant past sessions from
+        if RETRIEVAL_ENABLED:
+            await index_analysis(state.get("user_id"), state.get("workflow_id"), data.model_dump())
 
-        # Write file asynchronously
-        def write_file():
-            with open(f"conversation_analyzed/{state.get('workflow_id')}.md", "w") as f:
-                f.write(markdown_content)
-        
-        await asyncio.to_thread(write_file)
-        
         return {
-            "conversation_analyzed": markdown_content
+            "conversation_analyzed": reference
         }
     except Exception as e:
         raise Exception(f"Agent failed: {e}")
@@ -0,0 +1,125 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Optional
+
+import pytz
+
+# Phrases that must trigger the crisis response without waiting for the LLM.
+# Written in plain form; they go through the same normalization as user text.
+CRISIS_PHRASES = [
+    "suicide", "suicidal", "sucide", "suicde", "suiside", "sucidal", "suicidel",
+    "kill myself", "killing myself", "kil myself",
+    "harm myself", "harming myself", "hurt myself", "hurting myself",
+    "self harm", "selfharm", "cut myself", "cutting myself",
+    "end it all", "end my life", "ending my life", "take my own life", "take my life",
+    "want to die", "wanna die", "want to be dead", "better off dead",
+    "no reason to live", "dont want to live", "don't want to live",
+    "overdose",
+]
+
+_LEET = {"1": "i", "3": "e", "0": "o", "@": "a", "$": "s", "5": "s"}
+# Only substituted between two letters or digits ("k1ll", "su1c1de"), never at word
+# edges, where the characters are punctuation or numbers rather than disguised letters
+_LEET_RE = re.compile(r"(?<=[a-z0-9])[" + re.escape("".join(_LEET)) + r"](?=[a-z0-9])")
+_NON_WORD_RE = re.compile(r"[^a-z]+")
+_REPEAT_RE = re.compile(r"(.)\1+")
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize text for crisis matching.
+
+    Lowercases, strips accents, maps leetspeak digits and symbols inside
+    words to letters, turns punctuation into single spaces and collapses
+    repeated letters ("killll" -> "kil"), so casing and common misspellings match.
+    """
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    text = _LEET_RE.sub(lambda m: _LEET[m.group(0)], text.lower()).replace("'", "")
+    text = _NON_WORD_RE.sub(" ", text)
+    return _REPEAT_RE.sub(r"\1", text).strip()
+
+
+_NORMALIZED_PHRASES = {normalize(p) for p in CRISIS_PHRASES}
+
+# Every phrase starts with one of these words; a set lookup rules out most messages
+_ANCHOR_WORDS = frozenset(p.split()[0] for p in _NORMALIZED_PHRASES)
+
+# One precompiled alternation; phrases are normalized exactly like the input
+_CRISIS_RE = re.compile(
+    r"\b(?:" + "|".join(sorted((re.escape(p) for p in _NORMALIZED_PHRASES), key=len, reverse=True)) + r")\b"
+)
+
+
+def detect_crisis(text: str) -> Optional[str]:
+    """
+    Check a user message for crisis phrases.
+
+    Args:
+        text: The raw user message
+
+    Returns:
+        Optional[str]: The matched (normalized) phrase, or None
+    """
+    if not text:
+        return None
+    normalized = normalize(text)
+    if _ANCHOR_WORDS.isdisjoint(normalized.split()):
+        return None
+    match = _CRISIS_RE.search(normalized)
+    return match.group(0) if match else None
+
+
+CRISIS_HOTLINES: Dict[str, str] = {
+    "IN": "Tele-MANAS: call 14416 or 1-800-891-4416 (24/7, free)",
+    "US": "988 Suicide & Crisis Lifeline: call or text 988\nCrisis Text Line: text HOME to 741741",
+    "CA": "Talk Suicide Canada: call or text 988",
+    "GB": "Samaritans: call 116 123 (free, 24/7)\nShout: text SHOUT to 85258",
+    "IE": "Samaritans: call 116 123 (free, 24/7)\nText 50808",
+    "AU": "Lifeline: call 13 11 14 or text 0477 13 11 14",
+    "NZ": "Need to talk? Call or text 1737",
+}
+DEFAULT_HOTLINE = "Find a free, confidential helpline in your country at https://findahelpline.com"
+EMERGENCY_NUMBERS: Dict[str, str] = {
+    "IN": "112", "US": "911", "CA": "911", "GB": "999", "IE": "112", "AU": "000", "NZ": "111",
+}
+
+
+@lru_cache(maxsize=1)
+def _timezone_countries() -> Dict[str, str]:
+    """Reverse map of IANA timezone name -> ISO country code."""
+    return {tz: country for country, zones in pytz.country_timezones.items() for tz in zones}
+
+
+def resolve_country(country: Optional[str] = None, timezone: Optional[str] = None, default_timezone: Optional[str] = None) -> Optional[str]:
+    """
+    Work out the user's country from an explicit code, their timezone, or the default timezone.
+
+    Returns:
+        Optional[str]: ISO 3166 alpha-2 country code, or None if unknown
+    """
+    if country:
+        return country.strip().upper()[:2]
+    zones = _timezone_countries()
+    return zones.get(timezone or "") or zones.get(default_timezone or "")
+
+
+def crisis_response(country: Optional[str] = None) -> str:
+    """
+    Build the localized escalation reply sent instead of an LLM response.
+
+    Args:
+        country: ISO country code used to pick hotline and emergency numbers
+
+    Returns:
+        str: The escalation message
+    """
+    hotline = CRISIS_HOTLINES.get(country or "", DEFAULT_HOTLINE)
+    emergency = EMERGENCY_NUMBERS.get(country or "", "your local emergency number")
+    return (
+        "I'm really concerned about what you're telling me. Your safety is the most important thing right now. "
+        "Please reach out to someone who can help immediately:\n"
+        f"{hotline}\n"
+        f"If you are in immediate danger, please call {emergency}. "
+        "Can you reach out to a trusted friend, family member, or therapist right now? I'm here with you."
+    )
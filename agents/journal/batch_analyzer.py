@@ -0,0 +1,201 @@
+from pydantic_ai import Agent
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Tuple
+
+from config.llm import journal_analyzer_llm
+from config.settings import (
+    JOURNAL_CACHE_ENABLED,
+    JOURNAL_CACHE_TTL_SECONDS,
+    JOURNAL_BATCH_TOKEN_BUDGET,
+    JOURNAL_BATCH_MAX_ENTRIES,
+    JOURNAL_BATCH_CONCURRENCY,
+)
+from pydantic_ai.usage import UsageLimits
+from prompts.journal.journal_analyzer import journal_batch_analyzer_prompt
+from storage.redis.journal_cache import JournalAnalysisCache
+from utils.text_features import estimate_tokens
+from utils.tracing import record_usage
+from .journal_analyzer import (
+    JournalAnalysis,
+    ANALYSIS_VERSION,
+    analysis_version,
+    analyze_journal_entry,
+    store_training_example,
+    persist_analysis,
+)
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Batch results come from a different prompt than single-entry ones, so they are cached under their own version
+BATCH_ANALYSIS_VERSION = analysis_version(journal_batch_analyzer_prompt)
+
+# Maximum entries being stored and counted in the rollups at once
+PERSIST_CONCURRENCY = 32
+
+
+class IndexedJournalAnalysis(JournalAnalysis):
+    index: int = Field(..., description="Index of the journal entry this analysis belongs to")
+
+
+class JournalBatchAnalysis(BaseModel):
+    results: List[IndexedJournalAnalysis] = Field(..., description="One analysis per journal entry")
+
+
+batch_journal_agent = Agent(
+    journal_analyzer_llm,
+    system_prompt=journal_batch_analyzer_prompt,
+    output_type=JournalBatchAnalysis,
+    retries=5,
+    output_retries=5,
+    defer_model_check=True,
+)
+
+
+def split_into_chunks(
+    entries: List[Tuple[int, str]],
+    token_budget: int = JOURNAL_BATCH_TOKEN_BUDGET,
+    max_entries: int = JOURNAL_BATCH_MAX_ENTRIES,
+) -> List[List[Tuple[int, str]]]:
+    """
+    Greedily pack indexed entries into chunks that fit the token budget.
+
+    An entry larger than the budget on its own is sent as a single-entry chunk.
+
+    Args:
+        entries: (index, entry) pairs to pack
+        token_budget: Maximum estimated prompt tokens per chunk
+        max_entries: Maximum number of entries per chunk
+
+    Returns:
+        List of chunks, each a list of (index, entry) pairs
+    """
+    chunks: List[List[Tuple[int, str]]] = []
+    current: List[Tuple[int, str]] = []
+    current_tokens = 0
+    for index, entry in entries:
+        tokens = estimate_tokens(entry)
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_entries):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append((index, entry))
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _analyze_chunk(chunk: List[Tuple[int, str]]) -> Dict[int, JournalAnalysis]:
+    """Analyze one chunk with a single LLM request and map results back by index."""
+    entries = "\n\n".join(f"## Entry {index}\n{entry}" for index, entry in chunk)
+    prompt = f"""
+    # Journal Entries:
+    {entries}
+
+    Analyze each journal entry.
+    """
+
+    result = await batch_journal_agent.run(
+        prompt,
+        usage_limits=UsageLimits(request_limit=None)
+    )
+    record_usage(result.usage())
+
+    expected = {index for index, _ in chunk}
+    return {
+        item.index: JournalAnalysis(**item.model_dump(exclude={"index"}))
+        for item in result.output.results
+        if item.index in expected
+    }
+
+
+async def analyze_journal_entries(
+    entries: List[str],
+    workflow_ids: List[str],
+    user_id: Optional[str],
+    timezone: Optional[str] = None,
+    bypass_cache: bool = False,
+    token_budget: int = JOURNAL_BATCH_TOKEN_BUDGET,
+    max_entries: int = JOURNAL_BATCH_MAX_ENTRIES,
+    concurrency: int = JOURNAL_BATCH_CONCURRENCY,
+) -> List[JournalAnalysis]:
+    """
+    Analyze many journal entries with as few LLM requests as possible.
+
+    Cached entries are served from Redis (batch results first, then single-entry
+    ones); the rest are packed into chunks by token budget and analyzed in
+    parallel, one structured request per chunk. Entries missing from a chunk's
+    response (or from a failed chunk) fall back to the per-entry path. Like
+    journal_analyzer_agent, every entry's analysis is then stored in the
+    analysis store and counted in the user's mood rollups.
+
+    Args:
+        entries: Journal entry texts, e.g. a user's imported backlog
+        workflow_ids: The journal workflow of each entry, in the same order
+        user_id: The user the entries belong to
+        timezone: The user's IANA timezone, which decides the rollup day
+        bypass_cache: Skip cache lookups and always call the LLM
+        token_budget: Maximum estimated prompt tokens per chunk
+        max_entries: Maximum number of entries per chunk
+        concurrency: Maximum number of chunk requests in flight
+
+    Returns:
+        List[JournalAnalysis]: Analyses in the same order as the input entries
+
+    Raises:
+        ValueError: If entries and workflow_ids differ in length
+    """
+    if len(workflow_ids) != len(entries):
+        raise ValueError("workflow_ids must name the workflow of every entry")
+    results: List[Optional[JournalAnalysis]] = [None] * len(entries)
+
+    if JOURNAL_CACHE_ENABLED and not bypass_cache:
+        for version in (BATCH_ANALYSIS_VERSION, ANALYSIS_VERSION):
+            misses = [index for index, analysis in enumerate(results) if analysis is None]
+            cached = await asyncio.gather(*(
+                JournalAnalysisCache.get(entries[index], version, JournalAnalysis) for index in misses
+            ))
+            for index, analysis in zip(misses, cached):
+                results[index] = analysis
+
+    pending = [(index, entry) for index, entry in enumerate(entries) if results[index] is None]
+    chunks = split_into_chunks(pending, token_budget, max_entries)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_chunk(chunk):
+        async with semaphore:
+            return await _analyze_chunk(chunk)
+
+    logger.info(f"Batch journal analysis: {len(entries)} entries, {len(pending)} uncached, {len(chunks)} requests")
+    outcomes = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks), return_exceptions=True)
+
+    for chunk, outcome in zip(chunks, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Batch journal analysis chunk of {len(chunk)} entries failed: {str(outcome)}")
+            continue
+        for index, analysis in outcome.items():
+            results[index] = analysis
+            await store_training_example(entries[index], analysis)
+            if JOURNAL_CACHE_ENABLED:
+                await JournalAnalysisCache.set(entries[index], BATCH_ANALYSIS_VERSION, analysis, JOURNAL_CACHE_TTL_SECONDS)
+
+    missing = [index for index, analysis in enumerate(results) if analysis is None]
+    if missing:
+        logger.warning(f"Batch journal analysis: falling back to per-entry analysis for {len(missing)} entries")
+
+        async def run_single(index):
+            async with semaphore:
+                return await analyze_journal_entry(entries[index], bypass_cache=True)
+
+        for index, analysis in zip(missing, await asyncio.gather(*(run_single(i) for i in missing))):
+            results[index] = analysis
+
+    persist_semaphore = asyncio.Semaphore(PERSIST_CONCURRENCY)
+
+    async def persist(workflow_id, analysis):
+        async with persist_semaphore:
+            await persist_analysis(workflow_id, user_id, analysis, timezone)
+
+    await asyncio.gather(*(persist(workflow_id, analysis) for workflow_id, analysis in zip(workflow_ids, results)))
+    return results
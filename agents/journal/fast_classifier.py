@@ -0,0 +1,304 @@
+import argparse
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.text_features import DEFAULT_N_FEATURES, hash_features
+
+logger = logging.getLogger(__name__)
+
+# Share of the stored examples held out to calibrate and check the confidence
+HOLDOUT_FRACTION = 0.2
+# Held-out predictions at or above the threshold needed before the fast path is trusted
+MIN_HOLDOUT_SUPPORT = 30
+# Candidate softmax temperatures; naive Bayes sums log-likelihoods over every
+# word, so raw posteriors are almost always near 0 or 1
+TEMPERATURES = np.geomspace(0.1, 1000.0, 81)
+
+
+@dataclass
+class FastLabels:
+    mood: str
+    category: str
+    confidence: float
+
+
+class NaiveBayesClassifier:
+    """
+    Multinomial naive Bayes over hashed bag-of-words features.
+
+    Training only accumulates counts. Posteriors are softened by a temperature
+    fitted on held-out examples (see fit_temperature), since the independence
+    assumption makes raw naive Bayes posteriors overconfident.
+    """
+
+    def __init__(self, labels: Sequence[str], n_features: int = DEFAULT_N_FEATURES, alpha: float = 1.0):
+        self.labels = list(labels)
+        self.n_features = n_features
+        self.alpha = alpha
+        self.feature_counts = np.zeros((len(self.labels), n_features), dtype=np.float32)
+        self.class_counts = np.zeros(len(self.labels), dtype=np.float64)
+        self.temperature = 1.0
+        self._log_probs: Optional[np.ndarray] = None
+
+    def partial_fit(self, features: np.ndarray, label: str) -> None:
+        """Add one example given its hashed feature indices."""
+        row = self.labels.index(label)
+        np.add.at(self.feature_counts[row], features, 1.0)
+        self.class_counts[row] += 1
+        self._log_probs = None
+
+    def scores(self, features: np.ndarray) -> np.ndarray:
+        """Unnormalized log posterior of every label for the given hashed feature indices."""
+        if self._log_probs is None:
+            smoothed = self.feature_counts + self.alpha
+            self._log_probs = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        priors = np.log(self.class_counts + 1.0) - np.log(self.class_counts.sum() + len(self.labels))
+        return priors + self._log_probs[:, features].sum(axis=1)
+
+    def predict(self, features: np.ndarray) -> Tuple[str, float]:
+        """
+        Predict a label for the given hashed feature indices.
+
+        Returns:
+            Tuple[str, float]: The best label and its temperature-scaled posterior probability
+        """
+        scores = self.scores(features) / self.temperature
+        probs = np.exp(scores - scores.max())
+        probs /= probs.sum()
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best])
+
+    def fit_temperature(self, scores: np.ndarray, labels: Sequence[str]) -> float:
+        """
+        Pick the temperature that minimizes the negative log-likelihood of held-out labels.
+
+        Args:
+            scores: Held-out scores, one row per example (see `scores`)
+            labels: The true label of each row
+
+        Returns:
+            float: The fitted temperature, also stored on the model
+        """
+        rows = np.arange(len(labels))
+        targets = np.array([self.labels.index(label) for label in labels])
+        best_loss = np.inf
+        for temperature in TEMPERATURES:
+            scaled = scores / temperature
+            scaled -= scaled.max(axis=1, keepdims=True)
+            log_probs = scaled - np.log(np.exp(scaled).sum(axis=1, keepdims=True))
+            loss = -log_probs[rows, targets].mean()
+            if loss < best_loss:
+                best_loss, self.temperature = loss, float(temperature)
+        return self.temperature
+
+
+class JournalFastClassifier:
+    """
+    CPU-only mood and category classifier used to skip the LLM for the closed label sets.
+
+    The model is trained offline from stored LLM-labelled analyses (see `train`)
+    and persisted as a compressed NumPy archive. Training holds out part of the
+    examples to calibrate the confidence and to measure how often confident
+    predictions are right; the fast path is only used when that held-out
+    precision meets the confidence threshold (see `ready`).
+    """
+
+    def __init__(self, moods: Sequence[str], categories: Sequence[str], n_features: int = DEFAULT_N_FEATURES):
+        self.n_features = n_features
+        self.mood_model = NaiveBayesClassifier(moods, n_features)
+        self.category_model = NaiveBayesClassifier(categories, n_features)
+        # Calibrated confidence of each held-out example, and whether both labels were right
+        self.holdout_confidence = np.zeros(0, dtype=np.float64)
+        self.holdout_correct = np.zeros(0, dtype=bool)
+
+    @property
+    def example_count(self) -> int:
+        return int(self.mood_model.class_counts.sum())
+
+    def featurize(self, text: str) -> np.ndarray:
+        return hash_features(text, self.n_features)
+
+    def partial_fit(self, features: np.ndarray, mood: str, category: str) -> None:
+        """Add one LLM-labelled example."""
+        self.mood_model.partial_fit(features, mood)
+        self.category_model.partial_fit(features, category)
+
+    def _valid_examples(self, examples: List[Dict[str, Any]]) -> List[Tuple[np.ndarray, str, str]]:
+        valid = []
+        for example in examples:
+            try:
+                features = np.asarray(example["features"], dtype=np.int64) % self.n_features
+                if example["mood"] not in self.mood_model.labels or example["category"] not in self.category_model.labels:
+                    raise ValueError(f"unknown labels {example['mood']}/{example['category']}")
+                if features.size:
+                    valid.append((features, example["mood"], example["category"]))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping invalid journal training example: {str(e)}")
+        return valid
+
+    def fit(self, examples: List[Dict[str, Any]]) -> int:
+        """
+        Add counts from stored examples (see JournalTrainingExamples), without calibration.
+
+        Returns:
+            int: Number of examples used
+        """
+        valid = self._valid_examples(examples)
+        for features, mood, category in valid:
+            self.partial_fit(features, mood, category)
+        return len(valid)
+
+    def train(self, examples: List[Dict[str, Any]], holdout_fraction: float = HOLDOUT_FRACTION, seed: int = 0) -> Dict[str, Any]:
+        """
+        Train on most of the examples, then calibrate and check the confidence on the rest.
+
+        Args:
+            examples: Stored examples (see JournalTrainingExamples)
+            holdout_fraction: Share of the examples held out
+            seed: Seed for the train/held-out split
+
+        Returns:
+            dict: Example counts and fitted temperatures
+        """
+        valid = self._valid_examples(examples)
+        order = np.random.default_rng(seed).permutation(len(valid))
+        holdout_size = int(len(valid) * holdout_fraction)
+        holdout = [valid[i] for i in order[:holdout_size]]
+        for i in order[holdout_size:]:
+            self.partial_fit(*valid[i])
+
+        if holdout:
+            mood_scores = np.stack([self.mood_model.scores(features) for features, _, _ in holdout])
+            category_scores = np.stack([self.category_model.scores(features) for features, _, _ in holdout])
+            self.mood_model.fit_temperature(mood_scores, [mood for _, mood, _ in holdout])
+            self.category_model.fit_temperature(category_scores, [category for _, _, category in holdout])
+            predictions = [self.predict_features(features) for features, _, _ in holdout]
+            self.holdout_confidence = np.array([labels.confidence for labels in predictions])
+            self.holdout_correct = np.array([
+                labels.mood == mood and labels.category == category
+                for labels, (_, mood, category) in zip(predictions, holdout)
+            ])
+        return {
+            "trained": self.example_count,
+            "held_out": len(holdout),
+            "mood_temperature": self.mood_model.temperature,
+            "category_temperature": self.category_model.temperature,
+        }
+
+    def precision_at(self, threshold: float, min_support: int = MIN_HOLDOUT_SUPPORT) -> Optional[float]:
+        """
+        Share of held-out predictions at or above the confidence threshold with both labels right.
+
+        Returns:
+            Optional[float]: The precision, or None with fewer than min_support such predictions
+        """
+        confident = self.holdout_confidence >= threshold
+        if confident.sum() < max(1, min_support):
+            return None
+        return float(self.holdout_correct[confident].mean())
+
+    def ready(self, min_examples: int, threshold: float) -> bool:
+        """Whether predictions at the threshold may skip the LLM: enough examples, and held-out precision meets the threshold."""
+        if self.example_count < max(1, min_examples):
+            return False
+        precision = self.precision_at(threshold)
+        return precision is not None and precision >= threshold
+
+    def predict_features(self, features: np.ndarray) -> FastLabels:
+        mood, mood_confidence = self.mood_model.predict(features)
+        category, category_confidence = self.category_model.predict(features)
+        # Both labels must be right to skip the LLM
+        return FastLabels(mood=mood, category=category, confidence=mood_confidence * category_confidence)
+
+    def predict(self, text: str) -> Optional[FastLabels]:
+        """
+        Predict mood and category for a journal entry.
+
+        Args:
+            text: The journal entry text
+
+        Returns:
+            Optional[FastLabels]: Labels with the product of the two calibrated
+            confidences, or None when untrained or the text has no words
+        """
+        if self.example_count == 0:
+            return None
+        features = self.featurize(text)
+        if features.size == 0:
+            return None
+        return self.predict_features(features)
+
+    def save(self, path: str) -> None:
+        """Persist the model counts to a compressed .npz file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path,
+            mood_feature_counts=self.mood_model.feature_counts,
+            mood_class_counts=self.mood_model.class_counts,
+            category_feature_counts=self.category_model.feature_counts,
+            category_class_counts=self.category_model.class_counts,
+            temperatures=np.array([self.mood_model.temperature, self.category_model.temperature]),
+            holdout_confidence=self.holdout_confidence,
+            holdout_correct=self.holdout_correct,
+        )
+
+    def load(self, path: str) -> bool:
+        """
+        Load a model saved by `save`.
+
+        A model saved before calibration was added loads uncalibrated, so
+        `ready` stays False until it is retrained.
+
+        Returns:
+            bool: True if a compatible model was loaded, False otherwise
+        """
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as data:
+            if data["mood_feature_counts"].shape != self.mood_model.feature_counts.shape or \
+                    data["category_feature_counts"].shape != self.category_model.feature_counts.shape:
+                logger.warning(f"Ignoring journal classifier at {path}: incompatible shape")
+                return False
+            self.mood_model.feature_counts = data["mood_feature_counts"]
+            self.mood_model.class_counts = data["mood_class_counts"]
+            self.category_model.feature_counts = data["category_feature_counts"]
+            self.category_model.class_counts = data["category_class_counts"]
+            if "temperatures" in data:
+                self.mood_model.temperature, self.category_model.temperature = (float(t) for t in data["temperatures"])
+                self.holdout_confidence = data["holdout_confidence"]
+                self.holdout_correct = data["holdout_correct"]
+        self.mood_model._log_probs = None
+        self.category_model._log_probs = None
+        return True
+
+
+async def train_from_examples(path: str, threshold: float) -> Dict[str, Any]:
+    """
+    Rebuild the fast classifier from stored examples and save it to `path`.
+
+    Returns:
+        dict: The training report plus the held-out precision at the threshold
+    """
+    from storage.redis.journal_examples import JournalTrainingExamples
+    from .journal_analyzer import new_fast_classifier
+
+    classifier = new_fast_classifier()
+    report = classifier.train(await JournalTrainingExamples.load_all())
+    classifier.save(path)
+    return {**report, "threshold": threshold, "holdout_precision": classifier.precision_at(threshold)}
+
+
+if __name__ == "__main__":
+    from config.settings import JOURNAL_FAST_CLASSIFIER_PATH, JOURNAL_FAST_CLASSIFIER_THRESHOLD
+
+    parser = argparse.ArgumentParser(description="Train the local journal mood/category classifier")
+    parser.add_argument("--path", default=JOURNAL_FAST_CLASSIFIER_PATH)
+    parser.add_argument("--threshold", type=float, default=JOURNAL_FAST_CLASSIFIER_THRESHOLD)
+    args = parser.parse_args()
+    report = asyncio.run(train_from_examples(args.path, args.threshold))
+    print(f"Trained journal classifier -> {args.path}: {report}")
@@ -1,12 +1,35 @@
 from pydantic_ai import Agent
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Literal
+from typing import Dict, Any, Literal, Optional, get_args
 
 from config.llm import journal_analyzer_llm
+from config.settings import (
+    JOURNAL_CACHE_ENABLED,
+    JOURNAL_CACHE_TTL_SECONDS,
+    JOURNAL_FAST_CLASSIFIER_ENABLED,
+    JOURNAL_FAST_CLASSIFIER_PATH,
+    JOURNAL_FAST_CLASSIFIER_THRESHOLD,
+    JOURNAL_FAST_CLASSIFIER_MIN_EXAMPLES,
+    JOURNAL_ROLLUPS_ENABLED,
+)
 from states.system_state import SystemState
 from pydantic_ai.usage import UsageLimits
-from prompts.journal.journal_analyzer import journal_analyzer_prompt
+from prompts.journal.journal_analyzer import journal_analyzer_prompt, journal_analysis_only_prompt
+from storage.redis.journal_cache import JournalAnalysisCache
+from storage.redis.journal_examples import JournalTrainingExamples
+from storage.redis.journal_rollups import JournalMoodRollups
+from storage.redis.admission import AdmissionControl
+from storage.analysis_store import AnalysisRecord, save_analysis
+from utils import metrics
+from utils.tracing import record_usage
+from .fast_classifier import FastLabels, JournalFastClassifier
+from datetime import datetime
 import asyncio
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class JournalAnalysis(BaseModel):
@@ -24,40 +47,307 @@ def format_analysis_to_markdown(data: JournalAnalysis) -> str:
     return "\n".join(sections) + "\n"
 
 
+def analysis_version(*prompts: str) -> str:
+    """
+    Cache version for analyses written with the given prompts.
+
+    Pass every prompt whose output is cached under the version: the version
+    changes with any of them, the model or the output schema, so edits
+    invalidate old results.
+    """
+    return hashlib.sha256(
+        "|".join([
+            *prompts,
+            journal_analyzer_llm.split(":", 1)[-1],
+            json.dumps(JournalAnalysis.model_json_schema(), sort_keys=True),
+        ]).encode()
+    ).hexdigest()[:12]
+
+
+# Single-entry analyses come from journal_agent, or from fast-path labels plus journal_text_agent
+ANALYSIS_VERSION = analysis_version(journal_analyzer_prompt, journal_analysis_only_prompt)
+
+
 journal_agent = Agent(
     journal_analyzer_llm,
     system_prompt=journal_analyzer_prompt,
     output_type=JournalAnalysis,
     retries=5,
     output_retries=5,
+    defer_model_check=True,
 )
 
+# Used when the fast classifier already decided mood and category
+journal_text_agent = Agent(
+    journal_analyzer_llm,
+    system_prompt=journal_analysis_only_prompt,
+    output_type=str,
+    retries=5,
+    defer_model_check=True,
+)
 
-async def journal_analyzer_agent(state: SystemState) -> Dict[str, Any]:
-    journal_entry = state.get("user_input", "").get("response", "")
 
+def new_fast_classifier() -> JournalFastClassifier:
+    """Create an untrained fast classifier over the JournalAnalysis label sets."""
+    return JournalFastClassifier(
+        moods=get_args(JournalAnalysis.model_fields["mood"].annotation),
+        categories=get_args(JournalAnalysis.model_fields["category"].annotation),
+    )
+
+
+_fast_classifier: Optional[JournalFastClassifier] = None
+
+def get_fast_classifier() -> JournalFastClassifier:
+    """Get or create the process-wide fast classifier, loading the trained model on first use."""
+    global _fast_classifier
+    if _fast_classifier is None:
+        _fast_classifier = new_fast_classifier()
+        try:
+            if _fast_classifier.load(JOURNAL_FAST_CLASSIFIER_PATH):
+                logger.info(f"Loaded journal fast classifier with {_fast_classifier.example_count} examples")
+        except Exception as e:
+            logger.error(f"Failed to load journal fast classifier: {str(e)}")
+    return _fast_classifier
+
+
+def predict_fast_labels(journal_entry: str) -> Optional[FastLabels]:
+    """Return fast-path labels when the classifier is enabled, trained, calibrated and confident enough."""
+    if not JOURNAL_FAST_CLASSIFIER_ENABLED:
+        return None
+    classifier = get_fast_classifier()
+    if not classifier.ready(JOURNAL_FAST_CLASSIFIER_MIN_EXAMPLES, JOURNAL_FAST_CLASSIFIER_THRESHOLD):
+        metrics.increment("journal_fast_classifier.untrained")
+        return None
+    labels = classifier.predict(journal_entry)
+    if labels is None or labels.confidence < JOURNAL_FAST_CLASSIFIER_THRESHOLD:
+        metrics.increment("journal_fast_classifier.low_confidence")
+        return None
+    metrics.increment("journal_fast_classifier.hits")
+    return labels
+
+
+async def store_training_example(journal_entry: str, analysis: JournalAnalysis) -> None:
+    """
+    Store an LLM-labelled analysis as a fast classifier training example.
+
+    The loaded model is not updated in place: it is retrained and recalibrated
+    offline (python -m agents.journal.fast_classifier), so every process uses
+    the same saved model.
+    """
+    if not JOURNAL_FAST_CLASSIFIER_ENABLED:
+        return
+    features = get_fast_classifier().featurize(journal_entry)
+    if features.size == 0:
+        return
+    await JournalTrainingExamples.add(features.tolist(), analysis.mood, analysis.category)
+
+
+async def write_analysis_text(journal_entry: str, labels: FastLabels) -> str:
+    """Ask the LLM for the free-text analysis only, given fast-path labels."""
     prompt = f"""
+    # Mood: {labels.mood}
+    # Category: {labels.category}
+
     # Journal Entry:
     {journal_entry}
 
-    Analyze the journal entry.
+    Write the analysis of the journal entry.
     """
 
-    result = await journal_agent.run(
+    result = await journal_text_agent.run(
         prompt,
         usage_limits=UsageLimits(request_limit=None)
     )
+    record_usage(result.usage())
+    return result.output
+
+
+async def analyze_journal_entry(journal_entry: str, bypass_cache: bool = False) -> JournalAnalysis:
+    """
+    Analyze a journal entry, serving repeated submissions from the Redis result cache.
+
+    When the local fast classifier is confident about mood and category, the
+    LLM is only asked for the free-text analysis.
+
+    Args:
+        journal_entry: The raw journal entry text
+        bypass_cache: Skip the cache lookup and always call the LLM (the result is still stored)
+
+    Returns:
+        JournalAnalysis: The mood, category and analysis for the entry
+    """
+    use_cache = JOURNAL_CACHE_ENABLED and not bypass_cache
+    if use_cache:
+        cached = await JournalAnalysisCache.get(journal_entry, ANALYSIS_VERSION, JournalAnalysis)
+        if cached is not None:
+            return cached
+
+    labels = predict_fast_labels(journal_entry)
+    if labels is not None:
+        analysis_output = JournalAnalysis(
+            mood=labels.mood,
+            category=labels.category,
+            analysis=await write_analysis_text(journal_entry, labels),
+        )
+    else:
+        prompt = f"""
+        # Journal Entry:
+        {journal_entry}
+
+        Analyze the journal entry.
+        """
+
+        result = await journal_agent.run(
+            prompt,
+            usage_limits=UsageLimits(request_limit=None)
+        )
+        record_usage(result.usage())
+        analysis_output = result.output
+        await store_training_example(journal_entry, analysis_output)
+
+    if JOURNAL_CACHE_ENABLED:
+        await JournalAnalysisCache.set(journal_entry, ANALYSIS_VERSION, analysis_output, JOURNAL_CACHE_TTL_SECONDS)
+
+    return analysis_output
+
+
+def analysis_summary(analysis_output: JournalAnalysis) -> Dict[str, Any]:
+    """The JournalAnalysis fields kept in SystemState next to the stored analysis reference."""
+    return {"mood": analysis_output.mood, "category": analysis_output.category}
+
+
+async def store_analysis(
+    workflow_id: str,
+    user_id: Optional[str],
+    analysis_output: JournalAnalysis,
+    timezone: Optional[str] = None,
+    created_at: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Store the full analysis and markdown; returns the reference kept in SystemState."""
+    return await save_analysis(
+        "journal",
+        workflow_id,
+        user_id,
+        analysis_output,
+        format_analysis_to_markdown(analysis_output),
+        summary=analysis_summary(analysis_output),
+        timezone=timezone,
+        created_at=created_at,
+    )
+
+
+async def update_rollups(
+    workflow_id: str, user_id: Optional[str], mood: str, category: str, timezone: Optional[str] = None
+) -> None:
+    """Count the entry's labels in the user's daily and weekly mood/category rollups."""
+    if JOURNAL_ROLLUPS_ENABLED:
+        await JournalMoodRollups.record(user_id, workflow_id, mood, category, timezone_name=timezone)
+
+
+async def persist_analysis(
+    workflow_id: str, user_id: Optional[str], analysis_output: JournalAnalysis, timezone: Optional[str] = None
+) -> Dict[str, Any]:
+    """Count an entry's analysis in the rollups and store it; returns the reference kept in SystemState."""
+    await update_rollups(workflow_id, user_id, analysis_output.mood, analysis_output.category, timezone)
+    return await store_analysis(workflow_id, user_id, analysis_output, timezone)
+
+
+# Background tasks filling in deferred analyses (kept referenced until done)
+_deferred_tasks = set()
+
+async def _complete_deferred_analysis(
+    workflow_id: str,
+    user_id: Optional[str],
+    timezone: Optional[str],
+    journal_entry: str,
+    labels: FastLabels,
+    created_at: datetime,
+) -> None:
+    try:
+        analysis_output = JournalAnalysis(
+            mood=labels.mood,
+            category=labels.category,
+            analysis=await write_analysis_text(journal_entry, labels),
+        )
+        if JOURNAL_CACHE_ENABLED:
+            await JournalAnalysisCache.set(journal_entry, ANALYSIS_VERSION, analysis_output, JOURNAL_CACHE_TTL_SECONDS)
+        # Saved with the created_at of the reference already returned
+        await store_analysis(workflow_id, user_id, analysis_output, timezone, created_at)
+    except Exception as e:
+        logger.error(f"Deferred journal analysis failed for workflow {workflow_id}: {str(e)}")
+
+
+async def journal_analyzer_agent(state: SystemState) -> Dict[str, Any]:
+    """
+    Analyzes a journal entry for mood, category and an emotional summary.
+
+    The full analysis is stored in the analysis store; the state only keeps a
+    reference with the mood and category, which are also counted in the
+    user's daily and weekly rollups (JournalMoodRollups). With `user_input.defer_analysis` set
+    and a confident fast classifier, the reference is returned right away with
+    `analysis_pending` set, and the analysis is written in the background.
+
+    Args:
+        state (SystemState): The current system state containing:
+            - workflow_id: Unique identifier for the journal submission
+            - user_input: Dictionary containing:
+                - response: The journal entry text
+                - bypass_cache: Optional flag to skip the result cache
+                - defer_analysis: Optional flag to return fast labels immediately
+                - timezone: Optional IANA timezone deciding the rollup day
+
+    Returns:
+        dict: Dictionary containing:
+            - journal_analysis: Reference to the stored analysis (kind, workflow_id,
+              created_at, mood, category); load the full result with
+              storage.analysis_store.load_analysis. None when throttled
+            - throttled: Scope and retry delay when admission control rejected
+              the entry, else None
+    """
+    # Fast reject before any cache lookup or LLM call
+    admission = await AdmissionControl.admit(state.get("user_id"), "journal")
+    if not admission.admitted:
+        return {"journal_analysis": None, "throttled": admission.as_state()}
+
+    user_input = state.get("user_input") or {}
+    journal_entry = user_input.get("response", "")
+    timezone = user_input.get("timezone")
+    bypass_cache = bool(user_input.get("bypass_cache", False))
 
-    analysis_output = result.output
-    markdown_content = format_analysis_to_markdown(analysis_output)
+    if user_input.get("defer_analysis"):
+        cached = None
+        if JOURNAL_CACHE_ENABLED and not bypass_cache:
+            cached = await JournalAnalysisCache.get(journal_entry, ANALYSIS_VERSION, JournalAnalysis)
+        labels = predict_fast_labels(journal_entry) if cached is None else None
+        if labels is not None:
+            # The record the background task saves, so the reference matches it
+            pending = AnalysisRecord(
+                kind="journal",
+                workflow_id=state.get("workflow_id"),
+                user_id=state.get("user_id"),
+                data={},
+                summary={"mood": labels.mood, "category": labels.category},
+                timezone=timezone,
+            )
+            task = asyncio.create_task(_complete_deferred_analysis(
+                state.get("workflow_id"), state.get("user_id"), timezone, journal_entry, labels, pending.created_at
+            ))
+            _deferred_tasks.add(task)
+            task.add_done_callback(_deferred_tasks.discard)
+            await update_rollups(state.get("workflow_id"), state.get("user_id"), labels.mood, labels.category, timezone)
+            return {
+                "journal_analysis": {**pending.reference(), "analysis_pending": True},
+                "throttled": None,
+            }
+        if cached is not None:
+            return {
+                "journal_analysis": await persist_analysis(state.get("workflow_id"), state.get("user_id"), cached, timezone),
+                "throttled": None,
+            }
 
-    # Write file asynchronously
-    def write_file():
-        with open(f"journal_analyzed/{state.get('workflow_id')}.md", "w") as f:
-            f.write(markdown_content)
-    
-    await asyncio.to_thread(write_file)
+    analysis_output = await analyze_journal_entry(journal_entry, bypass_cache=bypass_cache)
 
     return {
-        "journal_analysis": analysis_output
+        "journal_analysis": await persist_analysis(state.get("workflow_id"), state.get("user_id"), analysis_output, timezone),
+        "throttled": None,
     }
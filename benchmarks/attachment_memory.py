@@ -0,0 +1,105 @@
+"""
+Peak memory benchmark for attachment ingestion.
+
+For each attachment size, measures the peak memory allocated while turning a
+local file and a base64 payload into prompt parts, comparing the previous
+ingestion (`Path.read_bytes` / `base64.b64decode`) with `file_to_prompt_parts`,
+plus a file over ATTACHMENT_MAX_BYTES that is rejected before it is read.
+Each case runs in a fresh process and reports both the traced Python heap peak
+and the growth in peak RSS over the process baseline.
+
+Usage:
+    python -m benchmarks.attachment_memory --sizes-mb 1 5 20
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+MB = 1024 * 1024
+
+
+async def _legacy_file(path: str, payload: str) -> None:
+    await asyncio.to_thread(Path(path).read_bytes)
+
+
+async def _legacy_base64(path: str, payload: str) -> None:
+    base64.b64decode(payload, validate=False)
+
+
+async def _current_file(path: str, payload: str) -> None:
+    from utils.file_input import file_to_prompt_parts
+    await file_to_prompt_parts("", {"path": path, "media_type": "application/pdf"})
+
+
+async def _current_base64(path: str, payload: str) -> None:
+    from utils.file_input import file_to_prompt_parts
+    await file_to_prompt_parts("", {"bytes": payload, "media_type": "application/pdf"})
+
+
+CASES = {
+    "file.legacy": _legacy_file,
+    "file.current": _current_file,
+    "base64.legacy": _legacy_base64,
+    "base64.current": _current_base64,
+    "file.over_limit": _current_file,
+}
+
+
+def _max_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _measure(case: str, path: str, size: int, queue) -> None:
+    os.environ["ATTACHMENT_MAX_BYTES"] = str(size // 2 if case == "file.over_limit" else size * 2)
+    import utils.file_input  # noqa: F401  (import cost is not part of the measurement)
+
+    payload = base64.b64encode(Path(path).read_bytes()).decode() if case.startswith("base64") else ""
+    baseline_rss = _max_rss_bytes()
+    tracemalloc.start()
+    # Awaited inside a coroutine that returns None: asyncio.run() reprs its return value
+    asyncio.run(CASES[case](path, payload))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    queue.put({"peak_heap_mb": round(peak / MB, 2), "peak_rss_growth_mb": round((_max_rss_bytes() - baseline_rss) / MB, 2)})
+
+
+def run(sizes_mb):
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for size_mb in sizes_mb:
+        size = int(size_mb * MB)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(os.urandom(size))
+        try:
+            row = {"attachment_mb": size_mb}
+            for case in CASES:
+                queue = context.Queue()
+                process = context.Process(target=_measure, args=(case, f.name, size, queue))
+                process.start()
+                row[case] = queue.get()
+                process.join()
+            results.append(row)
+        finally:
+            os.unlink(f.name)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 5, 20])
+    args = parser.parse_args()
+    print(json.dumps(run(args.sizes_mb), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Per-turn checkpoint latency under concurrent load: sync vs async Mongo checkpointer,
+and the Redis hot tier in front of the async one.
+
+Each simulated turn does what one graph invocation does to the checkpointer:
+load the thread's latest checkpoint, then store writes and a checkpoint for
+each superstep. Many users run turns concurrently on one event loop, so the
+"sync" mode (pymongo calls in the default thread pool) is compared with the
+"async" mode (native async driver) under the same load. The "hot" mode writes
+to Redis (RedisHotCheckpointer) and measures one flush of all threads to Mongo.
+
+Needs a reachable MongoDB (MONGO_CONNECTION_URL or --uri), and Redis
+(REDIS_URL) for the hot mode. Writes go to a throwaway database that is
+dropped afterwards; hot-mode threads are deleted from Redis.
+
+Usage:
+    python -m benchmarks.checkpoint_latency --users 50 --turns 10
+    python -m benchmarks.checkpoint_latency --modes async hot
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+async def run_turn(saver, thread_id: str, steps: int, payload: str):
+    from langgraph.checkpoint.base import empty_checkpoint
+
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    latest = await saver.aget_tuple(config)
+    if latest is not None:
+        config = latest.config
+    for step in range(steps):
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"agent_response": payload, "step": step}
+        config = await saver.aput(config, checkpoint, {"source": "loop", "step": step}, {})
+        await saver.aput_writes(config, [("agent_response", payload)], task_id=str(uuid.uuid4()))
+
+
+async def run_mode(mode: str, users: int, turns: int, steps: int, payload_bytes: int):
+    from storage.mongodb.checkpointer import mongo_checkpointer
+
+    payload = "x" * payload_bytes
+    latencies = []
+
+    async def user(index: int):
+        thread_id = f"bench-{mode}-{index}"
+        for _ in range(turns):
+            start = time.perf_counter()
+            await run_turn(saver, thread_id, steps, payload)
+            latencies.append(time.perf_counter() - start)
+
+    flush_seconds = None
+    async with mongo_checkpointer("sync" if mode == "sync" else "async") as saver:
+        if mode == "hot":
+            from storage.redis.checkpointer import RedisHotCheckpointer
+            saver = RedisHotCheckpointer(saver)
+        start = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(users)))
+        elapsed = time.perf_counter() - start
+        if mode == "hot":
+            flush_start = time.perf_counter()
+            await saver.flush_idle(idle_seconds=0)
+            flush_seconds = round(time.perf_counter() - flush_start, 3)
+            await asyncio.gather(*(saver.adelete_thread(f"bench-{mode}-{i}") for i in range(users)))
+
+    result = {
+        "turns": len(latencies),
+        "turns_per_second": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+    }
+    if flush_seconds is not None:
+        result["flush_all_seconds"] = flush_seconds
+    return result
+
+
+async def run(modes, users: int, turns: int, steps: int, payload_bytes: int):
+    from storage.mongodb.config import MONGO_CHECKPOINT_DB, close_mongo_clients, get_async_mongo_client
+
+    results = {"users": users, "turns_per_user": turns, "supersteps_per_turn": steps}
+    try:
+        for mode in modes:
+            results[mode] = await run_mode(mode, users, turns, steps, payload_bytes)
+    finally:
+        await get_async_mongo_client().drop_database(MONGO_CHECKPOINT_DB)
+        await close_mongo_clients()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=None, help="MongoDB URI (defaults to MONGO_CONNECTION_URL)")
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async", "hot"])
+    parser.add_argument("--users", type=int, default=50, help="Concurrent users")
+    parser.add_argument("--turns", type=int, default=10, help="Turns per user")
+    parser.add_argument("--steps", type=int, default=3, help="Supersteps (checkpoints) per turn")
+    parser.add_argument("--payload-bytes", type=int, default=4096, help="Size of the state written per step")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure them before importing the storage modules
+    if args.uri:
+        os.environ["MONGO_CONNECTION_URL"] = args.uri
+    os.environ["MONGO_CHECKPOINT_DB"] = f"checkpoint_benchmark_{uuid.uuid4().hex[:8]}"
+    print(json.dumps(asyncio.run(run(args.modes, args.users, args.turns, args.steps, args.payload_bytes)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
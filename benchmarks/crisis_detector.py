@@ -0,0 +1,49 @@
+"""
+Latency benchmark for the in-process crisis phrase detector.
+
+Measures the per-message cost of `detect_crisis` on ordinary companion turns
+of different lengths, plus the hit path, to confirm it only adds microseconds
+before the LLM call.
+
+Usage:
+    python -m benchmarks.crisis_detector --iterations 20000
+"""
+
+import argparse
+import json
+import timeit
+
+from agents.companion.crisis import detect_crisis
+
+MESSAGES = {
+    "short": "Good morning! How are you today?",
+    "medium": (
+        "Work has been really stressful this week, my manager keeps adding deadlines "
+        "and I barely slept. I went for a walk yesterday and it helped a little."
+    ),
+    "long": " ".join(["I had a long day and I just want to talk about everything that happened."] * 20),
+    "hit": "Honestly I don't want to live anymore, I keep thinking about ending my life",
+}
+
+
+def run(iterations: int):
+    results = {}
+    for name, message in MESSAGES.items():
+        seconds = min(timeit.repeat(lambda: detect_crisis(message), number=iterations, repeat=3))
+        results[name] = {
+            "chars": len(message),
+            "matched": detect_crisis(message),
+            "microseconds_per_call": round(seconds / iterations * 1e6, 2),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.iterations), indent=2))
+
+
+if __name__ == "__main__":
+    main()
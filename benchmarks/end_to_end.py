@@ -0,0 +1,429 @@
+"""
+End-to-end load test: companion turns, journal entries and scheduler ticks
+through the compiled workflow graph, against local stand-ins.
+
+- LLM: every agent is overridden with a stub model that waits a simulated
+  provider latency (fixed cost per request plus a cost per output token).
+- Redis: fakeredis (pip install fakeredis lupa; lupa runs the Lua scripts)
+  unless --redis-url points at a real, scratch Redis. Keys are not removed.
+- Checkpointer: in-memory (default), none, or --checkpointer mongo for the
+  repo's MongoDB checkpointer on a throwaway database (MONGO_CONNECTION_URL);
+  --hot puts the Redis hot tier in front of it. mongomock is not an option:
+  the checkpointer uses the async MongoDB driver, which mongomock lacks.
+- Analysis store and retrieval index: local files in a temporary directory.
+
+Users run concurrently, each doing its turns one after another. Sessions are
+registered with a short expiry so the first scheduler tick finds all of them
+expiring and analyses them; later ticks measure the steady-state scan.
+
+Every phase reports throughput, p50/p95/p99 latency, Redis round trips and
+bytes sent per turn, and bytes stored (Redis values via DUMP, checkpoints,
+analysis files) per turn, as JSON for comparing runs.
+
+Usage:
+    python -m benchmarks.end_to_end --users 50 --turns 5 --journal-entries 2
+    python -m benchmarks.end_to_end --checkpointer mongo --hot --output e2e.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+TEMP_DIR = tempfile.mkdtemp(prefix="e2e_benchmark_")
+
+# Settings are read at import time, so they are configured before any repo module is imported
+for _name, _value in {
+    "TRIGGER_OFFSET_MINUTES": "5",
+    "SCHEDULER_INTERVAL_SECONDS": "60",
+    "OPENROUTER_API_KEY": "benchmark",
+    "REDIS_URL": "redis://localhost:6379/15",
+}.items():
+    os.environ.setdefault(_name, _value)
+os.environ.update({
+    # Below the trigger offset, so every session is due at the first scheduler tick
+    "MESSAGE_EXPIRY_SECONDS": "240",
+    "ANALYSIS_STORE_BACKEND": "local",
+    "ANALYSIS_STORE_DIR": TEMP_DIR,
+    "RETRIEVAL_INDEX_DIR": os.path.join(TEMP_DIR, "conversation_index"),
+    "JOURNAL_FAST_CLASSIFIER_PATH": os.path.join(TEMP_DIR, "journal_classifier.npz"),
+    "TRACING_EXPORTER": "none",
+})
+
+COMPANION_OUTPUT = {"response": "That sounds like a lot. What part of it weighs on you most?", "confidence": 4}
+JOURNAL_OUTPUT = {
+    "mood": "hopeful",
+    "category": "reflection",
+    "analysis": "The person is processing a stressful day and looking for balance and self-compassion.",
+}
+CONVERSATION_OUTPUT = {
+    "session_metadata": {"companion_name": "Emma", "companion_gender": "female", "interaction_type": "emotional support"},
+    "intent_analysis": {
+        "primary_intent": "talk through work stress",
+        "secondary_intents": ["feel heard", "plan the week"],
+        "intent_fulfillment": "8 - the user felt heard and left with a plan",
+        "evolving_needs": "moved from venting to planning",
+    },
+    "emotional_profile": {
+        "initial_state": "overwhelmed",
+        "emotional_journey": ["frustrated", "reflective", "calmer"],
+        "final_state": "calmer",
+        "emotional_needs": ["validation", "structure"],
+        "triggers": ["deadlines"],
+    },
+    "relationship_dynamics": {
+        "interaction_style": "casual",
+        "trust_indicators": ["shared personal details"],
+        "companion_performance": "supportive and focused",
+        "attachment_signals": "comfortable returning user",
+    },
+    "contextual_insights": {
+        "session_quality": "good",
+        "user_engagement": "high",
+        "conversation_flow": "natural",
+        "preferred_topics": ["work", "running"],
+        "avoided_topics": ["family"],
+    },
+    "recommendations": {
+        "companion_improvements": ["ask about sleep"],
+        "user_patterns": "vents in the evening after work",
+        "future_session_guidance": "Check in on the deadline and whether the run helped.",
+    },
+}
+MESSAGES = [
+    "Work was a lot today, my manager moved the deadline again.",
+    "I went for a run afterwards and it helped a bit.",
+    "I keep worrying I'm not good enough at this job.",
+    "Maybe I should plan my week better.",
+    "Thanks, that actually helps.",
+]
+ENTRY = (
+    "Today felt long. Work kept piling up and I snapped at a colleague, which I regret. "
+    "In the evening I went for a run and felt a little lighter afterwards."
+)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def stub_model(output, base_latency: float, per_token_latency: float):
+    """A FunctionModel returning `output` (structured args, or text when it is a str) after a simulated delay."""
+    from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+    from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        payload = output if isinstance(output, str) else json.dumps(output)
+        await asyncio.sleep(base_latency + len(payload) // 4 * per_token_latency)
+        if isinstance(output, str):
+            return ModelResponse(parts=[TextPart(output)])
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, output)])
+
+    return FunctionModel(respond)
+
+
+class RedisTraffic:
+    """Counts Redis round trips (one per command, or per pipeline) and request bytes at the connection."""
+
+    def __init__(self):
+        self.round_trips = 0
+        self.bytes_sent = 0
+
+    def install(self):
+        from redis.asyncio.connection import AbstractConnection
+
+        send_packed_command = AbstractConnection.send_packed_command
+        traffic = self
+
+        async def counting_send(connection, command, check_health=True):
+            traffic.round_trips += 1
+            chunks = command if isinstance(command, (list, tuple)) else [command]
+            traffic.bytes_sent += sum(len(chunk) for chunk in chunks)
+            return await send_packed_command(connection, command, check_health)
+
+        AbstractConnection.send_packed_command = counting_send
+
+    def snapshot(self):
+        return self.round_trips, self.bytes_sent
+
+
+def payload_bytes(value) -> int:
+    """Bytes held in an in-memory saver structure (serialized blobs inside nested containers)."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, dict):
+        return sum(payload_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_bytes(v) for v in value)
+    return 0
+
+
+async def redis_stored_bytes(redis) -> int:
+    """Serialized size (DUMP) of every key."""
+    total = 0
+    async for key in redis.scan_iter(count=1000):
+        dumped = await redis.dump(key)
+        total += len(dumped or b"")
+    return total
+
+
+def directory_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.traffic = RedisTraffic()
+        self.run_id = uuid.uuid4().hex[:8]
+        self.cold = None
+        self.saver = None
+
+    async def stored_bytes(self):
+        from storage.redis.config import get_redis_client
+
+        stored = {
+            "redis": await redis_stored_bytes(await get_redis_client()),
+            "analysis_files": directory_bytes(TEMP_DIR),
+        }
+        if self.args.checkpointer == "memory":
+            stored["checkpoints"] = payload_bytes([self.cold.storage, self.cold.blobs, self.cold.writes])
+        elif self.args.checkpointer == "mongo":
+            from storage.mongodb.config import MONGO_CHECKPOINT_DB, get_async_mongo_client
+            stats = await get_async_mongo_client()[MONGO_CHECKPOINT_DB].command("dbStats")
+            stored["checkpoints"] = int(stats.get("dataSize", 0))
+        return stored
+
+    async def phase(self, jobs, concurrency):
+        """
+        Run jobs with bounded concurrency and report per-operation costs.
+
+        Args:
+            jobs: Coroutine factories, each returning the latencies of the operations it ran
+            concurrency: Jobs running at once
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(job):
+            async with semaphore:
+                return await job()
+
+        stored_before = await self.stored_bytes()
+        round_trips, bytes_sent = self.traffic.snapshot()
+        start = time.perf_counter()
+        latencies = [latency for result in await asyncio.gather(*(bounded(job) for job in jobs)) for latency in result]
+        elapsed = time.perf_counter() - start
+        round_trips_after, bytes_sent_after = self.traffic.snapshot()
+        stored_after = await self.stored_bytes()
+
+        count = len(latencies)
+        return {
+            "count": count,
+            "seconds": round(elapsed, 3),
+            "per_second": round(count / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+            "redis_round_trips_per_op": round((round_trips_after - round_trips) / count, 2),
+            "redis_bytes_sent_per_op": round((bytes_sent_after - bytes_sent) / count, 1),
+            "stored_bytes_per_op": {
+                store: round((stored_after[store] - stored_before.get(store, 0)) / count, 1)
+                for store in stored_after
+            },
+        }
+
+    async def run(self):
+        args = self.args
+        if args.redis_url is None:
+            try:
+                import fakeredis.aioredis
+            except ImportError:
+                sys.exit("fakeredis is not installed: pip install fakeredis lupa, or pass --redis-url")
+            import storage.redis.config as redis_config
+            redis_config.redis_client = fakeredis.aioredis.FakeRedis()
+        self.traffic.install()
+
+        from contextlib import AsyncExitStack
+        from langgraph.checkpoint.memory import InMemorySaver
+        from main import build_graph, with_system_durability
+        from agents.companion.companion import agent as companion_agent
+        from agents.companion.conversation_analyzer import agent as analyzer_agent
+        from agents.journal.journal_analyzer import journal_agent, journal_text_agent
+        from storage.redis.scheduler.conversation_scheduler import ConversationScheduler
+
+        latency = (args.llm_latency, args.llm_token_latency)
+        overrides = [
+            companion_agent.override(model=stub_model(COMPANION_OUTPUT, *latency)),
+            analyzer_agent.override(model=stub_model(CONVERSATION_OUTPUT, *latency)),
+            journal_agent.override(model=stub_model(JOURNAL_OUTPUT, *latency)),
+            journal_text_agent.override(model=stub_model(JOURNAL_OUTPUT["analysis"], *latency)),
+        ]
+
+        async with AsyncExitStack() as stack:
+            for override in overrides:
+                stack.enter_context(override)
+            if args.checkpointer == "memory":
+                self.cold = InMemorySaver()
+            elif args.checkpointer == "mongo":
+                from storage.mongodb.checkpointer import mongo_checkpointer
+                self.cold = await stack.enter_async_context(mongo_checkpointer())
+            self.saver = self.cold
+            if args.hot and self.cold is not None:
+                from storage.redis.checkpointer import RedisHotCheckpointer
+                self.saver = RedisHotCheckpointer(self.cold)
+
+            app = build_graph().compile(checkpointer=self.saver)
+            if self.saver is not None:
+                app = with_system_durability(app)
+
+            users = [f"bench-{self.run_id}-{i}" for i in range(args.users)]
+
+            async def timed(coroutine) -> float:
+                start = time.perf_counter()
+                await coroutine
+                return time.perf_counter() - start
+
+            def companion_turn(user_id, turn):
+                workflow_id = f"{user_id}-chat"
+                return app.ainvoke(
+                    {
+                        "user_id": user_id,
+                        "workflow_id": workflow_id,
+                        "system": "companion",
+                        "agent_name": "companion_agent",
+                        "user_input": {
+                            "response": MESSAGES[turn % len(MESSAGES)],
+                            "companion_name": "Emma",
+                            "companion_gender": "female",
+                            "timezone": "UTC",
+                        },
+                    },
+                    {"configurable": {"thread_id": workflow_id}},
+                )
+
+            def journal_entry(user_id, entry):
+                workflow_id = f"{user_id}-journal-{entry}"
+                return app.ainvoke(
+                    {
+                        "user_id": user_id,
+                        "workflow_id": workflow_id,
+                        "system": "journal",
+                        # Distinct text per entry: cache misses, the LLM path
+                        "user_input": {"response": f"{ENTRY} ({user_id} #{entry})", "timezone": "UTC"},
+                    },
+                    {"configurable": {"thread_id": workflow_id}},
+                )
+
+            def user_session(user_id):
+                # A user's turns are sequential; users run concurrently
+                async def job():
+                    return [await timed(companion_turn(user_id, turn)) for turn in range(args.turns)]
+                return job
+
+            def user_journal(user_id):
+                async def job():
+                    return [await timed(journal_entry(user_id, entry)) for entry in range(args.journal_entries)]
+                return job
+
+            results = {
+                "config": {
+                    "users": args.users,
+                    "turns_per_user": args.turns,
+                    "journal_entries_per_user": args.journal_entries,
+                    "scheduler_ticks": args.ticks,
+                    "llm_latency_seconds": args.llm_latency,
+                    "redis": "real" if args.redis_url else "fakeredis",
+                    "checkpointer": args.checkpointer,
+                    "hot_checkpoint_tier": bool(args.hot and self.cold is not None),
+                }
+            }
+
+            # Warm-up: imports, graph compilation and first connections stay out of the numbers
+            await companion_turn(f"bench-{self.run_id}-warmup", 0)
+
+            results["companion"] = await self.phase([user_session(user_id) for user_id in users], args.users)
+            if args.journal_entries:
+                results["journal"] = await self.phase([user_journal(user_id) for user_id in users], args.users)
+
+            if args.ticks:
+                scheduler = ConversationScheduler(graph_factory=lambda: app)
+                ticks = []
+
+                async def tick():
+                    start = time.perf_counter()
+                    ticks.append(await scheduler.run_manual_check())
+                    return [time.perf_counter() - start]
+
+                # The first tick finds every session expiring and analyses it; later ticks only scan
+                results["scheduler_first_tick"] = await self.phase([tick], 1)
+                results["scheduler_first_tick"]["sessions_analyzed"] = ticks[0]["successful_analyses"]
+                if args.ticks > 1:
+                    results["scheduler_steady_ticks"] = await self.phase([tick] * (args.ticks - 1), 1)
+
+            if args.hot and self.cold is not None:
+                flush_start = time.perf_counter()
+                report = await self.saver.flush_idle(idle_seconds=0)
+                results["hot_flush"] = {"seconds": round(time.perf_counter() - flush_start, 3), **report}
+
+        return results
+
+
+async def run(args):
+    harness = Harness(args)
+    try:
+        return await harness.run()
+    finally:
+        from storage.analysis_store import close_analysis_store
+        await close_analysis_store()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+        if args.checkpointer == "mongo":
+            from storage.mongodb.config import MONGO_CHECKPOINT_DB, close_mongo_clients, get_async_mongo_client
+            await get_async_mongo_client().drop_database(MONGO_CHECKPOINT_DB)
+            await close_mongo_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="Concurrent users")
+    parser.add_argument("--turns", type=int, default=5, help="Companion turns per user")
+    parser.add_argument("--journal-entries", type=int, default=2, help="Journal entries per user")
+    parser.add_argument("--ticks", type=int, default=3, help="Scheduler ticks after the turns (0 to skip)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Simulated seconds per LLM request")
+    parser.add_argument("--llm-token-latency", type=float, default=0.0, help="Simulated seconds per output token")
+    parser.add_argument("--redis-url", default=None, help="Use this (scratch) Redis instead of fakeredis")
+    parser.add_argument("--checkpointer", default="memory", choices=["memory", "mongo", "none"])
+    parser.add_argument("--hot", action="store_true", help="Put the Redis hot checkpoint tier in front of the checkpointer")
+    parser.add_argument("--admission", action="store_true", help="Keep admission control on (default: off, so limits do not skew the load)")
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.redis_url:
+        os.environ["REDIS_URL"] = args.redis_url
+    if args.checkpointer == "mongo":
+        os.environ["MONGO_CHECKPOINT_DB"] = f"checkpoint_benchmark_{uuid.uuid4().hex[:8]}"
+    if not args.admission:
+        os.environ["ADMISSION_ENABLED"] = "false"
+
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
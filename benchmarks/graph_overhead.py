@@ -0,0 +1,155 @@
+"""
+Per-invocation graph overhead: nested (router -> subgraph -> agent) vs flat layout.
+
+The agent nodes are replaced by stubs that return immediately, so the timings
+are the cost of LangGraph itself: routing, subgraph state copies and, with
+--checkpointer, checkpoint writes (an in-memory saver that counts them).
+With a checkpointer, runs use each system's configured durability
+(COMPANION_DURABILITY / JOURNAL_DURABILITY) unless --durability overrides it;
+compare with SUBGRAPH_CHECKPOINTING=true and --durability async for the
+write amplification of checkpointing every step of every graph level.
+
+Usage:
+    python -m benchmarks.graph_overhead --invocations 2000
+    python -m benchmarks.graph_overhead --checkpointer
+    SUBGRAPH_CHECKPOINTING=true python -m benchmarks.graph_overhead --checkpointer --durability async
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+
+# Settings modules require these; the values do not affect graph overhead
+for _name, _value in {"MESSAGE_EXPIRY_SECONDS": "2700", "TRIGGER_OFFSET_MINUTES": "5", "SCHEDULER_INTERVAL_SECONDS": "60"}.items():
+    os.environ.setdefault(_name, _value)
+
+FLOWS = {
+    "companion": {"system": "companion", "agent_name": "companion_agent"},
+    "conversation_analyzer": {"system": "companion", "agent_name": "conversation_analyzer_agent"},
+    "journal": {"system": "journal", "agent_name": None},
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def install_stub_agents():
+    """Swap the agent callables for no-op stubs before the graph modules import them."""
+    import agents.companion.companion as companion
+    import agents.companion.conversation_analyzer as conversation_analyzer
+    import agents.journal.journal_analyzer as journal_analyzer
+
+    async def companion_agent(state):
+        return {"agent_response": "ok", "previous_agent": "companion_agent"}
+
+    async def conversation_analyzer_agent(state):
+        reference = {"kind": "conversation", "workflow_id": state["workflow_id"], "primary_intent": "venting"}
+        return {"conversation_analyzed": reference, "previous_agent": "conversation_analyzer_agent"}
+
+    async def journal_analyzer_agent(state):
+        reference = {"kind": "journal", "workflow_id": state["workflow_id"], "mood": "calm", "category": "general"}
+        return {"journal_analysis": reference, "previous_agent": "journal_analyzer_agent"}
+
+    companion.companion_agent = companion_agent
+    conversation_analyzer.conversation_analyzer_agent = conversation_analyzer_agent
+    journal_analyzer.journal_analyzer_agent = journal_analyzer_agent
+
+
+def counting_saver():
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    class CountingSaver(InMemorySaver):
+        def __init__(self):
+            super().__init__()
+            self.checkpoint_count = 0
+            self.write_count = 0
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            self.checkpoint_count += 1
+            return await super().aput(config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            self.write_count += len(writes)
+            return await super().aput_writes(config, writes, task_id, task_path)
+
+    return CountingSaver()
+
+
+async def measure(layout: str, flow: str, invocations: int, warmup: int, checkpointer: bool, durability: str):
+    from main import build_graph, with_system_durability
+
+    saver = counting_saver() if checkpointer else None
+    app = build_graph(layout, sync_durability=True if durability == "sync" else None).compile(checkpointer=saver)
+    state = {"user_id": "bench", "workflow_id": "bench", **FLOWS[flow]}
+    kwargs = {}
+    if saver:
+        app = with_system_durability(app)
+        if durability != "system":
+            kwargs["durability"] = durability
+
+    async def invoke():
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        await app.ainvoke({**state, "workflow_id": config["configurable"]["thread_id"]}, config, **kwargs)
+
+    for _ in range(warmup):
+        await invoke()
+    if saver:
+        saver.checkpoint_count = saver.write_count = 0
+
+    latencies = []
+    for _ in range(invocations):
+        start = time.perf_counter()
+        await invoke()
+        latencies.append(time.perf_counter() - start)
+
+    result = {
+        "mean_us": round(statistics.mean(latencies) * 1e6, 1),
+        "p50_us": round(percentile(latencies, 50) * 1e6, 1),
+        "p95_us": round(percentile(latencies, 95) * 1e6, 1),
+        "p99_us": round(percentile(latencies, 99) * 1e6, 1),
+    }
+    if saver:
+        result["checkpoints_per_invocation"] = round(saver.checkpoint_count / invocations, 2)
+        result["writes_per_invocation"] = round(saver.write_count / invocations, 2)
+    return result
+
+
+async def run(invocations: int, warmup: int, checkpointer: bool, durability: str):
+    from config.settings import SUBGRAPH_CHECKPOINTING
+
+    results = {"invocations": invocations, "checkpointer": checkpointer}
+    if checkpointer:
+        results.update({"durability": durability, "subgraph_checkpointing": SUBGRAPH_CHECKPOINTING})
+    for flow in FLOWS:
+        results[flow] = {
+            layout: await measure(layout, flow, invocations, warmup, checkpointer, durability)
+            for layout in ("nested", "flat")
+        }
+        nested, flat = results[flow]["nested"]["mean_us"], results[flow]["flat"]["mean_us"]
+        results[flow]["flat_speedup"] = round(nested / flat, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invocations", type=int, default=2000, help="Measured invocations per layout and flow")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--checkpointer", action="store_true", help="Compile with a counting in-memory checkpointer")
+    parser.add_argument(
+        "--durability", default="system", choices=["system", "exit", "async", "sync"],
+        help="Checkpoint durability with --checkpointer; 'system' uses the per-system settings",
+    )
+    args = parser.parse_args()
+
+    install_stub_agents()
+    print(json.dumps(asyncio.run(run(args.invocations, args.warmup, args.checkpointer, args.durability)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Prompt token benchmark: stringified history dump vs native pydantic-ai message_history.
+
+Builds synthetic companion sessions of increasing length and compares, for the
+last turn of each session, the prompt tokens sent to the model and the bytes
+stored in Redis for the old `{history.messages}` repr dump and the new
+`ModelMessagesTypeAdapter` replay.
+
+Usage:
+    python -m benchmarks.history_tokens --turns 5 10 20 40 80
+"""
+
+import argparse
+import json
+
+from pydantic_ai.messages import (
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+USER_TURNS = [
+    "Good morning, I barely slept last night.",
+    "Work has been really stressful this week and my manager keeps adding deadlines.",
+    "I think I just need someone to listen without judging me.",
+    "Yeah, I tried going for a walk yesterday and it helped a little.",
+    "Thanks, that actually makes me feel a bit better.",
+]
+ASSISTANT_TURNS = [
+    "Good morning 🌿 I'm sorry the night was rough. What kept you up?",
+    "That sounds exhausting. Which deadline is weighing on you the most right now?",
+    "I'm right here and I'm listening. Take your time.",
+    "I'm glad the walk helped. Maybe we can plan a short one for today?",
+    "I'm really glad to hear that. You're doing better than you think.",
+]
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, otherwise ~4 characters per token."""
+    try:
+        import tiktoken
+
+        return len(tiktoken.get_encoding("o200k_base").encode(text))
+    except ImportError:
+        return max(1, len(text) // 4)
+
+
+def legacy_session(turns: int):
+    user_input = {"response": "", "companion_name": "Emma", "companion_gender": "female", "file": None}
+    return [
+        {
+            "user": {**user_input, "response": USER_TURNS[i % len(USER_TURNS)]},
+            "assistant": ASSISTANT_TURNS[i % len(ASSISTANT_TURNS)],
+        }
+        for i in range(turns)
+    ]
+
+
+def native_session(turns: int):
+    messages = []
+    for i in range(turns):
+        parts = [UserPromptPart(content=USER_TURNS[i % len(USER_TURNS)])]
+        if i == 0:
+            parts.insert(0, SystemPromptPart("companion_name: Emma\ncompanion_gender: female", dynamic_ref="companion_persona"))
+        else:
+            parts.insert(0, ToolReturnPart("final_result", "Final result processed.", tool_call_id=f"call_{i - 1}"))
+        messages.append(ModelRequest(parts=parts))
+        messages.append(ModelResponse(parts=[ToolCallPart(
+            "final_result",
+            {"response": ASSISTANT_TURNS[i % len(ASSISTANT_TURNS)], "confidence": 5},
+            tool_call_id=f"call_{i}",
+        )]))
+    return messages
+
+
+def legacy_prompt_tokens(history, user_input) -> int:
+    composed_input = f"""
+        # Conversation History: 
+        {history}
+        
+        # User's Input:
+        - user_response: {user_input['response']}
+        - companion_name: {user_input['companion_name']}
+        - companion_gender: {user_input['companion_gender']}
+    """
+    return count_tokens(composed_input)
+
+
+def native_prompt_tokens(messages, user_prompt: str) -> int:
+    # Approximate chat-completions framing: ~4 tokens of overhead per message
+    total = count_tokens(user_prompt) + 4
+    for message in messages:
+        for part in message.parts:
+            if isinstance(part, ToolCallPart):
+                total += count_tokens(part.tool_name + part.args_as_json_str()) + 4
+            elif isinstance(part, (SystemPromptPart, UserPromptPart, ToolReturnPart)):
+                total += count_tokens(str(part.content)) + 4
+    return total
+
+
+def run(turn_counts):
+    rows = []
+    for turns in turn_counts:
+        history = legacy_session(turns - 1)
+        current = {"response": USER_TURNS[(turns - 1) % len(USER_TURNS)], "companion_name": "Emma", "companion_gender": "female"}
+        messages = native_session(turns - 1)
+        legacy_tokens = legacy_prompt_tokens(history, current)
+        native_tokens = native_prompt_tokens(messages, current["response"])
+        rows.append({
+            "turns": turns,
+            "legacy_prompt_tokens": legacy_tokens,
+            "native_prompt_tokens": native_tokens,
+            "token_reduction_pct": round(100 * (1 - native_tokens / legacy_tokens), 1),
+            "legacy_redis_bytes": len(json.dumps(legacy_session(turns))),
+            "native_redis_bytes": len(ModelMessagesTypeAdapter.dump_json(native_session(turns))),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[5, 10, 20, 40, 80])
+    args = parser.parse_args()
+    print(json.dumps(run(args.turns), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Import-time budget check using `python -X importtime`.
+
+Imports each module in a fresh interpreter several times and reports the best
+cumulative import time, the slowest direct dependencies, and (for main) the
+cost of building and compiling the graph on first use. Exits non-zero when a
+module exceeds --budget-ms, so it can gate CI.
+
+Usage:
+    python -m benchmarks.import_time --budget-ms 300
+    python -m benchmarks.import_time --modules main agents.companion.companion
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+BUILD_SNIPPET = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.make_graph()
+print((imported - start) * 1000, (time.perf_counter() - imported) * 1000)
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    # Settings modules require these; the values do not affect import cost
+    for name, value in {"MESSAGE_EXPIRY_SECONDS": "2700", "TRIGGER_OFFSET_MINUTES": "5", "SCHEDULER_INTERVAL_SECONDS": "60"}.items():
+        env.setdefault(name, value)
+    return env
+
+
+def measure_import(module: str, repeat: int, top: int):
+    best, best_lines = None, []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, env=_env(),
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+        lines = [m.groups() for m in map(LINE.match, result.stderr.splitlines()) if m]
+        total = next(int(cumulative) for _, cumulative, _, name in reversed(lines) if name == module)
+        if best is None or total < best:
+            best, best_lines = total, lines
+
+    # Direct children of the module: one indent level (two spaces) below it in the importtime tree
+    module_indent = next(len(indent) for _, _, indent, name in reversed(best_lines) if name == module)
+    direct = [
+        (name, int(cumulative)) for _, cumulative, indent, name in best_lines if len(indent) == module_indent + 2
+    ]
+    direct.sort(key=lambda item: item[1], reverse=True)
+    return {
+        "import_ms": round(best / 1000, 1),
+        "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in direct[:top]},
+    }
+
+
+def measure_first_build(repeat: int):
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", BUILD_SNIPPET], capture_output=True, text=True, env=_env())
+        if result.returncode != 0:
+            raise RuntimeError(f"building the graph failed:\n{result.stderr[-2000:]}")
+        import_ms, build_ms = map(float, result.stdout.split())
+        if best is None or import_ms + build_ms < sum(best):
+            best = (import_ms, build_ms)
+    return {"import_ms": round(best[0], 1), "first_build_ms": round(best[1], 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=["main"])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module; the best run is reported")
+    parser.add_argument("--top", type=int, default=8, help="Slowest direct imports to list")
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="Maximum import time per module")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = {module: measure_import(module, args.repeat, args.top) for module in args.modules}
+    if "main" in args.modules:
+        results["main"]["wall_clock"] = measure_first_build(args.repeat)
+    over_budget = [module for module, result in results.items() if result["import_ms"] > args.budget_ms]
+
+    print(json.dumps({
+        "budget_ms": args.budget_ms,
+        "over_budget": over_budget,
+        "modules": results,
+        "benchmark_seconds": round(time.perf_counter() - start, 1),
+    }, indent=2))
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
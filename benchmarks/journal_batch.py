@@ -0,0 +1,113 @@
+"""
+Throughput benchmark: per-entry journal analysis vs batched analysis.
+
+Both paths run against a stub model that simulates provider latency as a fixed
+per-request cost plus a per-output-token cost, so the numbers reflect request
+overhead saved by batching rather than real model quality. Both store every
+analysis, as journal_analyzer_agent does, in a local analysis store in a
+temporary directory; the cache, mood rollups (Redis) and fast classifier are off.
+
+Usage:
+    python -m benchmarks.journal_batch --entries 100 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("MESSAGE_EXPIRY_SECONDS", "2700")
+os.environ.setdefault("TRIGGER_OFFSET_MINUTES", "5")
+os.environ.setdefault("SCHEDULER_INTERVAL_SECONDS", "60")
+os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+os.environ["JOURNAL_CACHE_ENABLED"] = "false"
+os.environ["JOURNAL_ROLLUPS_ENABLED"] = "false"
+os.environ["JOURNAL_FAST_CLASSIFIER_ENABLED"] = "false"
+os.environ["ANALYSIS_STORE_BACKEND"] = "local"
+os.environ["ANALYSIS_STORE_DIR"] = tempfile.mkdtemp(prefix="journal_batch_benchmark_")
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart, UserPromptPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agents.journal.journal_analyzer import journal_agent, analyze_journal_entry, persist_analysis
+from agents.journal.batch_analyzer import batch_journal_agent, analyze_journal_entries
+
+ENTRY = (
+    "Today felt long. Work kept piling up and I snapped at a colleague, which I regret. "
+    "In the evening I went for a run and felt a little lighter afterwards. "
+    "I want to be kinder to myself and plan my week better."
+)
+ANALYSIS = {
+    "mood": "hopeful",
+    "category": "reflection",
+    "analysis": "The person is processing a stressful day and looking for balance and self-compassion.",
+}
+ENTRY_HEADER = re.compile(r"## Entry (\d+)")
+
+
+def stub_model(base_latency: float, per_token_latency: float) -> FunctionModel:
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        prompt = "".join(
+            str(part.content) for part in messages[-1].parts if isinstance(part, UserPromptPart)
+        )
+        indexes = [int(i) for i in ENTRY_HEADER.findall(prompt)]
+        if indexes:
+            args = {"results": [{"index": i, **ANALYSIS} for i in indexes]}
+        else:
+            args = ANALYSIS
+        output_tokens = len(json.dumps(args)) // 4
+        await asyncio.sleep(base_latency + output_tokens * per_token_latency)
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, args)])
+
+    return FunctionModel(respond)
+
+
+async def run(entries: int, concurrency: int, base_latency: float, per_token_latency: float):
+    texts = [f"{ENTRY} ({i})" for i in range(entries)]
+    model = stub_model(base_latency, per_token_latency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def single(text):
+        async with semaphore:
+            analysis = await analyze_journal_entry(text, bypass_cache=True)
+        return await persist_analysis(str(uuid.uuid4()), "benchmark", analysis)
+
+    with journal_agent.override(model=model):
+        start = time.perf_counter()
+        await asyncio.gather(*(single(text) for text in texts))
+        per_entry_seconds = time.perf_counter() - start
+
+    with batch_journal_agent.override(model=model):
+        start = time.perf_counter()
+        workflow_ids = [str(uuid.uuid4()) for _ in texts]
+        results = await analyze_journal_entries(texts, workflow_ids, "benchmark", bypass_cache=True, concurrency=concurrency)
+        batch_seconds = time.perf_counter() - start
+
+    assert len(results) == entries
+    return {
+        "entries": entries,
+        "concurrency": concurrency,
+        "per_entry_seconds": round(per_entry_seconds, 3),
+        "per_entry_entries_per_second": round(entries / per_entry_seconds, 2),
+        "batch_seconds": round(batch_seconds, 3),
+        "batch_entries_per_second": round(entries / batch_seconds, 2),
+        "speedup": round(per_entry_seconds / batch_seconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--base-latency", type=float, default=0.5, help="Simulated seconds per LLM request")
+    parser.add_argument("--per-token-latency", type=float, default=0.002, help="Simulated seconds per output token")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.entries, args.concurrency, args.base_latency, args.per_token_latency)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
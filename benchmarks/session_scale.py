@@ -0,0 +1,375 @@
+"""
+Scale curve for SessionRegistry and the ConversationScheduler tick.
+
+For each session count (default 10k, 100k, 1M) the Redis database is filled
+with synthetic sessions as save_messages_to_redis leaves them: a
+"session:{workflow_id}" JSON key plus a "workflow:{workflow_id}:messages:..."
+history key. TTLs are spread uniformly over MESSAGE_EXPIRY_SECONDS, as with
+sessions registered steadily over time. Sessions already inside the trigger
+window one scheduler interval ago are marked analyzed, as earlier ticks would
+have left them.
+
+Against that data it measures, per registry implementation:
+- get_sessions_expiring_soon
+- a full scheduler tick (ConversationScheduler.run_manual_check, which also
+  calls mark_session_analyzed for every session it analyses); the analysis
+  itself is a stub graph, so only registry and scheduler costs are measured
+- cleanup_expired_sessions
+
+Each reports duration, client round trips, server-side command counts and
+Redis CPU time (INFO commandstats / cpu), plus the memory the keys take.
+
+Implementations:
+- "scan": SessionRegistry as shipped (SCAN with the server's default COUNT,
+  then TTL and GET per key).
+- "pipelined": a variant defined here for comparison, not used by the app.
+  It SCANs 1000 keys at a time, pipelines the TTL and GET calls per batch and
+  marks sessions with SET KEEPTTL.
+
+The database is flushed between runs, so point --redis-url at a dedicated,
+empty database of a local Redis; the run stops if the database is not empty,
+unless --flush is passed. Without --redis-url it runs on fakeredis (pip install
+fakeredis). That is only good for smoke runs at small sizes: fakeredis has no
+server CPU or command stats, and its memory figure is estimated from DUMP sizes.
+
+Usage:
+    python -m benchmarks.session_scale --redis-url redis://localhost:6379/15
+    python -m benchmarks.session_scale --sizes 10000 --implementations pipelined
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+for _name, _value in {
+    "MESSAGE_EXPIRY_SECONDS": "2700",
+    "TRIGGER_OFFSET_MINUTES": "5",
+    "SCHEDULER_INTERVAL_SECONDS": "60",
+    "OPENROUTER_API_KEY": "benchmark",
+    "TRACING_EXPORTER": "none",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+FILL_BATCH_SIZE = 10_000
+SCAN_COUNT = 1000
+AGENT_NAME = "companion_agent"
+
+
+def session_registry_variants():
+    """The registry implementations to compare, by name."""
+    from storage.redis.config import get_redis_client
+    from storage.redis.session_registry import SessionRegistry
+
+    class PipelinedSessionRegistry(SessionRegistry):
+        """SessionRegistry with batched SCAN and pipelined per-key commands."""
+
+        @classmethod
+        async def _scan_batches(cls, redis):
+            cursor = 0
+            while True:
+                cursor, keys = await redis.scan(cursor, match=f"{cls.SESSION_KEY_PREFIX}*", count=SCAN_COUNT)
+                if keys:
+                    yield keys
+                if cursor == 0:
+                    return
+
+        @classmethod
+        async def get_sessions_expiring_soon(cls, offset_minutes: int = 5):
+            redis = await get_redis_client()
+            offset_seconds = offset_minutes * 60
+            expiring_sessions = []
+            async for keys in cls._scan_batches(redis):
+                async with redis.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        pipe.ttl(key)
+                    ttls = await pipe.execute()
+                due = [(key, ttl) for key, ttl in zip(keys, ttls) if 0 < ttl <= offset_seconds]
+                if not due:
+                    continue
+                async with redis.pipeline(transaction=False) as pipe:
+                    for key, _ in due:
+                        pipe.get(key)
+                    values = await pipe.execute()
+                for (key, ttl), value in zip(due, values):
+                    if value:
+                        session_data = json.loads(value)
+                        session_data["ttl_seconds"] = ttl
+                        expiring_sessions.append(session_data)
+            return expiring_sessions
+
+        @classmethod
+        async def mark_session_analyzed(cls, workflow_id: str) -> bool:
+            redis = await get_redis_client()
+            session_key = f"{cls.SESSION_KEY_PREFIX}{workflow_id}"
+            session_json = await redis.get(session_key)
+            if not session_json:
+                return False
+            session_data = json.loads(session_json)
+            session_data["analyzed"] = True
+            session_data["analyzed_at"] = datetime.now(timezone.utc).isoformat()
+            return bool(await redis.set(session_key, json.dumps(session_data), keepttl=True))
+
+        @classmethod
+        async def cleanup_expired_sessions(cls) -> int:
+            redis = await get_redis_client()
+            cleaned_count = 0
+            async for keys in cls._scan_batches(redis):
+                async with redis.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        pipe.ttl(key)
+                    cleaned_count += sum(1 for ttl in await pipe.execute() if ttl == -2)
+            return cleaned_count
+
+    return {"scan": SessionRegistry, "pipelined": PipelinedSessionRegistry}
+
+
+@contextmanager
+def registry_in_use(registry):
+    """Make the scheduler use this registry implementation."""
+    import storage.redis.scheduler.conversation_scheduler as conversation_scheduler
+
+    shipped = conversation_scheduler.SessionRegistry
+    conversation_scheduler.SessionRegistry = registry
+    try:
+        yield
+    finally:
+        conversation_scheduler.SessionRegistry = shipped
+
+
+class StubAnalysisGraph:
+    """Stands in for the compiled graph, so a tick measures only registry and scheduler work."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def ainvoke(self, state, config=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return {"agent_response": "analyzed"}
+
+
+class RedisCounters:
+    """Client round trips, and server command counts and CPU time where INFO provides them."""
+
+    def __init__(self):
+        self.round_trips = 0
+
+    def install(self):
+        from redis.asyncio.connection import AbstractConnection
+
+        send_packed_command = AbstractConnection.send_packed_command
+        counters = self
+
+        async def counting_send(connection, command, check_health=True):
+            counters.round_trips += 1
+            return await send_packed_command(connection, command, check_health)
+
+        AbstractConnection.send_packed_command = counting_send
+
+    async def snapshot(self, redis):
+        # Read before the INFO calls below, which are not part of the measured operation
+        round_trips = self.round_trips
+        server = {}
+        try:
+            stats = await redis.info("commandstats")
+            server["commands"] = {
+                name[len("cmdstat_"):]: values["calls"] for name, values in stats.items() if name.startswith("cmdstat_")
+            }
+            cpu = await redis.info("cpu")
+            server["cpu_seconds"] = float(cpu["used_cpu_sys"]) + float(cpu["used_cpu_user"])
+        except Exception:
+            pass
+        return round_trips, server
+
+
+async def measure(counters, redis, operation):
+    """Run one operation and report its duration, round trips and server-side cost."""
+    _, server = await counters.snapshot(redis)
+    round_trips = counters.round_trips
+    start = time.perf_counter()
+    result = await operation()
+    elapsed = time.perf_counter() - start
+    round_trips_after, server_after = await counters.snapshot(redis)
+
+    report = {"seconds": round(elapsed, 4), "redis_round_trips": round_trips_after - round_trips}
+    if "commands" in server_after:
+        # The INFO calls between the snapshots are excluded
+        commands = {
+            name: calls - server["commands"].get(name, 0)
+            for name, calls in server_after["commands"].items()
+            if name != "info" and calls != server["commands"].get(name, 0)
+        }
+        report["redis_commands"] = sum(commands.values())
+        report["redis_commands_by_type"] = dict(sorted(commands.items(), key=lambda item: -item[1]))
+        report["redis_cpu_seconds"] = round(server_after["cpu_seconds"] - server["cpu_seconds"], 4)
+    return result, report
+
+
+async def used_memory(redis):
+    """Bytes used by the keyspace: INFO memory, or an estimate from sampled DUMP sizes when INFO lacks it."""
+    try:
+        return int((await redis.info("memory"))["used_memory"]), "info"
+    except Exception:
+        pass
+    keys = await redis.dbsize()
+    if not keys:
+        return 0, "dump_estimate"
+    sample = []
+    async for key in redis.scan_iter(count=SCAN_COUNT):
+        sample.append(key)
+        if len(sample) >= 1000:
+            break
+    dumped = [len(await redis.dump(key) or b"") + len(key) for key in sample]
+    return int(sum(dumped) / len(dumped) * keys), "dump_estimate"
+
+
+async def fill(redis, sessions: int, message_bytes: int, seed: int):
+    """
+    Write the synthetic sessions and their message histories.
+
+    Returns:
+        dict: Sessions written, how many are inside the trigger window, and the fill time
+    """
+    from storage.redis.config import MESSAGE_EXPIRY_SECONDS, SCHEDULER_INTERVAL_SECONDS, TRIGGER_OFFSET_MINUTES
+    from storage.redis.session_registry import SessionRegistry
+
+    rng = random.Random(seed)
+    offset_seconds = TRIGGER_OFFSET_MINUTES * 60
+    history = json.dumps([{"parts": [{"content": "x" * message_bytes, "part_kind": "user-prompt"}], "kind": "request"}])
+    registered_at = datetime.now(timezone.utc).isoformat()
+    due = analyzed = 0
+
+    start = time.perf_counter()
+    for batch_start in range(0, sessions, FILL_BATCH_SIZE):
+        async with redis.pipeline(transaction=False) as pipe:
+            for i in range(batch_start, min(sessions, batch_start + FILL_BATCH_SIZE)):
+                workflow_id = f"scale-{i}"
+                ttl = rng.randint(1, MESSAGE_EXPIRY_SECONDS)
+                # Inside the window since the previous tick: that tick already analysed it
+                already_analyzed = ttl <= offset_seconds - SCHEDULER_INTERVAL_SECONDS
+                due += ttl <= offset_seconds
+                analyzed += already_analyzed
+                session = {
+                    "user_id": f"user-{i % max(1, sessions // 3)}",
+                    "workflow_id": workflow_id,
+                    "agent_name": AGENT_NAME,
+                    "registered_at": registered_at,
+                    "analyzed": already_analyzed,
+                }
+                pipe.set(f"{SessionRegistry.SESSION_KEY_PREFIX}{workflow_id}", json.dumps(session), ex=ttl)
+                if message_bytes:
+                    pipe.set(f"workflow:{workflow_id}:messages:{AGENT_NAME}", history, ex=ttl)
+            await pipe.execute()
+    return {
+        "sessions": sessions,
+        "sessions_expiring": due,
+        "sessions_to_analyze": due - analyzed,
+        "fill_seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+async def run_size(redis, counters, name, registry, sessions, args):
+    from storage.redis.config import TRIGGER_OFFSET_MINUTES
+    from storage.redis.scheduler.conversation_scheduler import ConversationScheduler
+
+    await redis.flushdb()
+    memory_empty, _ = await used_memory(redis)
+    point = await fill(redis, sessions, args.message_bytes, args.seed)
+    memory_full, method = await used_memory(redis)
+    point["memory_bytes"] = memory_full - memory_empty
+    point["memory_bytes_per_session"] = round(point["memory_bytes"] / sessions, 1)
+    point["memory_method"] = method
+
+    expiring, point["get_sessions_expiring_soon"] = await measure(
+        counters, redis, lambda: registry.get_sessions_expiring_soon(offset_minutes=TRIGGER_OFFSET_MINUTES)
+    )
+    point["get_sessions_expiring_soon"]["sessions_found"] = len(expiring)
+
+    with registry_in_use(registry):
+        scheduler = ConversationScheduler(graph_factory=lambda: StubAnalysisGraph(args.analysis_latency))
+        tick, point["tick"] = await measure(counters, redis, scheduler.run_manual_check)
+    point["tick"]["sessions_analyzed"] = tick["successful_analyses"]
+    if tick.get("error"):
+        point["tick"]["error"] = tick["error"]
+
+    _, point["cleanup_expired_sessions"] = await measure(counters, redis, registry.cleanup_expired_sessions)
+    print(f"{name} {sessions}: tick {point['tick']['seconds']}s", file=sys.stderr)
+    return point
+
+
+async def run(args):
+    import logging
+
+    # The scheduler logs every analysis it triggers; keep the output to the report
+    logging.disable(logging.INFO)
+    if args.redis_url is None:
+        try:
+            import fakeredis.aioredis
+        except ImportError:
+            sys.exit("fakeredis is not installed: pip install fakeredis, or pass --redis-url")
+        import storage.redis.config as redis_config
+        redis_config.redis_client = fakeredis.aioredis.FakeRedis()
+
+    from storage.redis.config import get_redis_client
+
+    redis = await get_redis_client()
+    if await redis.dbsize() and not args.flush:
+        sys.exit("The Redis database is not empty; use a dedicated database or pass --flush to empty it")
+
+    counters = RedisCounters()
+    counters.install()
+    variants = session_registry_variants()
+    curves = {}
+    try:
+        for name in args.implementations:
+            curves[name] = [
+                await run_size(redis, counters, name, variants[name], sessions, args)
+                for sessions in sorted(args.sizes)
+            ]
+    finally:
+        await redis.flushdb()
+
+    from storage.redis.config import MESSAGE_EXPIRY_SECONDS, SCHEDULER_INTERVAL_SECONDS, TRIGGER_OFFSET_MINUTES
+    return {
+        "config": {
+            "redis": "real" if args.redis_url else "fakeredis",
+            "message_expiry_seconds": MESSAGE_EXPIRY_SECONDS,
+            "trigger_offset_minutes": TRIGGER_OFFSET_MINUTES,
+            "scheduler_interval_seconds": SCHEDULER_INTERVAL_SECONDS,
+            "message_bytes": args.message_bytes,
+            "analysis_latency_seconds": args.analysis_latency,
+        },
+        "curves": curves,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Session counts")
+    parser.add_argument("--implementations", nargs="+", default=["scan", "pipelined"], choices=["scan", "pipelined"])
+    parser.add_argument("--message-bytes", type=int, default=2000, help="Size of each session's message history (0 for none)")
+    parser.add_argument("--analysis-latency", type=float, default=0.0, help="Simulated seconds per conversation analysis")
+    parser.add_argument("--redis-url", default=None, help="A dedicated local Redis database (default: fakeredis)")
+    parser.add_argument("--flush", action="store_true", help="Empty the database first even if it holds keys")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.redis_url:
+        os.environ["REDIS_URL"] = args.redis_url
+
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
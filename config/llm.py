@@ -1,23 +1,16 @@
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.openrouter import OpenRouterProvider
-import os
+from utils.image_preprocess import ImageProfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+# Models are "provider:model" names that pydantic-ai resolves on an agent's first run
+# (the agents use defer_model_check=True), so importing an agent does not load the
+# OpenAI SDK. The OpenRouter provider reads OPENROUTER_API_KEY from the environment.
+companion_llm = "openrouter:openai/gpt-4.1-mini"
 
-companion_llm = OpenAIChatModel(
-    'openai/gpt-4.1-mini',
-    provider=OpenRouterProvider(api_key=OPENROUTER_API_KEY),
-)
+# Image attachment preprocessing for the companion model; defaults come from IMAGE_* settings
+companion_image_profile = ImageProfile()
 
-conversation_analyzer_llm = OpenAIChatModel(
-    'deepseek/deepseek-chat-v3.1',
-    provider=OpenRouterProvider(api_key=OPENROUTER_API_KEY),
-)
+conversation_analyzer_llm = "openrouter:deepseek/deepseek-chat-v3.1"
 
-journal_analyzer_llm = OpenAIChatModel(
-    'deepseek/deepseek-chat-v3.1',
-    provider=OpenRouterProvider(api_key=OPENROUTER_API_KEY),
-)
\ No newline at end of file
+journal_analyzer_llm = "openrouter:deepseek/deepseek-chat-v3.1"
@@ -0,0 +1,99 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Workflow graph layout: "nested" (router -> system subgraph -> agent) or "flat" (single dispatch to the agent node)
+GRAPH_LAYOUT = os.getenv("GRAPH_LAYOUT", "nested")
+
+# Checkpoint durability per system: "exit" (final state only), "async" (every step, written in the background) or "sync"
+COMPANION_DURABILITY = os.getenv("COMPANION_DURABILITY", "exit")
+JOURNAL_DURABILITY = os.getenv("JOURNAL_DURABILITY", "exit")
+# Checkpoint the steps inside the system subgraphs (nested layout); nothing resumes them mid-subgraph
+SUBGRAPH_CHECKPOINTING = os.getenv("SUBGRAPH_CHECKPOINTING", "false").lower() == "true"
+
+# Timezone used when the client does not send one with the user input
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Asia/Kolkata")
+
+# Opt-in fallback: expose get_date/get_time as agent tools in addition to the injected time context
+COMPANION_TIME_TOOLS = os.getenv("COMPANION_TIME_TOOLS", "false").lower() == "true"
+
+# Journal analysis result cache
+JOURNAL_CACHE_ENABLED = os.getenv("JOURNAL_CACHE_ENABLED", "true").lower() == "true"
+JOURNAL_CACHE_TTL_SECONDS = int(os.getenv("JOURNAL_CACHE_TTL_SECONDS", "604800"))
+
+# Batch journal analysis
+JOURNAL_BATCH_TOKEN_BUDGET = int(os.getenv("JOURNAL_BATCH_TOKEN_BUDGET", "6000"))
+JOURNAL_BATCH_MAX_ENTRIES = int(os.getenv("JOURNAL_BATCH_MAX_ENTRIES", "20"))
+JOURNAL_BATCH_CONCURRENCY = int(os.getenv("JOURNAL_BATCH_CONCURRENCY", "4"))
+
+# Local fast-path journal mood/category classifier
+JOURNAL_FAST_CLASSIFIER_ENABLED = os.getenv("JOURNAL_FAST_CLASSIFIER_ENABLED", "true").lower() == "true"
+JOURNAL_FAST_CLASSIFIER_PATH = os.getenv("JOURNAL_FAST_CLASSIFIER_PATH", "models/journal_classifier.npz")
+JOURNAL_FAST_CLASSIFIER_THRESHOLD = float(os.getenv("JOURNAL_FAST_CLASSIFIER_THRESHOLD", "0.8"))
+JOURNAL_FAST_CLASSIFIER_MIN_EXAMPLES = int(os.getenv("JOURNAL_FAST_CLASSIFIER_MIN_EXAMPLES", "200"))
+
+# Per-user daily/weekly journal mood and category rollups in Redis
+JOURNAL_ROLLUPS_ENABLED = os.getenv("JOURNAL_ROLLUPS_ENABLED", "true").lower() == "true"
+JOURNAL_ROLLUP_DAILY_RETENTION_DAYS = int(os.getenv("JOURNAL_ROLLUP_DAILY_RETENTION_DAYS", "90"))
+JOURNAL_ROLLUP_WEEKLY_RETENTION_WEEKS = int(os.getenv("JOURNAL_ROLLUP_WEEKLY_RETENTION_WEEKS", "104"))
+
+# Long-term user profile merged from conversation analyses and injected into companion prompts
+USER_PROFILE_ENABLED = os.getenv("USER_PROFILE_ENABLED", "true").lower() == "true"
+USER_PROFILE_TOKEN_BUDGET = int(os.getenv("USER_PROFILE_TOKEN_BUDGET", "200"))
+USER_PROFILE_DECAY = float(os.getenv("USER_PROFILE_DECAY", "0.8"))
+USER_PROFILE_TTL_SECONDS = int(os.getenv("USER_PROFILE_TTL_SECONDS", "15552000"))
+
+# Local retrieval of relevant past conversation analyses for companion prompts (hashed vectors, memory-mapped)
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "true").lower() == "true"
+RETRIEVAL_INDEX_DIR = os.getenv("RETRIEVAL_INDEX_DIR", "models/conversation_index")
+RETRIEVAL_DIMENSIONS = int(os.getenv("RETRIEVAL_DIMENSIONS", "8192"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.1"))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "150"))
+RETRIEVAL_MAX_SESSIONS_PER_USER = int(os.getenv("RETRIEVAL_MAX_SESSIONS_PER_USER", "500"))
+RETRIEVAL_COMPACT_MIN_ROWS = int(os.getenv("RETRIEVAL_COMPACT_MIN_ROWS", "1000"))
+
+# Admission control: Redis token buckets per user, per system and globally (0 disables a scope)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_USER_RATE_PER_MINUTE = float(os.getenv("ADMISSION_USER_RATE_PER_MINUTE", "20"))
+ADMISSION_USER_BURST = int(os.getenv("ADMISSION_USER_BURST", "10"))
+ADMISSION_COMPANION_RATE_PER_MINUTE = float(os.getenv("ADMISSION_COMPANION_RATE_PER_MINUTE", "600"))
+ADMISSION_COMPANION_BURST = int(os.getenv("ADMISSION_COMPANION_BURST", "100"))
+ADMISSION_JOURNAL_RATE_PER_MINUTE = float(os.getenv("ADMISSION_JOURNAL_RATE_PER_MINUTE", "300"))
+ADMISSION_JOURNAL_BURST = int(os.getenv("ADMISSION_JOURNAL_BURST", "50"))
+ADMISSION_GLOBAL_RATE_PER_MINUTE = float(os.getenv("ADMISSION_GLOBAL_RATE_PER_MINUTE", "900"))
+ADMISSION_GLOBAL_BURST = int(os.getenv("ADMISSION_GLOBAL_BURST", "150"))
+ADMISSION_SYSTEM_LIMITS = {
+    "companion": (ADMISSION_COMPANION_RATE_PER_MINUTE, ADMISSION_COMPANION_BURST),
+    "journal": (ADMISSION_JOURNAL_RATE_PER_MINUTE, ADMISSION_JOURNAL_BURST),
+}
+
+# In-process crisis phrase detection before the companion LLM call
+CRISIS_DETECTOR_ENABLED = os.getenv("CRISIS_DETECTOR_ENABLED", "true").lower() == "true"
+
+# OpenTelemetry tracing: none, console, file or otlp (OTLP uses the standard OTEL_EXPORTER_OTLP_* variables)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "traces/spans.jsonl")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "general-chatbot")
+
+# Attachments larger than this are rejected before they are read or decoded
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Image attachment preprocessing (needs Pillow); per-model profiles live in config/llm.py
+IMAGE_PREPROCESS_ENABLED = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1536"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+# Total size of the prepared images kept in memory
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Local text extraction for document attachments (PDF needs pypdf)
+TEXT_EXTRACT_ENABLED = os.getenv("TEXT_EXTRACT_ENABLED", "true").lower() == "true"
+ATTACHMENT_TEXT_TOKEN_BUDGET = int(os.getenv("ATTACHMENT_TEXT_TOKEN_BUDGET", "8000"))
+TEXT_EXTRACT_CACHE_MAX_ENTRIES = int(os.getenv("TEXT_EXTRACT_CACHE_MAX_ENTRIES", "256"))
+
+# Analyzer result store: "mongo" (indexed, batched writes) or "local" (files under
+# {ANALYSIS_STORE_DIR}/{conversation,journal}_analyzed/, for development); SystemState keeps references
+ANALYSIS_STORE_BACKEND = os.getenv("ANALYSIS_STORE_BACKEND", "mongo").lower()
+ANALYSIS_STORE_DIR = os.getenv("ANALYSIS_STORE_DIR", ".")
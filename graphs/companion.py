@@ -2,7 +2,10 @@ from langgraph.graph import StateGraph, START, END
 from states.system_state import SystemState
 from agents.companion.companion import companion_agent
 from agents.companion.conversation_analyzer import conversation_analyzer_agent
+from utils.tracing import traced
+from config.settings import SUBGRAPH_CHECKPOINTING
 
+@traced("companion_graph.router", **{"langgraph.subgraph": "companion_graph"})
 async def router(state: SystemState):
     agent_name = state.get("agent_name")
 
@@ -17,8 +20,8 @@ async def router(state: SystemState):
         
 graph = StateGraph(SystemState)
 
-graph.add_node("companion_agent", companion_agent)
-graph.add_node("conversation_analyzer_agent", conversation_analyzer_agent)
+graph.add_node("companion_agent", traced("companion_graph.companion_agent", **{"langgraph.subgraph": "companion_graph"})(companion_agent))
+graph.add_node("conversation_analyzer_agent", traced("companion_graph.conversation_analyzer_agent", **{"langgraph.subgraph": "companion_graph"})(conversation_analyzer_agent))
 
 graph.add_conditional_edges(
     START,
@@ -33,4 +36,5 @@ graph.add_conditional_edges(
 graph.add_edge("companion_agent", END)
 graph.add_edge("conversation_analyzer_agent", END)
 
-companion_graph = graph.compile()
\ No newline at end of file
+# checkpointer=False: the parent graph's checkpoint already holds the subgraph's result
+companion_graph = graph.compile(checkpointer=None if SUBGRAPH_CHECKPOINTING else False)
\ No newline at end of file
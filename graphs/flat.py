@@ -0,0 +1,43 @@
+from langgraph.graph import StateGraph, START, END
+from states.system_state import SystemState
+from agents.companion.companion import companion_agent
+from agents.companion.conversation_analyzer import conversation_analyzer_agent
+from agents.journal.journal_analyzer import journal_analyzer_agent
+from utils.tracing import traced
+
+# One dispatch on (system, agent_name) replacing main.router + the per-subgraph routers.
+# "*" matches any agent_name, including None; unknown combinations end the run, as in the nested layout.
+DISPATCH_TABLE = {
+    ("companion", None): "companion_agent",
+    ("companion", "companion_agent"): "companion_agent",
+    ("companion", "conversation_analyzer_agent"): "conversation_analyzer_agent",
+    ("journal", "*"): "journal_analyzer_agent",
+}
+
+@traced("flat_graph.dispatch")
+async def dispatch(state: SystemState):
+    key = (state.get("system"), state.get("agent_name"))
+    return DISPATCH_TABLE.get(key) or DISPATCH_TABLE.get((key[0], "*"), END)
+
+graph = StateGraph(SystemState)
+
+graph.add_node("companion_agent", traced("flat_graph.companion_agent")(companion_agent))
+graph.add_node("conversation_analyzer_agent", traced("flat_graph.conversation_analyzer_agent")(conversation_analyzer_agent))
+graph.add_node("journal_analyzer_agent", traced("flat_graph.journal_analyzer_agent")(journal_analyzer_agent))
+
+graph.add_conditional_edges(
+    START,
+    dispatch,
+    {
+        "companion_agent": "companion_agent",
+        "conversation_analyzer_agent": "conversation_analyzer_agent",
+        "journal_analyzer_agent": "journal_analyzer_agent",
+        END: END
+    }
+)
+
+graph.add_edge("companion_agent", END)
+graph.add_edge("conversation_analyzer_agent", END)
+graph.add_edge("journal_analyzer_agent", END)
+
+flat_graph = graph
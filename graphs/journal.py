@@ -1,13 +1,16 @@
 from langgraph.graph import StateGraph, START, END
 from states.system_state import SystemState
 from agents.journal.journal_analyzer import journal_analyzer_agent
+from utils.tracing import traced
+from config.settings import SUBGRAPH_CHECKPOINTING
 
 
 graph = StateGraph(SystemState)
 
-graph.add_node("journal_analyzer_agent", journal_analyzer_agent)
+graph.add_node("journal_analyzer_agent", traced("journal_graph.journal_analyzer_agent", **{"langgraph.subgraph": "journal_graph"})(journal_analyzer_agent))
 
 graph.add_edge(START, "journal_analyzer_agent")
 graph.add_edge("journal_analyzer_agent", END)
 
-journal_graph = graph.compile()
\ No newline at end of file
+# checkpointer=False: the parent graph's checkpoint already holds the subgraph's result
+journal_graph = graph.compile(checkpointer=None if SUBGRAPH_CHECKPOINTING else False)
\ No newline at end of file
@@ -1,14 +1,24 @@
-from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.mongodb import MongoDBSaver
+from langchain_core.runnables import RunnableConfig
+from langgraph.constants import START, END
 from states.system_state import SystemState
-from graphs.companion import companion_graph
-from graphs.journal import journal_graph
+from utils.tracing import setup_tracing, traced, instrument_checkpointer
+from config.settings import GRAPH_LAYOUT, COMPANION_DURABILITY, JOURNAL_DURABILITY
 
-import os
+from contextlib import asynccontextmanager
+from functools import lru_cache, wraps
 from dotenv import load_dotenv
 
+try:
+    from langgraph._internal._constants import CONFIG_KEY_DURABILITY
+except ImportError:
+    # Private to langgraph and tested with the version pinned in requirements.txt;
+    # this is its value there
+    CONFIG_KEY_DURABILITY = "__pregel_durability"
+
 load_dotenv()
+setup_tracing()
 
+@traced("main.router")
 async def router(state: SystemState):
     if state.get("system") == "journal":
         return "journal_graph"
@@ -16,35 +26,157 @@ async def router(state: SystemState):
         return "companion_graph"
     else:
         return END
-        
-graph = StateGraph(SystemState)
-
-graph.add_node("companion_graph", companion_graph)
-graph.add_node("journal_graph", journal_graph)
-
-graph.add_conditional_edges(    
-    START,
-    router,
-    {
-        "companion_graph": "companion_graph",
-        "journal_graph": "journal_graph",
-        END: END
-    }
-)
-
-graph.add_edge("companion_graph", END)
-graph.add_edge("journal_graph", END)
-
-DB_URI = os.environ.get("MONGO_CONNECTION_URL")
-
-# Compiling the workflow graph
-def create_graph():
-    checkpointer = MongoDBSaver.from_conn_string(DB_URI)
-    return graph.compile(checkpointer=checkpointer)
-
-# Scheduler-specific graph without checkpointer (for background processing)
-def create_scheduler_graph():
-    return graph.compile()
-
-# Compiled graph for langgraph dev
-compiled_graph = create_graph()
\ No newline at end of file
+
+# Checkpoint durability per system (see config/settings.py)
+SYSTEM_DURABILITY = {
+    "companion": COMPANION_DURABILITY,
+    "journal": JOURNAL_DURABILITY,
+}
+
+def with_system_durability(app):
+    """
+    Default each run's checkpoint durability from the system of its input state.
+
+    A durability passed by the caller still wins. Wraps astream in place, which
+    ainvoke also goes through.
+
+    Args:
+        app: A compiled graph with a checkpointer
+
+    Returns:
+        The same graph
+
+    Raises:
+        ValueError: On a "sync" run of a graph that was not built for it (see subgraph_node)
+    """
+    from langgraph.pregel import Pregel
+
+    astream = app.astream
+    sync_ready = not any(
+        isinstance(node.runnable, Pregel) and node.runnable.checkpointer is False
+        for node in app.builder.nodes.values()
+    )
+
+    @wraps(astream)
+    def system_astream(input, config=None, *, durability=None, **kwargs):
+        if durability is None and isinstance(input, dict):
+            durability = SYSTEM_DURABILITY.get(input.get("system"))
+        if durability == "sync" and not sync_ready:
+            raise ValueError("durability='sync' needs a graph from build_graph(sync_durability=True)")
+        return astream(input, config, durability=durability, **kwargs)
+
+    app.astream = system_astream
+    return app
+
+def subgraph_node(subgraph, sync_durability: bool):
+    """
+    The node that runs a system subgraph inside the nested graph.
+
+    A subgraph compiled with checkpointer=False still inherits the run's
+    durability, and with "sync" LangGraph waits after every subgraph step for
+    a checkpoint write that never happens (AttributeError on
+    _put_checkpoint_fut). For graphs that run with "sync", such subgraphs are
+    invoked from a plain node without the inherited durability, which is moot
+    for a graph that does not checkpoint; the parent keeps the run's
+    durability. Otherwise the subgraph itself is the node.
+    """
+    if not sync_durability or subgraph.checkpointer is not False:
+        return subgraph
+
+    async def run_subgraph(state: SystemState, config: RunnableConfig):
+        configurable = {k: v for k, v in config.get("configurable", {}).items() if k != CONFIG_KEY_DURABILITY}
+        return await subgraph.ainvoke(state, {**config, "configurable": configurable})
+
+    return run_subgraph
+
+@lru_cache(maxsize=4)
+def build_graph(layout: str = None, sync_durability: bool = None):
+    """
+    Build the workflow StateGraph on first use.
+
+    The subgraphs, and through them the agents, LLM providers and storage
+    clients, are imported here rather than at module import, so importing
+    main stays cheap and needs no API keys or database connections.
+
+    Args:
+        layout: "nested" (router -> system subgraph -> agent) or "flat" (one
+            dispatch on (system, agent_name) straight to the agent node, see
+            graphs/flat.py); defaults to GRAPH_LAYOUT
+        sync_durability: Whether runs may use durability "sync" (see
+            subgraph_node); defaults to whether a system is configured with it
+    """
+    layout = layout or GRAPH_LAYOUT
+    if sync_durability is None:
+        sync_durability = "sync" in SYSTEM_DURABILITY.values()
+    if layout == "flat":
+        from graphs.flat import flat_graph
+        return flat_graph
+    if layout != "nested":
+        raise ValueError(f"Unknown GRAPH_LAYOUT '{layout}' (expected nested or flat)")
+
+    from langgraph.graph import StateGraph
+    from graphs.companion import companion_graph
+    from graphs.journal import journal_graph
+
+    graph = StateGraph(SystemState)
+
+    graph.add_node("companion_graph", subgraph_node(companion_graph, sync_durability))
+    graph.add_node("journal_graph", subgraph_node(journal_graph, sync_durability))
+
+    graph.add_conditional_edges(
+        START,
+        router,
+        {
+            "companion_graph": "companion_graph",
+            "journal_graph": "journal_graph",
+            END: END
+        }
+    )
+
+    graph.add_edge("companion_graph", END)
+    graph.add_edge("journal_graph", END)
+    return graph
+
+# Compiling the workflow graph with a MongoDB checkpointer (the scheduler daemon and other callers outside the LangGraph server)
+@asynccontextmanager
+async def create_graph(mode: str = None):
+    """
+    Compile the graph with a MongoDB checkpointer that stays open for the context.
+
+    With HOT_CHECKPOINT_ENABLED, active threads checkpoint to Redis instead and
+    are flushed to MongoDB once idle (see storage/redis/checkpointer.py; the
+    flusher runs in the scheduler daemon). Runs checkpoint with their system's
+    durability (COMPANION_DURABILITY / JOURNAL_DURABILITY) unless the caller
+    passes one. The LangGraph server serves make_graph() with its own
+    checkpointer, so none of this applies to runs it serves.
+
+    Usage:
+        async with create_graph() as app:
+            await app.ainvoke(state, {"configurable": {"thread_id": workflow_id}})
+
+    Args:
+        mode: "async" (native async driver) or "sync" (pymongo in a thread pool);
+            defaults to MONGO_CHECKPOINTER_MODE
+    """
+    from storage.mongodb.checkpointer import mongo_checkpointer
+    from storage.redis.config import HOT_CHECKPOINT_ENABLED
+
+    async with mongo_checkpointer(mode) as checkpointer:
+        if HOT_CHECKPOINT_ENABLED:
+            from storage.redis.checkpointer import RedisHotCheckpointer
+            checkpointer = instrument_checkpointer(RedisHotCheckpointer(checkpointer))
+        yield with_system_durability(build_graph().compile(checkpointer=checkpointer))
+
+# Graph factory for langgraph dev (see langgraph.json). The LangGraph server attaches its
+# own checkpointer (and rejects a custom one in local dev), so none is configured here;
+# durability there comes from each run request, and MONGO_CHECKPOINTER_MODE, HOT_CHECKPOINT_*
+# and *_DURABILITY only apply to create_graph runs.
+@lru_cache(maxsize=1)
+def make_graph():
+    return build_graph().compile()
+
+def __getattr__(name):
+    # Keeps `from main import compiled_graph` working while compiling lazily
+    if name == "compiled_graph":
+        return make_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
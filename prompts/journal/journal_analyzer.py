@@ -55,4 +55,20 @@ Instead of: "They got promoted to Senior Engineer at Google."
 Write: "The person is celebrating a meaningful professional milestone that represents validation of their efforts and growth. There's excitement mixed with anticipation about new responsibilities ahead."
 
 Remember: You're helping the person understand their emotional landscape and patterns, not creating a record of their life events. Your analysis should feel insightful and supportive while maintaining appropriate emotional distance and privacy.
-"""
\ No newline at end of file
+"""
+journal_batch_analyzer_prompt = journal_analyzer_prompt + """
+
+## Batch Mode
+
+You will receive several journal entries, each introduced by a header of the form `## Entry <index>`.
+Analyze every entry independently, exactly as described above, and never let one entry influence another.
+Return one result per entry, carrying the same `index` as its header. Do not skip, merge or reorder entries.
+"""
+
+journal_analysis_only_prompt = journal_analyzer_prompt + """
+
+## Labels Provided
+
+The mood and category of this entry have already been classified and are given above the entry.
+Do not re-classify it. Write only the markdown analysis, consistent with the provided mood and category.
+"""
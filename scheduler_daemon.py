@@ -21,6 +21,7 @@ import signal
 import sys
 import logging
 import os
+from contextlib import AsyncExitStack
 from datetime import datetime
 from pathlib import Path
 
@@ -28,7 +29,13 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from scheduler_service import SchedulerServiceManager
-from graph import create_scheduler_graph
+from storage.mongodb.checkpoint_pruner import CheckpointPruner
+from storage.mongodb.checkpointer import mongo_checkpointer
+from storage.mongodb.config import CHECKPOINT_PRUNE_ENABLED, close_mongo_clients
+from storage.redis.config import HOT_CHECKPOINT_ENABLED
+from storage.analysis_store import close_analysis_store
+from utils.tracing import setup_tracing
+from main import create_graph
 
 logging.basicConfig(
     level=logging.INFO,
@@ -46,6 +53,10 @@ class SchedulerDaemon:
     
     def __init__(self):
         self.scheduler_manager = None
+        self.checkpoint_pruner = None
+        self.hot_checkpoint_flusher = None
+        self.graph = None
+        self.exit_stack = AsyncExitStack()
         self.running = False
         
     async def start(self):
@@ -58,12 +69,28 @@ class SchedulerDaemon:
             # Initialize scheduler manager
             self.scheduler_manager = SchedulerServiceManager()
             
+            # Analysis runs checkpoint like every create_graph caller: to MongoDB (or the
+            # Redis hot tier) with their system's durability
+            self.graph = await self.exit_stack.enter_async_context(create_graph())
+
             # Start scheduler with graph factory
-            success = await self.scheduler_manager.start(create_scheduler_graph)
+            success = await self.scheduler_manager.start(self.graph_factory)
             
             if not success:
                 logger.error("❌ Failed to start scheduler")
                 return False
+
+            # Checkpoint retention runs in the same background process
+            if CHECKPOINT_PRUNE_ENABLED:
+                self.checkpoint_pruner = CheckpointPruner()
+                await self.checkpoint_pruner.start()
+
+            # Idle threads of the Redis hot checkpoint tier are moved to MongoDB from here
+            if HOT_CHECKPOINT_ENABLED:
+                from storage.redis.checkpointer import HotCheckpointFlusher, RedisHotCheckpointer
+                cold = await self.exit_stack.enter_async_context(mongo_checkpointer())
+                self.hot_checkpoint_flusher = HotCheckpointFlusher(RedisHotCheckpointer(cold))
+                await self.hot_checkpoint_flusher.start()
                 
             logger.info("✅ Scheduler daemon started successfully")
             self.running = True
@@ -77,7 +104,7 @@ class SchedulerDaemon:
                     status = await self.scheduler_manager.get_status()
                     if not status.get('is_running'):
                         logger.warning("⚠️ Scheduler stopped, restarting...")
-                        await self.scheduler_manager.start(create_scheduler_graph)
+                        await self.scheduler_manager.start(self.graph_factory)
                         
                 except asyncio.CancelledError:
                     break
@@ -90,6 +117,10 @@ class SchedulerDaemon:
             logger.error(f"❌ Daemon startup failed: {e}")
             return False
     
+    def graph_factory(self):
+        """The checkpointed graph opened at start, for the scheduler's trigger service."""
+        return self.graph
+
     async def stop(self):
         """Stop the scheduler daemon gracefully."""
         logger.info("🛑 Stopping Conversation Analyzer Scheduler Daemon...")
@@ -102,6 +133,21 @@ class SchedulerDaemon:
             except Exception as e:
                 logger.error(f"Error stopping scheduler: {e}")
 
+        # Conversation analyses are written in batches; send the last one
+        try:
+            await close_analysis_store()
+        except Exception as e:
+            logger.error(f"Error flushing analysis store: {e}")
+
+        if self.hot_checkpoint_flusher:
+            await self.hot_checkpoint_flusher.stop()
+            self.hot_checkpoint_flusher = None
+        await self.exit_stack.aclose()
+
+        if self.checkpoint_pruner:
+            await self.checkpoint_pruner.stop()
+        await close_mongo_clients()
+
 # Global daemon instance for signal handling
 daemon = SchedulerDaemon()
 
@@ -112,6 +158,8 @@ def signal_handler(signum, frame):
 
 async def main():
     """Main daemon entry point."""
+    setup_tracing()
+
     # Set up signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
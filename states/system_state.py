@@ -15,5 +15,9 @@ class SystemState(TypedDict):
 
     user_input: Optional[UnserInput]
     agent_response: Optional[str]
-    conversation_analyzed: Optional[str]
-    journal_analysis: Optional[Dict[str, Any]]
\ No newline at end of file
+    # References to analyses in storage.analysis_store (kind, workflow_id, created_at + summary fields),
+    # not the full payloads; load those with storage.analysis_store.load_analysis
+    conversation_analyzed: Optional[Dict[str, Any]]
+    journal_analysis: Optional[Dict[str, Any]]
+    # Set when admission control rejected the request (scope, retry_after_seconds); None otherwise
+    throttled: Optional[Dict[str, Any]]
\ No newline at end of file
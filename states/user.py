@@ -7,6 +7,14 @@ class UnserInput(TypedDict):
     response: Optional[str]
     companion_name: Optional[str] = ""
     companion_gender: Optional[str] = ""
+    # IANA timezone name of the user, e.g. "Europe/London" (defaults to DEFAULT_TIMEZONE)
+    timezone: Optional[str] = ""
+    # ISO 3166 country code, e.g. "IN"; used for localized crisis hotlines (falls back to timezone)
+    country: Optional[str] = ""
+    # Journal only: skip the analysis result cache for this submission
+    bypass_cache: Optional[bool] = False
+    # Journal only: return fast-path mood/category now and write the analysis in the background
+    defer_analysis: Optional[bool] = False
     # File can be provided in one of the following shapes:
     # - {"url": str, "media_type"?: str}
     # - {"path": str, "media_type"?: str}
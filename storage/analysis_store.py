@@ -0,0 +1,224 @@
+import asyncio
+import glob
+import logging
+import os
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Literal, Optional, Union
+
+from pydantic import BaseModel, Field, ValidationError
+
+from config.settings import ANALYSIS_STORE_BACKEND, ANALYSIS_STORE_DIR
+
+if TYPE_CHECKING:
+    from storage.mongodb.analysis_store import MongoAnalysisStore
+
+logger = logging.getLogger(__name__)
+
+AnalysisKind = Literal["conversation", "journal"]
+
+
+class AnalysisRecord(BaseModel):
+    """A stored analyzer result: the structured output plus its rendered markdown."""
+
+    kind: AnalysisKind
+    workflow_id: str
+    user_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    timezone: Optional[str] = Field(None, description="The user's IANA timezone when the analysis was made")
+    data: Dict[str, Any] = Field(..., description="Structured ConversationAnalyzed / JournalAnalysis output")
+    markdown: str = ""
+    summary: Dict[str, Any] = Field(default_factory=dict, description="Small fields copied into SystemState")
+
+    def reference(self) -> Dict[str, Any]:
+        """
+        The reference kept in SystemState instead of the full payload.
+
+        Returns:
+            dict: kind, workflow_id, created_at and the summary fields; pass it
+            to load_analysis() to get the full record
+        """
+        return {
+            "kind": self.kind,
+            "workflow_id": self.workflow_id,
+            "created_at": self.created_at.isoformat(),
+            **self.summary,
+        }
+
+
+class LocalAnalysisStore:
+    """
+    Analysis records on the local filesystem: a stand-in for MongoAnalysisStore
+    in development (not shared across nodes, and find() scans every file).
+
+    Each record is written as {root}/{kind}_analyzed/{workflow_id}.json, with
+    the rendered markdown next to it as .md. A later analysis of the same
+    workflow replaces the earlier one.
+    """
+
+    def __init__(self, root: str = ANALYSIS_STORE_DIR):
+        self.root = root
+
+    def _path(self, kind: str, workflow_id: str, extension: str) -> str:
+        return os.path.join(self.root, f"{kind}_analyzed", f"{workflow_id}.{extension}")
+
+    async def save(self, record: AnalysisRecord) -> None:
+        """Write a record and its markdown."""
+        def write_files():
+            os.makedirs(os.path.dirname(self._path(record.kind, record.workflow_id, "json")), exist_ok=True)
+            with open(self._path(record.kind, record.workflow_id, "md"), "w") as f:
+                f.write(record.markdown)
+            with open(self._path(record.kind, record.workflow_id, "json"), "w") as f:
+                f.write(record.model_dump_json())
+
+        await asyncio.to_thread(write_files)
+
+    async def load(self, kind: str, workflow_id: str) -> Optional[AnalysisRecord]:
+        """
+        Read a record.
+
+        Returns:
+            Optional[AnalysisRecord]: The record, or None if there is none
+        """
+        def read_file():
+            try:
+                with open(self._path(kind, workflow_id, "json")) as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+
+        payload = await asyncio.to_thread(read_file)
+        return self._parse(payload, f"{kind} analysis record for workflow {workflow_id}") if payload else None
+
+    @staticmethod
+    def _parse(payload: str, description: str) -> Optional[AnalysisRecord]:
+        try:
+            return AnalysisRecord.model_validate_json(payload)
+        except ValidationError as e:
+            logger.warning(f"Discarding invalid {description}: {str(e)}")
+            return None
+
+    async def flush(self) -> int:
+        """Records are written on save; nothing is buffered."""
+        return 0
+
+    async def find(
+        self,
+        user_id: str,
+        kind: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        mood: Optional[str] = None,
+        primary_intent: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[AnalysisRecord]:
+        """A user's analyses, newest first (same filters as MongoAnalysisStore.find)."""
+        def read_files():
+            payloads = []
+            for path in glob.glob(os.path.join(self.root, f"{kind or '*'}_analyzed", "*.json")):
+                with open(path) as f:
+                    payloads.append((path, f.read()))
+            return payloads
+
+        records = []
+        for path, payload in await asyncio.to_thread(read_files):
+            record = self._parse(payload, f"analysis record {path}")
+            if record is None or record.user_id != user_id:
+                continue
+            if (since and record.created_at < since) or (until and record.created_at >= until):
+                continue
+            if mood and record.summary.get("mood") != mood:
+                continue
+            if primary_intent and record.summary.get("primary_intent") != primary_intent:
+                continue
+            records.append(record)
+        records.sort(key=lambda record: record.created_at, reverse=True)
+        return records[:limit]
+
+    async def scan(self, kind: str, user_id: Optional[str] = None) -> AsyncIterator[AnalysisRecord]:
+        """Every record of a kind (optionally of one user), in no particular order."""
+        paths = await asyncio.to_thread(glob.glob, os.path.join(self.root, f"{kind}_analyzed", "*.json"))
+        for path in paths:
+            def read_file():
+                with open(path) as f:
+                    return f.read()
+            record = self._parse(await asyncio.to_thread(read_file), f"analysis record {path}")
+            if record is not None and (user_id is None or record.user_id == user_id):
+                yield record
+
+
+# Global analysis store
+analysis_store = None
+
+def get_analysis_store() -> Union[LocalAnalysisStore, "MongoAnalysisStore"]:
+    """Get or create the analysis store selected by ANALYSIS_STORE_BACKEND."""
+    global analysis_store
+    if analysis_store is None:
+        if ANALYSIS_STORE_BACKEND == "mongo":
+            from storage.mongodb.analysis_store import MongoAnalysisStore
+            analysis_store = MongoAnalysisStore()
+        elif ANALYSIS_STORE_BACKEND == "local":
+            analysis_store = LocalAnalysisStore()
+        else:
+            raise ValueError(f"Unknown ANALYSIS_STORE_BACKEND '{ANALYSIS_STORE_BACKEND}' (expected mongo or local)")
+    return analysis_store
+
+
+async def close_analysis_store() -> None:
+    """Write any buffered records. Call this at application shutdown."""
+    if analysis_store is not None:
+        await analysis_store.flush()
+
+
+async def save_analysis(
+    kind: AnalysisKind,
+    workflow_id: str,
+    user_id: Optional[str],
+    data: BaseModel,
+    markdown: str,
+    summary: Dict[str, Any],
+    timezone: Optional[str] = None,
+    created_at: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Store an analyzer result and return the reference to keep in SystemState.
+
+    Args:
+        kind: "conversation" or "journal"
+        workflow_id: The workflow the analysis belongs to
+        user_id: The user the analysis belongs to
+        data: The structured analyzer output
+        markdown: The rendered markdown
+        summary: Small fields (mood, intent, ...) to keep in the reference
+        timezone: The user's IANA timezone, for per-day rollups
+        created_at: When the analysis was made (defaults to now), e.g. the time
+            of a reference handed out before the analysis was finished
+
+    Returns:
+        dict: The reference (see AnalysisRecord.reference)
+    """
+    record = AnalysisRecord(
+        kind=kind,
+        workflow_id=workflow_id,
+        user_id=user_id,
+        data=data.model_dump(),
+        markdown=markdown,
+        summary=summary,
+        timezone=timezone,
+        # The default (now) comes from the model; `timezone` is shadowed by the argument here
+        **({"created_at": created_at} if created_at else {}),
+    )
+    await get_analysis_store().save(record)
+    return record.reference()
+
+
+async def load_analysis(reference: Dict[str, Any]) -> Optional[AnalysisRecord]:
+    """
+    Load the full analysis behind a SystemState reference.
+
+    Args:
+        reference: A conversation_analyzed / journal_analysis value from SystemState
+
+    Returns:
+        Optional[AnalysisRecord]: The record, or None if it is not (yet) stored
+    """
+    return await get_analysis_store().load(reference["kind"], reference["workflow_id"])
@@ -0,0 +1,487 @@
+"""
+Local retrieval index over past conversation analyses.
+
+Each analysed conversation becomes one hashed bag-of-words vector
+(utils.text_features.hashed_vector, CPU only, no embedding service) appended
+to a float16 matrix on disk, with a JSON line of metadata (user, workflow,
+time and a short snippet) per row. Readers memory-map the matrix, so only the
+cells of the user's rows in the query's columns are read; a search is one
+small matrix-vector product, with query terms IDF-weighted over that user's
+rows.
+
+The files are append-only and shared by the processes on one host (the
+analyzer appends under a file lock, readers pick up new rows on their next
+search). Re-analysing a workflow appends a new row that supersedes the old one.
+Each index has a generation id; a rebuild or compaction writes a new index
+beside the old one and swaps it in, and readers that see a new generation drop
+what they cached.
+
+Compaction drops superseded rows, rows beyond RETRIEVAL_MAX_SESSIONS_PER_USER
+(oldest first) and the rows of deleted users. It runs after an append once at
+least half of RETRIEVAL_COMPACT_MIN_ROWS or more rows are dead, so the files stay
+within about twice the live rows.
+
+Rebuild from the analysis store (e.g. after changing RETRIEVAL_DIMENSIONS):
+    python -m storage.conversation_index --rebuild
+Remove a user's sessions:
+    python -m storage.conversation_index --delete-user USER_ID
+"""
+
+import argparse
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config.settings import (
+    RETRIEVAL_INDEX_DIR,
+    RETRIEVAL_DIMENSIONS,
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_MIN_SCORE,
+    RETRIEVAL_TOKEN_BUDGET,
+    RETRIEVAL_MAX_SESSIONS_PER_USER,
+    RETRIEVAL_COMPACT_MIN_ROWS,
+)
+from utils.text_features import estimate_tokens, hashed_vector
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_MAX_CHARS = 300
+COMPACT_COPY_ROWS = 4096
+PAST_SESSIONS_HEADER = "Possibly relevant past sessions with this user (for continuity; do not recite):"
+
+
+def analysis_text(data: Dict[str, Any]) -> str:
+    """The text of a ConversationAnalyzed (as a dict) that is vectorized for retrieval."""
+    intent = data.get("intent_analysis") or {}
+    emotional = data.get("emotional_profile") or {}
+    insights = data.get("contextual_insights") or {}
+    recommendations = data.get("recommendations") or {}
+    parts = [
+        intent.get("primary_intent", ""),
+        " ".join(intent.get("secondary_intents") or []),
+        intent.get("evolving_needs", ""),
+        emotional.get("initial_state", ""),
+        emotional.get("final_state", ""),
+        " ".join(emotional.get("triggers") or []),
+        " ".join(insights.get("preferred_topics") or []),
+        recommendations.get("user_patterns", ""),
+    ]
+    return "\n".join(part for part in parts if part)
+
+
+def analysis_snippet(data: Dict[str, Any], created_at: datetime) -> str:
+    """One short line describing a past session, as shown to the companion."""
+    intent = (data.get("intent_analysis") or {}).get("primary_intent", "")
+    final_state = (data.get("emotional_profile") or {}).get("final_state", "")
+    topics = ", ".join(((data.get("contextual_insights") or {}).get("preferred_topics") or [])[:3])
+    snippet = f"{created_at.date().isoformat()}: {intent}"
+    if final_state:
+        snippet += f" (ended {final_state})"
+    if topics:
+        snippet += f"; topics: {topics}"
+    return " ".join(snippet.split())[:SNIPPET_MAX_CHARS]
+
+
+class ConversationIndex:
+    """Append-only hashed-vector index of conversation analyses, searched per user."""
+
+    def __init__(self, root: str = RETRIEVAL_INDEX_DIR, dimensions: int = RETRIEVAL_DIMENSIONS):
+        self.root = root
+        self.dimensions = dimensions
+        self._vectors_path = os.path.join(root, "vectors.f16")
+        self._meta_path = os.path.join(root, "meta.jsonl")
+        self._lock_path = os.path.join(root, "index.lock")
+        self._generation_path = os.path.join(root, "generation")
+        self._row_bytes = dimensions * np.dtype(np.float16).itemsize
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._generation: Optional[str] = None
+        self._matrix: Optional[np.memmap] = None
+        self._meta: Dict[int, Dict[str, Any]] = {}
+        self._meta_offset = 0
+        # user_id -> workflow_id -> latest row
+        self._by_user: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def size(self) -> int:
+        """Rows visible to searches."""
+        return 0 if self._matrix is None else self._matrix.shape[0]
+
+    @contextmanager
+    def _write_lock(self):
+        """Hold the index's file lock, on the files currently at the root (a compaction swaps them)."""
+        os.makedirs(self.root, exist_ok=True)
+        while True:
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    current = os.stat(self._lock_path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current == os.fstat(lock_file.fileno()).st_ino:
+                    yield
+                    return
+
+    def add(self, user_id: str, workflow_id: str, text: str, snippet: str, created_at: Optional[datetime] = None) -> int:
+        """
+        Append one document. Blocking file I/O; call it from a worker thread.
+
+        Args:
+            user_id: The user the conversation belongs to
+            workflow_id: The conversation; a later row for it supersedes earlier ones
+            text: The text to vectorize
+            snippet: The line shown to the companion when the row is retrieved
+            created_at: When the conversation was analysed (defaults to now)
+
+        Returns:
+            int: The row number
+        """
+        vector = hashed_vector(text, self.dimensions).astype(np.float16)
+        created_at = created_at or datetime.now(timezone.utc)
+        with self._write_lock():
+            if not os.path.exists(self._generation_path):
+                self._write_generation()
+            with open(self._vectors_path, "ab") as f:
+                # Drop a partial row left by an interrupted write
+                row = f.tell() // self._row_bytes
+                f.truncate(row * self._row_bytes)
+                f.write(vector.tobytes())
+            # Metadata goes last and names its row, so readers never see a row without its vector
+            entry = {
+                "row": row,
+                "user_id": user_id,
+                "workflow_id": workflow_id,
+                "created_at": created_at.isoformat(),
+                "snippet": snippet,
+            }
+            with open(self._meta_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        return row
+
+    def _write_generation(self) -> None:
+        with open(self._generation_path, "w") as f:
+            f.write(uuid.uuid4().hex)
+
+    def _read_generation(self) -> Optional[str]:
+        try:
+            with open(self._generation_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self) -> None:
+        """Pick up rows appended since the last search (by any process), starting over after a rebuild."""
+        for _ in range(3):
+            generation = self._read_generation()
+            if generation != self._generation:
+                # Rebuilt, cleared or new: cached rows and offsets describe other files
+                self._reset()
+                self._generation = generation
+            try:
+                with open(self._meta_path, "rb") as f:
+                    f.seek(self._meta_offset)
+                    chunk = f.read()
+            except FileNotFoundError:
+                return
+            # Swapped while reading: start over on the new files
+            if self._read_generation() == generation:
+                break
+        else:
+            return
+        complete = chunk.rfind(b"\n") + 1
+        if not complete:
+            return
+        self._meta_offset += complete
+        for line in chunk[:complete].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self._meta[entry["row"]] = entry
+            self._by_user.setdefault(entry["user_id"], {})[entry["workflow_id"]] = entry["row"]
+        try:
+            rows = os.path.getsize(self._vectors_path) // self._row_bytes
+        except FileNotFoundError:
+            return
+        if rows:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(rows, self.dimensions))
+
+    def search(
+        self,
+        user_id: str,
+        text: str,
+        k: int = RETRIEVAL_TOP_K,
+        min_score: float = RETRIEVAL_MIN_SCORE,
+        exclude_workflow_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        The user's past conversations most similar to the text (cosine similarity, query terms IDF-weighted).
+
+        Args:
+            user_id: Only this user's conversations are searched
+            text: The query, e.g. the user's current message
+            k: Maximum number of results
+            min_score: Minimum similarity in [0, 1]
+            exclude_workflow_id: Leave out this conversation (the current one)
+
+        Returns:
+            List[Dict]: Metadata of the matches plus "score", best first
+        """
+        with self._lock:
+            self._refresh()
+            workflows = self._by_user.get(user_id)
+            if not workflows or self._matrix is None:
+                return []
+            rows = np.fromiter(
+                (row for workflow_id, row in workflows.items() if workflow_id != exclude_workflow_id and row < self.size),
+                dtype=np.int64,
+            )
+            if rows.size == 0:
+                return []
+            query = hashed_vector(text, self.dimensions)
+            if not query.any():
+                return []
+            # Rows are unit vectors, so only the query's own columns are read from the memory map
+            columns = np.flatnonzero(query)
+            documents = self._matrix[rows[:, None], columns].astype(np.float32)
+            # Query terms are IDF-weighted over the user's conversations, so words they always use weigh less
+            idf = np.log((rows.size + 1) / (np.count_nonzero(documents, axis=0) + 1)) + 1
+            weights = query[columns] * idf
+            scores = documents @ (weights / np.linalg.norm(weights))
+            top = np.argsort(-scores)[:k]
+            return [
+                {**self._meta[int(rows[i])], "score": round(float(scores[i]), 4)}
+                for i in top
+                if scores[i] >= min_score
+            ]
+
+    def _live_rows(self, max_sessions_per_user: int, drop_user_ids: Iterable[str] = ()) -> List[int]:
+        """The rows a compaction keeps: each workflow's latest, the newest per user up to the cap."""
+        drop_user_ids = set(drop_user_ids)
+        live = []
+        for user_id, workflows in self._by_user.items():
+            if user_id not in drop_user_ids:
+                # Rows are appended in analysis order, so the highest rows are the newest
+                live.extend(sorted(workflows.values())[-max_sessions_per_user:])
+        return sorted(row for row in live if row < self.size)
+
+    def needs_compaction(self, min_rows: int = RETRIEVAL_COMPACT_MIN_ROWS, max_sessions_per_user: int = RETRIEVAL_MAX_SESSIONS_PER_USER) -> bool:
+        """True once the index has at least min_rows rows and half or more of them are dead."""
+        with self._lock:
+            self._refresh()
+            if self.size < min_rows:
+                return False
+            live = sum(min(len(workflows), max_sessions_per_user) for workflows in self._by_user.values())
+            return 2 * live <= self.size
+
+    def compact(self, drop_user_ids: Iterable[str] = (), max_sessions_per_user: int = RETRIEVAL_MAX_SESSIONS_PER_USER) -> Dict[str, int]:
+        """
+        Rewrite the index with only its live rows and swap it in. Blocking file I/O.
+
+        Appends wait on the file lock meanwhile and then go to the compacted files.
+
+        Args:
+            drop_user_ids: Users whose rows are removed entirely
+            max_sessions_per_user: Newest conversations kept per user
+
+        Returns:
+            dict: Rows before and after
+        """
+        with self._lock, self._write_lock():
+            self._refresh()
+            rows_before = self.size
+            live = self._live_rows(max_sessions_per_user, drop_user_ids)
+            compacted = ConversationIndex(f"{self.root}.compact-{uuid.uuid4().hex}", self.dimensions)
+            os.makedirs(compacted.root)
+            compacted._write_generation()
+            with open(compacted._vectors_path, "wb") as f:
+                for start in range(0, len(live), COMPACT_COPY_ROWS):
+                    f.write(np.ascontiguousarray(self._matrix[live[start:start + COMPACT_COPY_ROWS]]).tobytes())
+            with open(compacted._meta_path, "w") as f:
+                for new_row, row in enumerate(live):
+                    f.write(json.dumps({**self._meta[row], "row": new_row}) + "\n")
+            self._swap(compacted)
+        return {"rows_before": rows_before, "rows_after": len(live)}
+
+    def delete_user(self, user_id: str) -> int:
+        """
+        Remove every row of a user from the index files. Blocking file I/O.
+
+        Returns:
+            int: Rows removed (including other users' dead rows dropped by the same compaction)
+        """
+        result = self.compact(drop_user_ids=[user_id])
+        return result["rows_before"] - result["rows_after"]
+
+    def clear(self) -> None:
+        """Delete the index files."""
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._reset()
+
+    def replace_with(self, other: "ConversationIndex") -> None:
+        """
+        Swap another index's files in place of this one's (e.g. a rebuild written beside it).
+
+        Searches in any process switch to the new files on their next refresh.
+        """
+        with self._lock:
+            self._swap(other)
+
+    def _swap(self, other: "ConversationIndex") -> None:
+        retired = f"{self.root}.retired-{uuid.uuid4().hex}"
+        if os.path.exists(self.root):
+            os.rename(self.root, retired)
+        os.rename(other.root, self.root)
+        shutil.rmtree(retired, ignore_errors=True)
+        self._reset()
+
+
+def render_matches(matches: List[Dict[str, Any]], token_budget: int = RETRIEVAL_TOKEN_BUDGET) -> str:
+    """
+    Format retrieved snippets as a system prompt section within the token budget.
+
+    Returns:
+        str: The prompt section, or "" when nothing matched
+    """
+    lines = [PAST_SESSIONS_HEADER]
+    for match in matches:
+        line = f"- {match['snippet']}"
+        if estimate_tokens("\n".join(lines + [line])) > token_budget:
+            break
+        lines.append(line)
+    return "\n".join(lines) if len(lines) > 1 else ""
+
+
+# Global conversation index
+conversation_index = None
+
+def get_conversation_index() -> ConversationIndex:
+    """Get or create the process-wide conversation index."""
+    global conversation_index
+    if conversation_index is None:
+        conversation_index = ConversationIndex()
+    return conversation_index
+
+
+async def index_analysis(user_id: Optional[str], workflow_id: str, data: Dict[str, Any], created_at: Optional[datetime] = None) -> bool:
+    """
+    Add a conversation analysis to the index.
+
+    Returns:
+        bool: True if indexed successfully, False otherwise
+    """
+    if not user_id:
+        return False
+    created_at = created_at or datetime.now(timezone.utc)
+    index = get_conversation_index()
+
+    def write():
+        index.add(user_id, workflow_id, analysis_text(data), analysis_snippet(data, created_at), created_at)
+        if index.needs_compaction():
+            logger.info("Compacting conversation index: %s", index.compact())
+
+    try:
+        await asyncio.to_thread(write)
+        return True
+    except Exception as e:
+        logger.error(f"Error indexing conversation analysis for workflow {workflow_id}: {str(e)}")
+        return False
+
+
+async def delete_user_sessions(user_id: str) -> int:
+    """
+    Remove a user's conversations from the index.
+
+    Returns:
+        int: Rows removed
+    """
+    return await asyncio.to_thread(get_conversation_index().delete_user, user_id)
+
+
+async def retrieve_past_sessions(user_id: Optional[str], message: str, exclude_workflow_id: Optional[str] = None) -> str:
+    """
+    The prompt section with the user's past sessions most relevant to the message.
+
+    Returns:
+        str: The rendered snippets, or "" when nothing relevant is indexed or on error
+    """
+    if not user_id or not message:
+        return ""
+    try:
+        matches = await asyncio.to_thread(
+            get_conversation_index().search, user_id, message, exclude_workflow_id=exclude_workflow_id
+        )
+        return render_matches(matches)
+    except Exception as e:
+        logger.error(f"Error searching past sessions for user {user_id}: {str(e)}")
+        return ""
+
+
+async def rebuild() -> Dict[str, int]:
+    """
+    Rebuild the index from the conversation analyses in the analysis store.
+
+    Returns:
+        dict: Number of analyses indexed
+    """
+    from storage.analysis_store import get_analysis_store
+
+    index = get_conversation_index()
+    records = [record async for record in get_analysis_store().scan("conversation") if record.user_id]
+    records.sort(key=lambda record: record.created_at)
+
+    def write():
+        # Built beside the live index, which keeps serving searches until the swap
+        rebuilt = ConversationIndex(f"{index.root}.rebuild-{uuid.uuid4().hex}", index.dimensions)
+        os.makedirs(rebuilt.root)
+        rebuilt._write_generation()
+        for record in records:
+            rebuilt.add(
+                record.user_id,
+                record.workflow_id,
+                analysis_text(record.data),
+                analysis_snippet(record.data, record.created_at),
+                record.created_at,
+            )
+        index.replace_with(rebuilt)
+
+    await asyncio.to_thread(write)
+    return {"indexed": len(records)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from the analysis store")
+    parser.add_argument("--search", nargs=2, metavar=("USER_ID", "TEXT"), help="Print the top matches for a query")
+    parser.add_argument("--delete-user", metavar="USER_ID", help="Remove a user's conversations from the index")
+    parser.add_argument("--compact", action="store_true", help="Drop superseded rows and sessions over the per-user cap")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.rebuild:
+        print(json.dumps(asyncio.run(rebuild()), indent=2))
+    elif args.search:
+        print(json.dumps(get_conversation_index().search(*args.search), indent=2))
+    elif args.delete_user:
+        print(json.dumps({"removed": asyncio.run(delete_user_sessions(args.delete_user))}, indent=2))
+    elif args.compact:
+        print(json.dumps(get_conversation_index().compact(), indent=2))
+    else:
+        parser.error("nothing to do; pass --rebuild, --search, --delete-user or --compact")
+
+
+if __name__ == "__main__":
+    main()
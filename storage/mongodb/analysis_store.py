@@ -0,0 +1,206 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+
+from storage.analysis_store import AnalysisRecord
+from .config import (
+    MONGO_ANALYSIS_DB,
+    ANALYSIS_WRITE_BATCH_SIZE,
+    ANALYSIS_WRITE_FLUSH_MS,
+    get_async_mongo_client,
+)
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_COLLECTION = "analyses"
+
+# (keys, name): per-user timelines, plus mood (journal) and intent (conversation) lookups over time
+ANALYSIS_INDEXES = [
+    ([("user_id", ASCENDING), ("kind", ASCENDING), ("created_at", DESCENDING)], "user_kind_time"),
+    ([("user_id", ASCENDING), ("summary.mood", ASCENDING), ("created_at", DESCENDING)], "user_mood_time"),
+    ([("user_id", ASCENDING), ("summary.primary_intent", ASCENDING), ("created_at", DESCENDING)], "user_intent_time"),
+    ([("created_at", DESCENDING)], "time"),
+]
+
+
+def _document_id(kind: str, workflow_id: str) -> str:
+    # One record per workflow and kind; re-analysing a workflow replaces it
+    return f"{kind}:{workflow_id}"
+
+
+class MongoAnalysisStore:
+    """
+    Analysis records in MongoDB, one document per (kind, workflow_id).
+
+    save() buffers records and writes them as one unordered bulk upsert when
+    ANALYSIS_WRITE_BATCH_SIZE records are pending or ANALYSIS_WRITE_FLUSH_MS
+    after the first one, so analyses finishing together (e.g. the scheduler
+    analysing expiring sessions) cost one round trip. Reads see buffered
+    records and the batch being written. A failed batch stays buffered and is
+    retried with backoff. Processes that save analyses flush at shutdown
+    (close_analysis_store; the API server's lifespan in webapp.py, the
+    scheduler daemon's stop); records still buffered when a process is killed
+    are lost.
+    """
+
+    MAX_RETRY_SECONDS = 60
+
+    def __init__(
+        self,
+        batch_size: int = ANALYSIS_WRITE_BATCH_SIZE,
+        flush_ms: int = ANALYSIS_WRITE_FLUSH_MS,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_ms / 1000
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # The batch being written, readable until the write finishes
+        self._in_flight: Dict[str, Dict[str, Any]] = {}
+        self._retry_seconds = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._indexes_ready = False
+
+    @property
+    def _collection(self):
+        return get_async_mongo_client()[MONGO_ANALYSIS_DB][ANALYSIS_COLLECTION]
+
+    async def _setup(self) -> None:
+        if self._indexes_ready:
+            return
+        for keys, name in ANALYSIS_INDEXES:
+            await self._collection.create_index(keys, name=name)
+        self._indexes_ready = True
+
+    @staticmethod
+    def _record(document: Dict[str, Any]) -> AnalysisRecord:
+        document = {k: v for k, v in document.items() if k != "_id"}
+        created_at = document.get("created_at")
+        # The client returns naive UTC datetimes
+        if isinstance(created_at, datetime) and created_at.tzinfo is None:
+            document["created_at"] = created_at.replace(tzinfo=timezone.utc)
+        return AnalysisRecord.model_validate(document)
+
+    async def save(self, record: AnalysisRecord) -> None:
+        """Queue a record; it is written with the next batch."""
+        self._pending[_document_id(record.kind, record.workflow_id)] = record.model_dump()
+        if len(self._pending) >= self.batch_size:
+            try:
+                await self.flush()
+            except Exception as e:
+                # The batch stays buffered and flush() has scheduled the retry; the caller's analysis succeeded
+                logger.error(f"Error writing analysis batch, retrying in {self._retry_seconds:g}s: {str(e)}")
+        else:
+            self._schedule_flush(self.flush_seconds)
+
+    def _schedule_flush(self, delay: float) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # A failure below schedules the retry, so this task no longer counts as the pending one
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error writing analysis batch, retrying in {self._retry_seconds:g}s: {str(e)}")
+
+    async def flush(self) -> int:
+        """
+        Write all buffered records in one bulk upsert.
+
+        Returns:
+            int: Number of records written
+        """
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._in_flight = batch
+            try:
+                await self._setup()
+                await self._collection.bulk_write(
+                    [ReplaceOne({"_id": document_id}, document, upsert=True) for document_id, document in batch.items()],
+                    ordered=False,
+                )
+            except Exception:
+                # Keep the batch for a retry, unless a newer version was queued meanwhile
+                for document_id, document in batch.items():
+                    self._pending.setdefault(document_id, document)
+                self._retry_seconds = min(self.MAX_RETRY_SECONDS, max(1.0, self.flush_seconds, self._retry_seconds * 2))
+                self._schedule_flush(self._retry_seconds)
+                raise
+            finally:
+                self._in_flight = {}
+            self._retry_seconds = 0.0
+            logger.debug(f"Wrote {len(batch)} analysis records")
+            return len(batch)
+
+    async def load(self, kind: str, workflow_id: str) -> Optional[AnalysisRecord]:
+        """
+        Read a record, including one that is still buffered or being written.
+
+        Returns:
+            Optional[AnalysisRecord]: The record, or None if there is none
+        """
+        document_id = _document_id(kind, workflow_id)
+        document = (
+            self._pending.get(document_id)
+            or self._in_flight.get(document_id)
+            or await self._collection.find_one({"_id": document_id})
+        )
+        return self._record(document) if document else None
+
+    async def find(
+        self,
+        user_id: str,
+        kind: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        mood: Optional[str] = None,
+        primary_intent: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[AnalysisRecord]:
+        """
+        A user's analyses, newest first, served by the user_* indexes.
+
+        Args:
+            user_id: The user whose analyses to return
+            kind: Only "conversation" or only "journal" analyses
+            since: Only analyses created at or after this time
+            until: Only analyses created before this time
+            mood: Only journal analyses with this mood
+            primary_intent: Only conversation analyses with this primary intent
+            limit: Maximum number of records
+
+        Returns:
+            List[AnalysisRecord]: The matching records
+        """
+        await self.flush()
+        query: Dict[str, Any] = {"user_id": user_id}
+        if kind:
+            query["kind"] = kind
+        if mood:
+            query["summary.mood"] = mood
+        if primary_intent:
+            query["summary.primary_intent"] = primary_intent
+        if since or until:
+            query["created_at"] = {}
+            if since:
+                query["created_at"]["$gte"] = since
+            if until:
+                query["created_at"]["$lt"] = until
+        cursor = self._collection.find(query).sort("created_at", DESCENDING).limit(limit)
+        return [self._record(document) for document in await cursor.to_list()]
+
+    async def scan(self, kind: str, user_id: Optional[str] = None) -> AsyncIterator[AnalysisRecord]:
+        """Every record of a kind (optionally of one user), streamed from a cursor."""
+        await self.flush()
+        query: Dict[str, Any] = {"kind": kind}
+        if user_id:
+            query["user_id"] = user_id
+        async for document in self._collection.find(query):
+            yield self._record(document)
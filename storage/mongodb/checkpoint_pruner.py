@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from .checkpointer import CHECKPOINT_COLLECTION, WRITES_COLLECTION
+from .config import (
+    MONGO_CHECKPOINT_DB,
+    CHECKPOINT_KEEP_LAST,
+    CHECKPOINT_IDLE_TTL_SECONDS,
+    CHECKPOINT_PRUNE_INTERVAL_SECONDS,
+    CHECKPOINT_PRUNE_BATCH_SIZE,
+    get_async_mongo_client,
+)
+
+logger = logging.getLogger(__name__)
+
+# Mongo error codes for an existing index with the same key but different options
+_INDEX_OPTIONS_CONFLICT = {85, 86}
+
+# Server-generated ObjectIds may be slightly ahead of this host's clock
+_CLOCK_SKEW = timedelta(minutes=1)
+
+
+class CheckpointPruner:
+    """
+    Retention policy for the MongoDB checkpoint collections.
+
+    - Idle expiry: TTL indexes on created_at delete checkpoints and writes
+      CHECKPOINT_IDLE_TTL_SECONDS after they were written, so a thread idle
+      that long disappears entirely. Documents written before the TTL was
+      enabled have no created_at; they are expired by their ObjectId time.
+    - Per-thread cap: only the newest CHECKPOINT_KEEP_LAST checkpoints (and
+      their writes) are kept per (thread_id, checkpoint_ns). After the first
+      full pass, only threads written since the previous pass are checked.
+
+    Deletes run in batches of CHECKPOINT_PRUNE_BATCH_SIZE so a pass never holds
+    a long-running operation against the live collections.
+    """
+
+    def __init__(
+        self,
+        keep_last: int = CHECKPOINT_KEEP_LAST,
+        idle_ttl_seconds: int = CHECKPOINT_IDLE_TTL_SECONDS,
+        batch_size: int = CHECKPOINT_PRUNE_BATCH_SIZE,
+        interval_seconds: int = CHECKPOINT_PRUNE_INTERVAL_SECONDS,
+    ):
+        self.keep_last = keep_last
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.batch_size = max(1, batch_size)
+        self.interval_seconds = interval_seconds
+        self.is_running = False
+        self._job_id = "checkpoint_prune_job"
+        # Threads with checkpoints inserted after this ObjectId are checked on the next pass
+        self._since: Optional[ObjectId] = None
+        self.scheduler = AsyncIOScheduler(
+            timezone=timezone.utc,
+            job_defaults={"coalesce": True, "max_instances": 1},
+        )
+
+    @property
+    def _db(self):
+        return get_async_mongo_client()[MONGO_CHECKPOINT_DB]
+
+    async def ensure_ttl_indexes(self) -> None:
+        """Create (or update the expiry of) the created_at TTL index on both collections."""
+        if not self.idle_ttl_seconds:
+            return
+        for name in (CHECKPOINT_COLLECTION, WRITES_COLLECTION):
+            try:
+                await self._db[name].create_index([("created_at", 1)], expireAfterSeconds=self.idle_ttl_seconds)
+            except OperationFailure as e:
+                if e.code not in _INDEX_OPTIONS_CONFLICT:
+                    raise
+                await self._db.command({
+                    "collMod": name,
+                    "index": {"keyPattern": {"created_at": 1}, "expireAfterSeconds": self.idle_ttl_seconds},
+                })
+
+    async def _collection_sizes(self) -> Tuple[int, int]:
+        """Total (data size, free reusable storage) in bytes across both collections."""
+        size = free = 0
+        for name in (CHECKPOINT_COLLECTION, WRITES_COLLECTION):
+            stats = await self._db.command("collStats", name)
+            size += stats.get("size", 0)
+            free += stats.get("freeStorageSize", 0)
+        return size, free
+
+    async def _expire_untimestamped(self, name: str) -> int:
+        """Delete documents without created_at that are older than the idle TTL, in batches."""
+        cutoff = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=self.idle_ttl_seconds))
+        query = {"_id": {"$lt": cutoff}, "created_at": {"$exists": False}}
+        collection = self._db[name]
+        deleted = 0
+        while True:
+            ids = [doc["_id"] for doc in await collection.find(query, {"_id": 1}).limit(self.batch_size).to_list()]
+            if not ids:
+                return deleted
+            deleted += (await collection.delete_many({"_id": {"$in": ids}})).deleted_count
+
+    async def _trim_thread(self, thread_id: str, checkpoint_ns: str) -> Tuple[int, int]:
+        """Delete all but the newest keep_last checkpoints (and their writes) of one thread namespace."""
+        thread = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        # checkpoint_id is a time-ordered uuid6, so it sorts newest-first on the unique index
+        newest_dropped = await self._db[CHECKPOINT_COLLECTION].find(thread, {"checkpoint_id": 1}) \
+            .sort("checkpoint_id", -1).skip(self.keep_last).limit(1).to_list()
+        if not newest_dropped:
+            return 0, 0
+        query = {**thread, "checkpoint_id": {"$lte": newest_dropped[0]["checkpoint_id"]}}
+        checkpoints = await self._db[CHECKPOINT_COLLECTION].delete_many(query)
+        writes = await self._db[WRITES_COLLECTION].delete_many(query)
+        return checkpoints.deleted_count, writes.deleted_count
+
+    async def _trim_threads(self) -> Dict[str, int]:
+        pass_started = ObjectId.from_datetime(datetime.now(timezone.utc) - _CLOCK_SKEW)
+        match = {"_id": {"$gt": self._since}} if self._since is not None else {}
+        cursor = await self._db[CHECKPOINT_COLLECTION].aggregate([
+            {"$match": match},
+            {"$group": {"_id": {"thread_id": "$thread_id", "checkpoint_ns": "$checkpoint_ns"}}},
+        ])
+        threads = [doc["_id"] for doc in await cursor.to_list()]
+
+        totals = {"threads_checked": len(threads), "threads_trimmed": 0, "checkpoints_trimmed": 0, "writes_trimmed": 0}
+        for start in range(0, len(threads), self.batch_size):
+            batch = threads[start:start + self.batch_size]
+            for checkpoints, writes in await asyncio.gather(*(
+                self._trim_thread(thread["thread_id"], thread.get("checkpoint_ns", "")) for thread in batch
+            )):
+                totals["threads_trimmed"] += 1 if checkpoints else 0
+                totals["checkpoints_trimmed"] += checkpoints
+                totals["writes_trimmed"] += writes
+
+        self._since = pass_started
+        return totals
+
+    async def prune(self) -> Dict[str, Any]:
+        """
+        Run one retention pass.
+
+        Returns:
+            dict: Deleted document counts and bytes reclaimed. bytes_reclaimed is
+            the drop in data size during this pass; free_storage_bytes is space
+            WiredTiger will reuse for new writes.
+        """
+        started = datetime.now(timezone.utc)
+        size_before, _ = await self._collection_sizes()
+        report: Dict[str, Any] = {}
+
+        if self.idle_ttl_seconds:
+            await self.ensure_ttl_indexes()
+            report["checkpoints_expired"] = await self._expire_untimestamped(CHECKPOINT_COLLECTION)
+            report["writes_expired"] = await self._expire_untimestamped(WRITES_COLLECTION)
+        if self.keep_last > 0:
+            report.update(await self._trim_threads())
+
+        size_after, free_after = await self._collection_sizes()
+        report.update({
+            "data_bytes_before": size_before,
+            "data_bytes_after": size_after,
+            "bytes_reclaimed": max(0, size_before - size_after),
+            "free_storage_bytes": free_after,
+            "duration_seconds": round((datetime.now(timezone.utc) - started).total_seconds(), 3),
+        })
+        logger.info(f"Checkpoint pruning completed: {report}")
+        return report
+
+    async def _run_job(self):
+        try:
+            await self.prune()
+        except Exception as e:
+            logger.error(f"Error during checkpoint pruning: {str(e)}")
+
+    async def start(self) -> bool:
+        """Start pruning every interval_seconds in the background."""
+        if self.is_running:
+            logger.warning("CheckpointPruner is already running")
+            return False
+        self.scheduler.start()
+        self.scheduler.add_job(
+            self._run_job,
+            trigger=IntervalTrigger(seconds=self.interval_seconds),
+            id=self._job_id,
+            name="Prune Checkpoints",
+            next_run_time=datetime.now(timezone.utc),
+            replace_existing=True,
+        )
+        self.is_running = True
+        logger.info(f"CheckpointPruner started, running every {self.interval_seconds} seconds")
+        return True
+
+    async def stop(self) -> bool:
+        """Stop the background pruning job."""
+        if not self.is_running:
+            return True
+        self.scheduler.shutdown(wait=False)
+        self.is_running = False
+        logger.info("CheckpointPruner stopped")
+        return True
+
+
+if __name__ == "__main__":
+    from .config import close_mongo_clients
+
+    async def _prune_once():
+        try:
+            return await CheckpointPruner().prune()
+        finally:
+            await close_mongo_clients()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(asyncio.run(_prune_once()), indent=2))
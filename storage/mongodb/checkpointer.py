@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import warnings
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+from utils.tracing import instrument_checkpointer
+from .config import (
+    MONGO_CHECKPOINTER_MODE,
+    MONGO_CHECKPOINT_DB,
+    CHECKPOINT_IDLE_TTL_SECONDS,
+    get_mongo_client,
+    get_async_mongo_client,
+)
+
+logger = logging.getLogger(__name__)
+
+# Both modes read and write the same collections, so switching modes keeps existing threads
+CHECKPOINT_COLLECTION = "checkpoints"
+WRITES_COLLECTION = "checkpoint_writes"
+
+
+@asynccontextmanager
+async def mongo_checkpointer(mode: Optional[str] = None) -> AsyncIterator[BaseCheckpointSaver]:
+    """
+    Open a MongoDB checkpointer on the shared client for the lifetime of the context.
+
+    Modes:
+    - "async": AsyncMongoDBSaver on the native async driver; checkpoint reads and
+      writes never block the event loop or hop to a thread
+    - "sync": MongoDBSaver, whose async methods run pymongo calls in a thread pool
+
+    With CHECKPOINT_IDLE_TTL_SECONDS set, documents carry a created_at field for
+    the TTL indexes (see checkpoint_pruner.py). The shared clients are not
+    closed on exit (see close_mongo_clients).
+
+    Args:
+        mode: "async" or "sync" (defaults to MONGO_CHECKPOINTER_MODE)
+
+    Yields:
+        BaseCheckpointSaver: The checkpointer, with indexes created
+    """
+    mode = mode or MONGO_CHECKPOINTER_MODE
+    # Imported here: the savers pull in pymongo, which callers that never checkpoint don't need
+    from langgraph.checkpoint.mongodb import MongoDBSaver
+    from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+
+    if mode == "async":
+        with warnings.catch_warnings():
+            # Deprecated in favour of MongoDBSaver's async methods, which are thread-pool wrappers
+            warnings.simplefilter("ignore", DeprecationWarning)
+            saver = AsyncMongoDBSaver(
+                get_async_mongo_client(),
+                db_name=MONGO_CHECKPOINT_DB,
+                checkpoint_collection_name=CHECKPOINT_COLLECTION,
+                writes_collection_name=WRITES_COLLECTION,
+                ttl=CHECKPOINT_IDLE_TTL_SECONDS or None,
+            )
+        await saver._setup()
+    elif mode == "sync":
+        # The constructor creates indexes with blocking calls
+        saver = await asyncio.to_thread(
+            MongoDBSaver,
+            get_mongo_client(),
+            db_name=MONGO_CHECKPOINT_DB,
+            checkpoint_collection_name=CHECKPOINT_COLLECTION,
+            writes_collection_name=WRITES_COLLECTION,
+            ttl=CHECKPOINT_IDLE_TTL_SECONDS or None,
+        )
+    else:
+        raise ValueError(f"Unknown MONGO_CHECKPOINTER_MODE '{mode}' (expected async or sync)")
+
+    logger.info(f"Mongo checkpointer ready ({mode} mode)")
+    yield instrument_checkpointer(saver)
@@ -0,0 +1,97 @@
+from typing import TYPE_CHECKING
+import os
+from dotenv import load_dotenv
+import logging
+
+if TYPE_CHECKING:
+    from pymongo import AsyncMongoClient, MongoClient
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+MONGO_CONNECTION_URL = os.environ.get("MONGO_CONNECTION_URL")
+
+# Checkpointer mode: "async" (native async driver) or "sync" (pymongo in a thread pool)
+MONGO_CHECKPOINTER_MODE = os.environ.get("MONGO_CHECKPOINTER_MODE", "async").lower()
+MONGO_CHECKPOINT_DB = os.environ.get("MONGO_CHECKPOINT_DB", "checkpointing_db")
+
+# Connection pool, write concern and timeouts shared by every Mongo client
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_WRITE_CONCERN = os.environ.get("MONGO_WRITE_CONCERN", "1")
+MONGO_WRITE_JOURNAL = os.environ.get("MONGO_WRITE_JOURNAL", "false").lower() == "true"
+MONGO_WTIMEOUT_MS = int(os.environ.get("MONGO_WTIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+
+# Checkpoint retention: keep the newest N checkpoints per thread, expire checkpoints idle longer than the TTL
+CHECKPOINT_KEEP_LAST = int(os.environ.get("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_IDLE_TTL_SECONDS = int(os.environ.get("CHECKPOINT_IDLE_TTL_SECONDS", str(30 * 24 * 3600)))
+CHECKPOINT_PRUNE_ENABLED = os.environ.get("CHECKPOINT_PRUNE_ENABLED", "true").lower() == "true"
+CHECKPOINT_PRUNE_INTERVAL_SECONDS = int(os.environ.get("CHECKPOINT_PRUNE_INTERVAL_SECONDS", "3600"))
+CHECKPOINT_PRUNE_BATCH_SIZE = int(os.environ.get("CHECKPOINT_PRUNE_BATCH_SIZE", "500"))
+
+# Analysis results (storage/mongodb/analysis_store.py): writes are buffered and sent as one bulk write
+MONGO_ANALYSIS_DB = os.environ.get("MONGO_ANALYSIS_DB", "analysis_db")
+ANALYSIS_WRITE_BATCH_SIZE = int(os.environ.get("ANALYSIS_WRITE_BATCH_SIZE", "100"))
+ANALYSIS_WRITE_FLUSH_MS = int(os.environ.get("ANALYSIS_WRITE_FLUSH_MS", "500"))
+
+# Global clients, one connection pool each
+mongo_client = None
+async_mongo_client = None
+
+
+def client_options() -> dict:
+    """Pool, write concern and timeout options passed to MongoClient/AsyncMongoClient."""
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "w": int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN,
+        "journal": MONGO_WRITE_JOURNAL,
+        "wTimeoutMS": MONGO_WTIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+    }
+
+
+def get_mongo_client() -> "MongoClient":
+    """Get or create the synchronous Mongo client."""
+    global mongo_client
+    if mongo_client is None:
+        try:
+            from pymongo import MongoClient
+            # Connects lazily; the first operation opens the pool
+            mongo_client = MongoClient(MONGO_CONNECTION_URL, **client_options())
+            logger.info("Mongo client created successfully")
+        except Exception as e:
+            logger.error(f"Failed to create Mongo client: {str(e)}")
+            raise
+    return mongo_client
+
+
+def get_async_mongo_client() -> "AsyncMongoClient":
+    """Get or create the async Mongo client (bound to the event loop that first uses it)."""
+    global async_mongo_client
+    if async_mongo_client is None:
+        try:
+            from pymongo import AsyncMongoClient
+            async_mongo_client = AsyncMongoClient(MONGO_CONNECTION_URL, **client_options())
+            logger.info("Async Mongo client created successfully")
+        except Exception as e:
+            logger.error(f"Failed to create async Mongo client: {str(e)}")
+            raise
+    return async_mongo_client
+
+
+async def close_mongo_clients():
+    """Close both clients and their pools. Call this at application shutdown."""
+    global mongo_client, async_mongo_client
+    if async_mongo_client is not None:
+        await async_mongo_client.close()
+        async_mongo_client = None
+    if mongo_client is not None:
+        mongo_client.close()
+        mongo_client = None
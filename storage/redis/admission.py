@@ -0,0 +1,137 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from config.settings import (
+    ADMISSION_ENABLED,
+    ADMISSION_USER_RATE_PER_MINUTE,
+    ADMISSION_USER_BURST,
+    ADMISSION_SYSTEM_LIMITS,
+    ADMISSION_GLOBAL_RATE_PER_MINUTE,
+    ADMISSION_GLOBAL_BURST,
+)
+from utils import metrics
+from .config import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# KEYS: bucket keys, checked in order
+# ARGV[1]: cost; ARGV[2i], ARGV[2i+1]: refill rate (tokens/second) and capacity of KEYS[i]
+# All buckets are charged or none is: returns {0, "0"} when admitted, otherwise the
+# 1-based index of the first bucket that is short and the seconds until it has enough.
+# Redis server time is used so every node refills buckets on the same clock.
+_ADMIT_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i])
+    local capacity = tonumber(ARGV[2 * i + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local level = tonumber(bucket[1]) or capacity
+    local elapsed = math.max(0, now - (tonumber(bucket[2]) or now))
+    level = math.min(capacity, level + elapsed * rate)
+    if level < cost then
+        return {i, tostring((cost - level) / rate)}
+    end
+    levels[i] = level
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i])
+    local capacity = tonumber(ARGV[2 * i + 1])
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - cost), 'ts', tostring(now))
+    -- An idle bucket is full again after capacity / rate seconds; it can go until then
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+end
+return {0, '0'}
+"""
+
+
+@dataclass
+class Admission:
+    """The outcome of an admission check."""
+
+    admitted: bool
+    scope: Optional[str] = None
+    retry_after_seconds: float = 0.0
+
+    def as_state(self) -> dict:
+        """The `throttled` value kept in SystemState for a rejected request."""
+        return {"scope": self.scope, "retry_after_seconds": round(self.retry_after_seconds, 2)}
+
+
+class AdmissionControl:
+    """
+    Token-bucket admission control in front of the LLM-backed agents.
+
+    A request is charged against up to three buckets in one atomic Lua call:
+    the user's (across systems), the system's (companion / journal) and the
+    global one. It is admitted only if all of them have a token, so a single
+    user cannot exhaust the shared LLM quota. Limits of 0 disable a scope.
+    If Redis is unavailable, requests are admitted (fail open).
+    """
+
+    KEY_PREFIX = "admission:"
+    # Registered on first use; sent by SHA (EVALSHA) on every request after that
+    _script = None
+
+    @classmethod
+    def buckets(cls, user_id: Optional[str], system: Optional[str]) -> List[Tuple[str, str, float, float]]:
+        """
+        The buckets a request is charged against.
+
+        Returns:
+            List[Tuple]: (scope, key, tokens per second, capacity) per enabled scope
+        """
+        limits = []
+        if user_id and ADMISSION_USER_RATE_PER_MINUTE > 0:
+            limits.append(("user", f"{cls.KEY_PREFIX}user:{user_id}", ADMISSION_USER_RATE_PER_MINUTE, ADMISSION_USER_BURST))
+        system_rate, system_burst = ADMISSION_SYSTEM_LIMITS.get(system, (0, 0))
+        if system_rate > 0:
+            limits.append(("system", f"{cls.KEY_PREFIX}system:{system}", system_rate, system_burst))
+        if ADMISSION_GLOBAL_RATE_PER_MINUTE > 0:
+            limits.append(("global", f"{cls.KEY_PREFIX}global", ADMISSION_GLOBAL_RATE_PER_MINUTE, ADMISSION_GLOBAL_BURST))
+        return [(scope, key, rate / 60, max(1, burst)) for scope, key, rate, burst in limits]
+
+    @classmethod
+    async def admit(cls, user_id: Optional[str], system: Optional[str], cost: int = 1) -> Admission:
+        """
+        Charge a request against its buckets.
+
+        Args:
+            user_id: The requesting user
+            system: "companion" or "journal"
+            cost: Tokens the request takes
+
+        Returns:
+            Admission: admitted, or the scope that throttled it and when to retry
+        """
+        if not ADMISSION_ENABLED:
+            return Admission(admitted=True)
+        buckets = cls.buckets(user_id, system)
+        if not buckets:
+            return Admission(admitted=True)
+        try:
+            redis = await get_redis_client()
+            if cls._script is None:
+                cls._script = redis.register_script(_ADMIT_SCRIPT)
+            args = [cost]
+            for _, _, rate, capacity in buckets:
+                args.extend([rate, capacity])
+            index, retry_after = await cls._script(keys=[key for _, key, _, _ in buckets], args=args)
+        except Exception as e:
+            logger.error(f"Admission check failed, admitting request: {str(e)}")
+            metrics.increment("admission.errors")
+            return Admission(admitted=True)
+
+        if index == 0:
+            metrics.increment("admission.admitted")
+            return Admission(admitted=True)
+        scope = buckets[index - 1][0]
+        metrics.increment("admission.throttled")
+        metrics.increment(f"admission.throttled.scope.{scope}")
+        if system:
+            metrics.increment(f"admission.throttled.system.{system}")
+        logger.info(f"Throttled {system} request from user {user_id} ({scope} limit)")
+        return Admission(admitted=False, scope=scope, retry_after_seconds=float(retry_after))
@@ -1,6 +1,15 @@
 import logging
-from typing import List, Dict, ClassVar, Type, TypeVar, Any
+from typing import List, ClassVar, Type, TypeVar
 from pydantic import BaseModel, Field
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
 from .save_history import save_messages_to_redis
 from .load_history import load_history
 
@@ -16,11 +25,14 @@ class BaseAgentHistory(BaseModel):
     All agent history classes should inherit from this class to use Redis
     for message storage with automatic expiration.
     
+    Messages are native pydantic-ai `ModelMessage` objects so they can be replayed
+    through `agent.run(message_history=...)` instead of being dumped into the prompt.
+
     Attributes:
-        messages: List of message dictionaries to be stored
+        messages: List of pydantic-ai messages to be stored
         agent_type: Class variable that must be overridden by subclasses to specify agent type
     """
-    messages: List[Dict[str, Any]] = Field(default_factory=list, description="List of message dictionaries")
+    messages: List[ModelMessage] = Field(default_factory=list, description="List of pydantic-ai messages")
     agent_type: ClassVar[str] = ""  # Must be overridden by subclasses
     
     def __init_subclass__(cls, **kwargs):
@@ -84,20 +96,9 @@ class BaseAgentHistory(BaseModel):
             raise ValueError("workflow_id must be provided")
             
         try:
-            # Convert messages to JSON-serializable format
-            serializable_messages = []
-            for msg in self.messages:
-                serialized_msg = {}
-                for key, value in msg.items():
-                    if hasattr(value, 'model_dump'):
-                        serialized_msg[key] = value.model_dump()
-                    else:
-                        serialized_msg[key] = value
-                serializable_messages.append(serialized_msg)
-            
             # Save to Redis (with expiry automatically set)
-            logger.debug(f"Saving {len(serializable_messages)} messages for {self.__class__.__name__}, workflow: {workflow_id}")
-            result = await save_messages_to_redis(workflow_id, self.__class__.agent_type, serializable_messages, user_id)
+            logger.debug(f"Saving {len(self.messages)} messages for {self.__class__.__name__}, workflow: {workflow_id}")
+            result = await save_messages_to_redis(workflow_id, self.__class__.agent_type, self.messages, user_id)
             
             if result:
                 logger.debug(f"Successfully saved {self.__class__.__name__} for workflow: {workflow_id}")
@@ -107,4 +108,45 @@ class BaseAgentHistory(BaseModel):
             return result
         except Exception as e:
             logger.error(f"Error saving {self.__class__.__name__} for workflow {workflow_id}: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+
+    def transcript(self, user_label: str = "User", assistant_label: str = "Assistant") -> str:
+        """
+        Render the stored messages as a compact plain-text transcript.
+
+        Static system prompts and tool plumbing are skipped; dynamic system prompt
+        parts (e.g. the companion persona) are kept as context lines unless they
+        were saved empty.
+
+        Args:
+            user_label: Label used for user turns
+            assistant_label: Label used for assistant turns
+
+        Returns:
+            str: One line per turn, e.g. "User: hi"
+        """
+        lines = []
+        for message in self.messages:
+            if isinstance(message, ModelRequest):
+                for part in message.parts:
+                    if isinstance(part, SystemPromptPart) and part.dynamic_ref and part.content:
+                        lines.append(f"Context: {part.content}")
+                    elif isinstance(part, UserPromptPart):
+                        if isinstance(part.content, str):
+                            text = part.content
+                        else:
+                            text = " ".join(
+                                item if isinstance(item, str) else f"[{getattr(item, 'kind', 'attachment')}]"
+                                for item in part.content
+                            )
+                        lines.append(f"{user_label}: {text}")
+            elif isinstance(message, ModelResponse):
+                for part in message.parts:
+                    if isinstance(part, TextPart) and part.content:
+                        lines.append(f"{assistant_label}: {part.content}")
+                    elif isinstance(part, ToolCallPart):
+                        # Structured outputs arrive as an output tool call carrying the reply
+                        response = part.args_as_dict().get("response")
+                        if response:
+                            lines.append(f"{assistant_label}: {response}")
+        return "\n".join(lines)
@@ -1,52 +1,94 @@
 import json
 import logging
 from typing import Any, Dict, List
+from pydantic import ValidationError
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    UserPromptPart,
+)
 from .history_key_mapping import get_message_key
 from ..config import get_redis_client, MESSAGE_EXPIRY_SECONDS
 
 logger = logging.getLogger(__name__)
 
+
+def convert_legacy_messages(legacy: List[Dict[str, Any]]) -> List[ModelMessage]:
+    """
+    Converts the legacy `{"user": ..., "assistant": ...}` turn dicts into pydantic-ai messages.
+
+    Sessions written before history was stored as native `ModelMessage` objects
+    are still readable until they expire from Redis.
+
+    Args:
+        legacy: List of turn dictionaries in the old storage format
+
+    Returns:
+        List[ModelMessage]: Equivalent request/response message pairs
+    """
+    messages: List[ModelMessage] = []
+    for turn in legacy:
+        if not isinstance(turn, dict):
+            continue
+        user = turn.get("user")
+        if isinstance(user, dict):
+            user = user.get("response")
+        if user:
+            messages.append(ModelRequest(parts=[UserPromptPart(content=str(user))]))
+        assistant = turn.get("assistant")
+        if assistant:
+            messages.append(ModelResponse(parts=[TextPart(content=str(assistant))]))
+    return messages
+
+
 # Loading messages from Redis
-async def load_history(workflow_id: str, agent_type: str) -> List[Dict[str, Any]]:
+async def load_history(workflow_id: str, agent_type: str) -> List[ModelMessage]:
     """
     Loads messages from Redis.
-    
+
     Args:
         workflow_id: The unique identifier for the workflow
         agent_type: The type of agent (e.g., 'worker_agent', 'sub_agent')
-        
+
     Returns:
-        List[Dict[str, Any]]: List of message dictionaries or empty list if not found or on error
+        List[ModelMessage]: List of pydantic-ai messages or empty list if not found or on error
     """
     if not workflow_id or not agent_type:
         logger.error("Invalid arguments: workflow_id and agent_type must be provided")
         return []
-        
+
     key = await get_message_key(workflow_id, agent_type)
-    
+
     try:
         # Get redis client
         redis = await get_redis_client()
-        
+
         # Retrieve from Redis (async)
         messages_json = await redis.get(key)
-        
+
         if not messages_json:
             logger.debug(f"No messages found for workflow: {workflow_id}, agent: {agent_type}")
             return []
-            
+
         # Reset expiration time on access
         try:
             await redis.expire(key, MESSAGE_EXPIRY_SECONDS)
         except Exception as e:
             logger.warning(f"Failed to reset expiration for key {key}: {str(e)}")
             # Continue since the data was retrieved successfully
-            
-        # Parse JSON string to Python object
-        messages = json.loads(messages_json)
+
+        # Parse JSON bytes straight into pydantic-ai messages
+        try:
+            messages = ModelMessagesTypeAdapter.validate_json(messages_json)
+        except ValidationError:
+            logger.debug(f"Converting legacy history format for workflow: {workflow_id}, agent: {agent_type}")
+            messages = convert_legacy_messages(json.loads(messages_json))
         logger.debug(f"Successfully loaded {len(messages)} messages for workflow: {workflow_id}, agent: {agent_type}")
         return messages
-    
+
     except json.JSONDecodeError as e:
         logger.error(f"JSON parsing error for workflow {workflow_id}: {str(e)}")
         return []
@@ -1,6 +1,6 @@
-import json
 import logging
-from typing import Any, Dict, List
+from typing import List
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
 from .history_key_mapping import get_message_key
 from ..config import get_redis_client, MESSAGE_EXPIRY_SECONDS
 from ..session_registry import SessionRegistry
@@ -11,7 +11,7 @@ logger = logging.getLogger(__name__)
 async def save_messages_to_redis(
     workflow_id: str, 
     agent_type: str, 
-    messages: Any,
+    messages: List[ModelMessage],
     user_id: str = None
 ) -> bool:
     """
@@ -20,7 +20,7 @@ async def save_messages_to_redis(
     Args:
         workflow_id: The unique identifier for the workflow
         agent_type: The type of agent (e.g., 'general_agent', 'companion_agent')
-        messages: List of message dictionaries to store
+        messages: List of pydantic-ai messages to store
         user_id: The unique identifier for the user (optional, for session registration)
         
     Returns:
@@ -40,8 +40,8 @@ async def save_messages_to_redis(
         # Get redis client
         redis = await get_redis_client()
         
-        # Serialize messages to JSON string
-        messages_json = json.dumps(messages)
+        # Serialize messages to compact JSON bytes
+        messages_json = ModelMessagesTypeAdapter.dump_json(messages)
         
         # Use async Redis client
         result = await redis.setex(
@@ -64,7 +64,7 @@ async def save_messages_to_redis(
                 # Don't fail the save operation if session registration fails
         
         return result  # Redis returns True if successful
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         logger.error(f"JSON serialization error for workflow {workflow_id}: {str(e)}")
         return False
     except Exception as e:
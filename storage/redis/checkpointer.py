@@ -0,0 +1,560 @@
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import ormsgpack
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from storage.mongodb.config import CHECKPOINT_KEEP_LAST
+from utils import metrics
+from .config import (
+    get_redis_client,
+    HOT_CHECKPOINT_IDLE_SECONDS,
+    HOT_CHECKPOINT_FLUSH_INTERVAL_SECONDS,
+    HOT_CHECKPOINT_FLUSH_BATCH_SIZE,
+    HOT_CHECKPOINT_KEY_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Removes one flushed checkpoint and the writes that were flushed with it. Writes that
+# arrived during the flush keep the checkpoint hot, so the next pass picks them up.
+# KEYS: checkpoints hash, index zset, writes hash
+# ARGV: checkpoint id, "1" to drop all writes, flushed write fields...
+_RELEASE_SCRIPT = """
+if ARGV[2] == '1' then
+    redis.call('DEL', KEYS[3])
+else
+    for i = 3, #ARGV do
+        redis.call('HDEL', KEYS[3], ARGV[i])
+    end
+end
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+return 1
+"""
+
+# Marks a namespace (and, once none is left, the thread) cold when nothing was written during the flush
+# KEYS: index zset, namespaces set, active threads zset
+# ARGV: checkpoint namespace, thread id
+_DEACTIVATE_SCRIPT = """
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+if redis.call('SCARD', KEYS[2]) == 0 then
+    redis.call('ZREM', KEYS[3], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+def _is_duplicate_write(error: Exception) -> bool:
+    """Whether a cold-store write failed only because the documents already exist (re-flush)."""
+    if isinstance(error, DuplicateKeyError):
+        return True
+    if isinstance(error, BulkWriteError):
+        errors = error.details.get("writeErrors", [])
+        return bool(errors) and all(e.get("code") == 11000 for e in errors)
+    return False
+
+
+class RedisHotCheckpointer(BaseCheckpointSaver):
+    """
+    Two-tier checkpointer: active threads live in Redis, idle threads in MongoDB.
+
+    Every checkpoint and write goes to Redis in a single pipelined round trip.
+    Reads are served from Redis and fall back to the cold saver for threads that
+    are not hot (never seen or already flushed). flush_idle() copies threads
+    with no activity for HOT_CHECKPOINT_IDLE_SECONDS to the cold saver and then
+    removes exactly what it copied, so turns that race with a flush stay hot.
+    Only the newest CHECKPOINT_KEEP_LAST checkpoints per namespace are flushed;
+    the pruner would delete older ones anyway.
+
+    Redis layout, per (thread_id, checkpoint_ns):
+    - checkpoint:{thread}:{ns}              hash  checkpoint_id -> packed checkpoint
+    - checkpoint_index:{thread}:{ns}        zset  checkpoint ids, ordered lexically (uuid6 = time order)
+    - checkpoint_writes:{thread}:{ns}:{id}  hash  "{task_id}:{idx}" -> packed write
+    - checkpoint_ns:{thread}                set   hot namespaces of the thread
+    - checkpoint_active_threads             zset  thread_id scored by last activity
+
+    Only the async interface is implemented; graphs using it must be run with
+    ainvoke/astream.
+    """
+
+    CHECKPOINT_KEY_PREFIX = "checkpoint:"
+    INDEX_KEY_PREFIX = "checkpoint_index:"
+    WRITES_KEY_PREFIX = "checkpoint_writes:"
+    NAMESPACES_KEY_PREFIX = "checkpoint_ns:"
+    ACTIVE_THREADS_KEY = "checkpoint_active_threads"
+
+    def __init__(
+        self,
+        cold: BaseCheckpointSaver,
+        keep_last: int = CHECKPOINT_KEEP_LAST,
+        key_ttl_seconds: int = HOT_CHECKPOINT_KEY_TTL_SECONDS,
+    ):
+        # Same serializer as the cold saver, so flushed checkpoints read back identically
+        super().__init__(serde=cold.serde)
+        self.cold = cold
+        self.keep_last = keep_last
+        self.key_ttl_seconds = key_ttl_seconds
+
+    def get_next_version(self, current, channel):
+        return self.cold.get_next_version(current, channel)
+
+    # Keys
+
+    def _checkpoint_key(self, thread_id: str, checkpoint_ns: str) -> str:
+        return f"{self.CHECKPOINT_KEY_PREFIX}{thread_id}:{checkpoint_ns}"
+
+    def _index_key(self, thread_id: str, checkpoint_ns: str) -> str:
+        return f"{self.INDEX_KEY_PREFIX}{thread_id}:{checkpoint_ns}"
+
+    def _writes_key(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+        return f"{self.WRITES_KEY_PREFIX}{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+    def _namespaces_key(self, thread_id: str) -> str:
+        return f"{self.NAMESPACES_KEY_PREFIX}{thread_id}"
+
+    def _touch(self, pipe, thread_id: str, checkpoint_ns: str, *keys: str) -> None:
+        """Queue the bookkeeping shared by every hot write: namespace, activity time, key expiry."""
+        namespaces_key = self._namespaces_key(thread_id)
+        pipe.sadd(namespaces_key, checkpoint_ns)
+        pipe.zadd(self.ACTIVE_THREADS_KEY, {thread_id: time.time()})
+        for key in (*keys, namespaces_key):
+            pipe.expire(key, self.key_ttl_seconds)
+
+    # Serialization
+
+    def _pack_checkpoint(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> bytes:
+        return ormsgpack.packb([
+            *self.serde.dumps_typed(checkpoint),
+            *self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+            config["configurable"].get("checkpoint_id"),
+        ])
+
+    def _unpack_checkpoint(self, record: bytes) -> Tuple[Checkpoint, CheckpointMetadata, Optional[str]]:
+        checkpoint_type, checkpoint, metadata_type, metadata, parent_id = ormsgpack.unpackb(record)
+        return (
+            self.serde.loads_typed((checkpoint_type, checkpoint)),
+            self.serde.loads_typed((metadata_type, metadata)),
+            parent_id,
+        )
+
+    def _unpack_writes(self, writes: Dict[bytes, bytes]) -> List[Tuple[str, int, str, Any, str]]:
+        """Decode a writes hash into (task_id, idx, channel, value, task_path), ordered by task and idx."""
+        unpacked = []
+        for record in writes.values():
+            task_id, idx, channel, value_type, value, task_path = ormsgpack.unpackb(record)
+            unpacked.append((task_id, idx, channel, self.serde.loads_typed((value_type, value)), task_path))
+        unpacked.sort(key=lambda write: (write[0], write[1]))
+        return unpacked
+
+    def _tuple(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, record: bytes, writes: Dict[bytes, bytes]
+    ) -> CheckpointTuple:
+        checkpoint, metadata, parent_id = self._unpack_checkpoint(record)
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint=checkpoint,
+            metadata=metadata,
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+            pending_writes=[(task_id, channel, value) for task_id, _, channel, value, _ in self._unpack_writes(writes)],
+        )
+
+    # BaseCheckpointSaver interface
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Get a checkpoint from Redis, or from the cold saver when the thread is not hot."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        redis = await get_redis_client()
+
+        checkpoint_id = get_checkpoint_id(config)
+        if not checkpoint_id:
+            latest = await redis.zrange(
+                self._index_key(thread_id, checkpoint_ns), "+", "-", desc=True, bylex=True, offset=0, num=1
+            )
+            checkpoint_id = latest[0].decode() if latest else None
+
+        if checkpoint_id:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hget(self._checkpoint_key(thread_id, checkpoint_ns), checkpoint_id)
+                pipe.hgetall(self._writes_key(thread_id, checkpoint_ns, checkpoint_id))
+                record, writes = await pipe.execute()
+            # Missing when the checkpoint was flushed between the two reads, or is only in the cold store
+            if record is not None:
+                metrics.increment("hot_checkpoint.reads_hot")
+                return self._tuple(thread_id, checkpoint_ns, checkpoint_id, record, writes)
+
+        metrics.increment("hot_checkpoint.reads_cold")
+        return await self.cold.aget_tuple(config)
+
+    async def _hot_tuples(
+        self,
+        config: Optional[RunnableConfig],
+        filter: Optional[Dict[str, Any]],
+        before: Optional[RunnableConfig],
+    ) -> List[CheckpointTuple]:
+        """Hot checkpoints matching alist's arguments, newest first."""
+        redis = await get_redis_client()
+        configurable = (config or {}).get("configurable", {})
+        if "thread_id" in configurable:
+            thread_ids = [configurable["thread_id"]]
+        else:
+            thread_ids = [thread_id.decode() for thread_id in await redis.zrange(self.ACTIVE_THREADS_KEY, 0, -1)]
+        before_id = get_checkpoint_id(before) if before else None
+
+        tuples = []
+        for thread_id in thread_ids:
+            if "checkpoint_ns" in configurable:
+                namespaces = [configurable["checkpoint_ns"]]
+            else:
+                namespaces = [ns.decode() for ns in await redis.smembers(self._namespaces_key(thread_id))]
+            for checkpoint_ns in namespaces:
+                if configurable.get("checkpoint_id"):
+                    ids = [configurable["checkpoint_id"]]
+                else:
+                    ids = [i.decode() for i in await redis.zrange(self._index_key(thread_id, checkpoint_ns), 0, -1)]
+                ids = [i for i in ids if before_id is None or i < before_id]
+                if not ids:
+                    continue
+                async with redis.pipeline(transaction=False) as pipe:
+                    for checkpoint_id in ids:
+                        pipe.hget(self._checkpoint_key(thread_id, checkpoint_ns), checkpoint_id)
+                        pipe.hgetall(self._writes_key(thread_id, checkpoint_ns, checkpoint_id))
+                    results = await pipe.execute()
+                for checkpoint_id, record, writes in zip(ids, results[::2], results[1::2]):
+                    if record is None:
+                        continue
+                    checkpoint_tuple = self._tuple(thread_id, checkpoint_ns, checkpoint_id, record, writes)
+                    if filter and any(checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()):
+                        continue
+                    tuples.append(checkpoint_tuple)
+
+        tuples.sort(key=lambda t: t.config["configurable"]["checkpoint_id"], reverse=True)
+        return tuples
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """List hot and cold checkpoints merged newest first (hot wins for a checkpoint in both)."""
+        hot = await self._hot_tuples(config, filter, before)
+        seen = set()
+        emitted = 0
+
+        def checkpoint_key(checkpoint_tuple: CheckpointTuple) -> Tuple[str, str, str]:
+            c = checkpoint_tuple.config["configurable"]
+            return c["thread_id"], c.get("checkpoint_ns", ""), c["checkpoint_id"]
+
+        async for cold_tuple in self.cold.alist(config, filter=filter, before=before, limit=limit):
+            cold_id = cold_tuple.config["configurable"]["checkpoint_id"]
+            while hot and hot[0].config["configurable"]["checkpoint_id"] >= cold_id:
+                hot_tuple = hot.pop(0)
+                seen.add(checkpoint_key(hot_tuple))
+                yield hot_tuple
+                emitted += 1
+                if limit is not None and emitted >= limit:
+                    return
+            if checkpoint_key(cold_tuple) in seen:
+                continue
+            yield cold_tuple
+            emitted += 1
+            if limit is not None and emitted >= limit:
+                return
+
+        for hot_tuple in hot:
+            if limit is not None and emitted >= limit:
+                return
+            yield hot_tuple
+            emitted += 1
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint in Redis (one round trip) and mark the thread active."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = checkpoint["id"]
+        record = self._pack_checkpoint(config, checkpoint, metadata)
+
+        checkpoint_key = self._checkpoint_key(thread_id, checkpoint_ns)
+        index_key = self._index_key(thread_id, checkpoint_ns)
+        redis = await get_redis_client()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(checkpoint_key, checkpoint_id, record)
+            pipe.zadd(index_key, {checkpoint_id: 0})
+            self._touch(pipe, thread_id, checkpoint_ns, checkpoint_key, index_key)
+            await pipe.execute()
+
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store a task's pending writes in Redis (one round trip)."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        writes_key = self._writes_key(thread_id, checkpoint_ns, checkpoint_id)
+        # As in the Mongo saver: special writes (errors, interrupts) replace, regular writes don't
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+
+        redis = await get_redis_client()
+        async with redis.pipeline(transaction=False) as pipe:
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                record = ormsgpack.packb([task_id, idx, channel, *self.serde.dumps_typed(value), task_path])
+                if replace:
+                    pipe.hset(writes_key, f"{task_id}:{idx}", record)
+                else:
+                    pipe.hsetnx(writes_key, f"{task_id}:{idx}", record)
+            self._touch(pipe, thread_id, checkpoint_ns, writes_key)
+            await pipe.execute()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Delete a thread from both tiers."""
+        redis = await get_redis_client()
+        namespaces = [ns.decode() for ns in await redis.smembers(self._namespaces_key(thread_id))]
+        keys = [self._namespaces_key(thread_id)]
+        for checkpoint_ns in namespaces:
+            index_key = self._index_key(thread_id, checkpoint_ns)
+            keys += [self._checkpoint_key(thread_id, checkpoint_ns), index_key]
+            keys += [
+                self._writes_key(thread_id, checkpoint_ns, checkpoint_id.decode())
+                for checkpoint_id in await redis.zrange(index_key, 0, -1)
+            ]
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            pipe.zrem(self.ACTIVE_THREADS_KEY, thread_id)
+            await pipe.execute()
+        await self.cold.adelete_thread(thread_id)
+
+    # Flushing to the cold tier
+
+    async def _flush_writes(
+        self, config: RunnableConfig, writes: List[Tuple[str, int, str, Any, str]]
+    ) -> None:
+        by_task: Dict[Tuple[str, str], Dict[str, list]] = defaultdict(lambda: {"regular": [], "special": []})
+        for task_id, idx, channel, value, task_path in writes:
+            by_task[(task_id, task_path)]["special" if idx < 0 else "regular"].append((channel, value))
+        for (task_id, task_path), groups in by_task.items():
+            # Regular writes are stored in idx order, so the cold saver assigns the same indexes
+            for group in (groups["regular"], groups["special"]):
+                if not group:
+                    continue
+                try:
+                    await self.cold.aput_writes(config, group, task_id, task_path)
+                except Exception as e:
+                    # A previous flush stored these before Redis was cleaned up
+                    if not _is_duplicate_write(e):
+                        raise
+
+    async def flush_thread(self, thread_id: str) -> Dict[str, int]:
+        """
+        Copy one thread's hot checkpoints and writes to the cold saver, then remove them from Redis.
+
+        Args:
+            thread_id: The thread to flush
+
+        Returns:
+            dict: Counts of checkpoints and writes flushed, and old checkpoints dropped
+        """
+        redis = await get_redis_client()
+        report = {"checkpoints_flushed": 0, "writes_flushed": 0, "checkpoints_dropped": 0}
+        namespaces_key = self._namespaces_key(thread_id)
+
+        for checkpoint_ns in [ns.decode() for ns in await redis.smembers(namespaces_key)]:
+            checkpoint_key = self._checkpoint_key(thread_id, checkpoint_ns)
+            index_key = self._index_key(thread_id, checkpoint_ns)
+            ids = [checkpoint_id.decode() for checkpoint_id in await redis.zrange(index_key, 0, -1)]
+            dropped = ids[:-self.keep_last] if self.keep_last > 0 else []
+
+            for checkpoint_id in dropped:
+                await redis.eval(
+                    _RELEASE_SCRIPT, 3, checkpoint_key, index_key,
+                    self._writes_key(thread_id, checkpoint_ns, checkpoint_id), checkpoint_id, "1",
+                )
+            report["checkpoints_dropped"] += len(dropped)
+
+            # Oldest first, so each checkpoint's parent is already in the cold store
+            for checkpoint_id in ids[len(dropped):]:
+                writes_key = self._writes_key(thread_id, checkpoint_ns, checkpoint_id)
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.hget(checkpoint_key, checkpoint_id)
+                    pipe.hgetall(writes_key)
+                    record, writes = await pipe.execute()
+                if record is None:
+                    continue
+                checkpoint, metadata, parent_id = self._unpack_checkpoint(record)
+                thread = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+                # All channel versions count as new: savers that store channel values
+                # separately (unlike Mongo, which keeps them inline) need every one of them
+                await self.cold.aput(
+                    {"configurable": {**thread, "checkpoint_id": parent_id}},
+                    checkpoint, metadata, checkpoint["channel_versions"],
+                )
+                await self._flush_writes({"configurable": {**thread, "checkpoint_id": checkpoint_id}}, self._unpack_writes(writes))
+                await redis.eval(
+                    _RELEASE_SCRIPT, 3, checkpoint_key, index_key, writes_key,
+                    checkpoint_id, "0", *[field.decode() for field in writes],
+                )
+                report["checkpoints_flushed"] += 1
+                report["writes_flushed"] += len(writes)
+
+            await redis.eval(_DEACTIVATE_SCRIPT, 3, index_key, namespaces_key, self.ACTIVE_THREADS_KEY, checkpoint_ns, thread_id)
+
+        # A thread with no hot namespaces left (e.g. its keys expired) is no longer active
+        await redis.eval(_DEACTIVATE_SCRIPT, 3, self._index_key(thread_id, ""), namespaces_key, self.ACTIVE_THREADS_KEY, "", thread_id)
+        return report
+
+    async def flush_idle(
+        self,
+        idle_seconds: int = HOT_CHECKPOINT_IDLE_SECONDS,
+        batch_size: int = HOT_CHECKPOINT_FLUSH_BATCH_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Flush every thread with no checkpoint activity for idle_seconds.
+
+        Args:
+            idle_seconds: Inactivity before a thread is flushed (0 flushes all hot threads)
+            batch_size: Threads flushed concurrently
+
+        Returns:
+            dict: Thread, checkpoint and write counts for this pass
+        """
+        started = datetime.now(timezone.utc)
+        redis = await get_redis_client()
+        idle = [
+            thread_id.decode()
+            for thread_id in await redis.zrangebyscore(self.ACTIVE_THREADS_KEY, "-inf", time.time() - idle_seconds)
+        ]
+
+        report = {"threads_idle": len(idle), "threads_failed": 0, "checkpoints_flushed": 0, "writes_flushed": 0, "checkpoints_dropped": 0}
+        batch_size = max(1, batch_size)
+        for start in range(0, len(idle), batch_size):
+            batch = idle[start:start + batch_size]
+            results = await asyncio.gather(*(self.flush_thread(thread_id) for thread_id in batch), return_exceptions=True)
+            for thread_id, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error flushing hot checkpoints of thread {thread_id}: {str(result)}")
+                    report["threads_failed"] += 1
+                    continue
+                for name, count in result.items():
+                    report[name] += count
+
+        metrics.increment("hot_checkpoint.threads_flushed", report["threads_idle"] - report["threads_failed"])
+        metrics.increment("hot_checkpoint.checkpoints_flushed", report["checkpoints_flushed"])
+        report["duration_seconds"] = round((datetime.now(timezone.utc) - started).total_seconds(), 3)
+        if idle:
+            logger.info(f"Hot checkpoint flush completed: {report}")
+        return report
+
+
+class HotCheckpointFlusher:
+    """Runs RedisHotCheckpointer.flush_idle every HOT_CHECKPOINT_FLUSH_INTERVAL_SECONDS in the background."""
+
+    def __init__(
+        self,
+        checkpointer: RedisHotCheckpointer,
+        interval_seconds: int = HOT_CHECKPOINT_FLUSH_INTERVAL_SECONDS,
+    ):
+        self.checkpointer = checkpointer
+        self.interval_seconds = interval_seconds
+        self.is_running = False
+        self._job_id = "hot_checkpoint_flush_job"
+        self.scheduler = AsyncIOScheduler(
+            timezone=timezone.utc,
+            job_defaults={"coalesce": True, "max_instances": 1},
+        )
+
+    async def _run_job(self):
+        try:
+            await self.checkpointer.flush_idle()
+        except Exception as e:
+            logger.error(f"Error during hot checkpoint flush: {str(e)}")
+
+    async def start(self) -> bool:
+        """Start flushing idle threads in the background."""
+        if self.is_running:
+            logger.warning("HotCheckpointFlusher is already running")
+            return False
+        self.scheduler.start()
+        self.scheduler.add_job(
+            self._run_job,
+            trigger=IntervalTrigger(seconds=self.interval_seconds),
+            id=self._job_id,
+            name="Flush Idle Hot Checkpoints",
+            next_run_time=datetime.now(timezone.utc),
+            replace_existing=True,
+        )
+        self.is_running = True
+        logger.info(f"HotCheckpointFlusher started, running every {self.interval_seconds} seconds")
+        return True
+
+    async def stop(self) -> bool:
+        """Stop the background job and flush what is idle now."""
+        if not self.is_running:
+            return True
+        self.scheduler.shutdown(wait=False)
+        self.is_running = False
+        await self._run_job()
+        logger.info("HotCheckpointFlusher stopped")
+        return True
+
+
+if __name__ == "__main__":
+    # One flush pass; --all also flushes threads that are still active (e.g. before a Redis maintenance)
+    from storage.mongodb.checkpointer import mongo_checkpointer
+    from storage.mongodb.config import close_mongo_clients
+
+    async def _flush_once():
+        try:
+            async with mongo_checkpointer() as cold:
+                idle_seconds = 0 if "--all" in sys.argv else HOT_CHECKPOINT_IDLE_SECONDS
+                return await RedisHotCheckpointer(cold).flush_idle(idle_seconds)
+        finally:
+            await close_mongo_clients()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(asyncio.run(_flush_once()), indent=2))
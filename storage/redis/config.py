@@ -2,6 +2,7 @@ import redis.asyncio as redis
 import os
 from dotenv import load_dotenv
 import logging
+from utils.tracing import instrument_redis, tracing_enabled
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,14 @@ MESSAGE_EXPIRY_SECONDS = int(os.environ.get("MESSAGE_EXPIRY_SECONDS"))
 TRIGGER_OFFSET_MINUTES = int(os.environ.get("TRIGGER_OFFSET_MINUTES"))
 SCHEDULER_INTERVAL_SECONDS = int(os.environ.get("SCHEDULER_INTERVAL_SECONDS"))
 
+# Hot checkpoint tier: active threads checkpoint to Redis and are flushed to MongoDB once idle
+HOT_CHECKPOINT_ENABLED = os.environ.get("HOT_CHECKPOINT_ENABLED", "false").lower() == "true"
+HOT_CHECKPOINT_IDLE_SECONDS = int(os.environ.get("HOT_CHECKPOINT_IDLE_SECONDS", "600"))
+HOT_CHECKPOINT_FLUSH_INTERVAL_SECONDS = int(os.environ.get("HOT_CHECKPOINT_FLUSH_INTERVAL_SECONDS", "60"))
+HOT_CHECKPOINT_FLUSH_BATCH_SIZE = int(os.environ.get("HOT_CHECKPOINT_FLUSH_BATCH_SIZE", "50"))
+# Safety net only: hot keys not flushed within this time (flusher down) expire from Redis
+HOT_CHECKPOINT_KEY_TTL_SECONDS = int(os.environ.get("HOT_CHECKPOINT_KEY_TTL_SECONDS", "86400"))
+
 # Global redis client
 redis_client = None
 
@@ -31,6 +40,8 @@ async def get_redis_client():
                 health_check_interval=30,
                 retry_on_timeout=True
             )
+            if tracing_enabled():
+                instrument_redis(redis_client)
             logger.info("Redis client created successfully")
         except Exception as e:
             logger.error(f"Failed to create Redis client: {str(e)}")
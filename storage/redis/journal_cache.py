@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import re
+import unicodedata
+from typing import Optional, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+from .config import get_redis_client
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T', bound=BaseModel)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+class JournalAnalysisCache:
+    """
+    Redis-backed cache of journal analysis results.
+
+    Entries are keyed by a hash of the normalized journal text plus a version
+    string derived from the prompt, model and output schema, so re-submitted
+    drafts skip the LLM while prompt or model changes invalidate old results.
+    """
+
+    CACHE_KEY_PREFIX = "journal_analysis:"
+
+    @staticmethod
+    def normalize(entry: str) -> str:
+        """Normalize unicode and collapse whitespace so trivial edits share a key."""
+        text = unicodedata.normalize("NFKC", entry or "")
+        return _WHITESPACE_RE.sub(" ", text).strip()
+
+    @classmethod
+    def cache_key(cls, entry: str, version: str) -> str:
+        """
+        Build the cache key for a journal entry.
+
+        Args:
+            entry: The raw journal entry text
+            version: Prompt/model version string
+
+        Returns:
+            str: Key in the pattern "journal_analysis:{version}:{sha256}"
+        """
+        digest = hashlib.sha256(cls.normalize(entry).encode()).hexdigest()
+        return f"{cls.CACHE_KEY_PREFIX}{version}:{digest}"
+
+    @classmethod
+    async def get(cls, entry: str, version: str, model: Type[T]) -> Optional[T]:
+        """
+        Look up a cached analysis.
+
+        Args:
+            entry: The raw journal entry text
+            version: Prompt/model version string
+            model: Pydantic model used to validate the cached payload
+
+        Returns:
+            Optional[T]: The cached analysis or None on a miss or error
+        """
+        try:
+            redis = await get_redis_client()
+            payload = await redis.get(cls.cache_key(entry, version))
+            if payload:
+                analysis = model.model_validate_json(payload)
+                # Counted only once the payload is usable; invalid ones are misses
+                metrics.increment("journal_cache.hits")
+                return analysis
+        except ValidationError as e:
+            logger.warning(f"Discarding invalid journal cache payload: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error reading journal analysis cache: {str(e)}")
+        metrics.increment("journal_cache.misses")
+        return None
+
+    @classmethod
+    async def set(cls, entry: str, version: str, analysis: BaseModel, ttl_seconds: int) -> bool:
+        """
+        Store an analysis result.
+
+        Args:
+            entry: The raw journal entry text
+            version: Prompt/model version string
+            analysis: The analysis to cache
+            ttl_seconds: Expiry for the cache entry
+
+        Returns:
+            bool: True if stored successfully, False otherwise
+        """
+        try:
+            redis = await get_redis_client()
+            return bool(await redis.setex(
+                cls.cache_key(entry, version),
+                ttl_seconds,
+                analysis.model_dump_json()
+            ))
+        except Exception as e:
+            logger.error(f"Error writing journal analysis cache: {str(e)}")
+            return False
+
+    @staticmethod
+    def hit_rate() -> float:
+        """Return the in-process cache hit rate (0.0 when there were no lookups)."""
+        hits = metrics.get_count("journal_cache.hits")
+        lookups = hits + metrics.get_count("journal_cache.misses")
+        return hits / lookups if lookups else 0.0
@@ -0,0 +1,58 @@
+import json
+import logging
+from typing import Any, Dict, List
+from .config import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+class JournalTrainingExamples:
+    """
+    Stores LLM-labelled journal examples for training the local fast-path classifier.
+
+    Only hashed feature indices are stored, never the journal text itself.
+    The list is capped so it cannot grow without bound.
+    """
+
+    EXAMPLES_KEY = "journal_classifier:examples"
+    MAX_EXAMPLES = 50000
+
+    @classmethod
+    async def add(cls, features: List[int], mood: str, category: str) -> bool:
+        """
+        Append a labelled example.
+
+        Args:
+            features: Hashed feature indices of the journal entry
+            mood: Mood label assigned by the LLM
+            category: Category label assigned by the LLM
+
+        Returns:
+            bool: True if stored successfully, False otherwise
+        """
+        try:
+            redis = await get_redis_client()
+            payload = json.dumps({"features": features, "mood": mood, "category": category})
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.rpush(cls.EXAMPLES_KEY, payload)
+                pipe.ltrim(cls.EXAMPLES_KEY, -cls.MAX_EXAMPLES, -1)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error storing journal training example: {str(e)}")
+            return False
+
+    @classmethod
+    async def load_all(cls) -> List[Dict[str, Any]]:
+        """
+        Load every stored example.
+
+        Returns:
+            List[Dict]: Examples with "features", "mood" and "category" keys
+        """
+        try:
+            redis = await get_redis_client()
+            rows = await redis.lrange(cls.EXAMPLES_KEY, 0, -1)
+            return [json.loads(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error loading journal training examples: {str(e)}")
+            return []
@@ -0,0 +1,299 @@
+"""
+Per-user journal mood and category rollups.
+
+Each analysed journal entry increments counters in one daily and one weekly
+Redis hash per user, bucketed by the user's local date:
+
+    journal_rollup:{user_id}:day:{YYYY-MM-DD}   mood:<mood> / category:<category> / total
+    journal_rollup:{user_id}:week:{YYYY}-W{ww}  (ISO week)
+
+Updates are O(1) and idempotent per workflow: the labels counted for a
+workflow are remembered, so re-analysing it moves its counts instead of
+counting it twice. Trends are read with one pipelined HGETALL per bucket, no
+scan over stored analyses.
+
+Rebuild from the analysis store (e.g. after changing retention):
+    python -m storage.redis.journal_rollups --backfill [--user-id USER]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from config.settings import (
+    JOURNAL_ROLLUP_DAILY_RETENTION_DAYS,
+    JOURNAL_ROLLUP_WEEKLY_RETENTION_WEEKS,
+)
+from tools.date_time import get_timezone
+from .config import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# KEYS: entry key, day hash, week hash
+# ARGV: mood field, category field, day ttl, week ttl, entry ttl
+# The entry key holds what was last counted for the workflow; a changed result
+# is subtracted from its old buckets before the new one is added. An old bucket
+# that has expired (day buckets go long before the entry key) is left alone, so
+# it is not recreated with negative counts and no TTL.
+_RECORD_SCRIPT = """
+local counted = cjson.encode({KEYS[2], KEYS[3], ARGV[1], ARGV[2]})
+local previous = redis.call('GET', KEYS[1])
+if previous == counted then
+    return 0
+end
+if previous then
+    local old = cjson.decode(previous)
+    for i = 1, 2 do
+        if redis.call('EXISTS', old[i]) == 1 then
+            redis.call('HINCRBY', old[i], 'total', -1)
+            redis.call('HINCRBY', old[i], old[3], -1)
+            redis.call('HINCRBY', old[i], old[4], -1)
+        end
+    end
+end
+for i = 2, 3 do
+    redis.call('HINCRBY', KEYS[i], 'total', 1)
+    redis.call('HINCRBY', KEYS[i], ARGV[1], 1)
+    redis.call('HINCRBY', KEYS[i], ARGV[2], 1)
+end
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+redis.call('SET', KEYS[1], counted, 'EX', ARGV[5])
+return 1
+"""
+
+
+def _escape_glob(value: str) -> str:
+    # SCAN MATCH treats * ? [ ] and backslash as pattern syntax
+    return re.sub(r"([*?\[\]\\])", r"\\\1", value)
+
+
+class JournalMoodRollups:
+    """
+    Daily and weekly mood/category counters per user, kept up to date as
+    journal analyses finish.
+    """
+
+    KEY_PREFIX = "journal_rollup"
+    DAY_TTL_SECONDS = JOURNAL_ROLLUP_DAILY_RETENTION_DAYS * 86400
+    WEEK_TTL_SECONDS = JOURNAL_ROLLUP_WEEKLY_RETENTION_WEEKS * 7 * 86400
+
+    @classmethod
+    def _day_key(cls, user_id: str, day: date) -> str:
+        return f"{cls.KEY_PREFIX}:{user_id}:day:{day.isoformat()}"
+
+    @classmethod
+    def _week_key(cls, user_id: str, day: date) -> str:
+        year, week, _ = day.isocalendar()
+        return f"{cls.KEY_PREFIX}:{user_id}:week:{year}-W{week:02d}"
+
+    @classmethod
+    def _entry_key(cls, user_id: str, workflow_id: str) -> str:
+        return f"{cls.KEY_PREFIX}:{user_id}:entry:{workflow_id}"
+
+    @classmethod
+    def _record_args(
+        cls, user_id: str, workflow_id: str, mood: str, category: str, at: Optional[datetime], timezone_name: Optional[str]
+    ):
+        at = at or datetime.now(timezone.utc)
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        day = at.astimezone(get_timezone(timezone_name)).date()
+        keys = [cls._entry_key(user_id, workflow_id), cls._day_key(user_id, day), cls._week_key(user_id, day)]
+        args = [
+            f"mood:{mood}",
+            f"category:{category}",
+            cls.DAY_TTL_SECONDS,
+            cls.WEEK_TTL_SECONDS,
+            max(cls.DAY_TTL_SECONDS, cls.WEEK_TTL_SECONDS),
+        ]
+        return keys, args
+
+    @classmethod
+    async def record(
+        cls,
+        user_id: Optional[str],
+        workflow_id: Optional[str],
+        mood: str,
+        category: str,
+        at: Optional[datetime] = None,
+        timezone_name: Optional[str] = None,
+    ) -> bool:
+        """
+        Count an analysed journal entry in the user's daily and weekly rollups.
+
+        Args:
+            user_id: The user the entry belongs to
+            workflow_id: The journal workflow; recording it again with other labels replaces its counts
+            mood: The analysed mood
+            category: The analysed category
+            at: When the entry was analysed (defaults to now)
+            timezone_name: The user's IANA timezone, which decides the local day and week
+
+        Returns:
+            bool: True if recorded successfully, False otherwise
+        """
+        if not user_id or not workflow_id:
+            return False
+        try:
+            redis = await get_redis_client()
+            keys, args = cls._record_args(user_id, workflow_id, mood, category, at, timezone_name)
+            await redis.eval(_RECORD_SCRIPT, len(keys), *keys, *args)
+            return True
+        except Exception as e:
+            logger.error(f"Error updating journal rollups for user {user_id}: {str(e)}")
+            return False
+
+    @staticmethod
+    def _parse_bucket(period: str, counters: Dict[bytes, bytes]) -> Dict[str, Any]:
+        bucket = {"period": period, "total": 0, "moods": {}, "categories": {}}
+        for field, value in counters.items():
+            field, value = field.decode(), int(value)
+            if value <= 0:
+                continue
+            if field == "total":
+                bucket["total"] = value
+            elif field.startswith("mood:"):
+                bucket["moods"][field[len("mood:"):]] = value
+            elif field.startswith("category:"):
+                bucket["categories"][field[len("category:"):]] = value
+        return bucket
+
+    @classmethod
+    async def _read(cls, keys: List[str]) -> List[Dict[str, Any]]:
+        redis = await get_redis_client()
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            rows = await pipe.execute()
+        return [cls._parse_bucket(key.rsplit(":", 1)[-1], row) for key, row in zip(keys, rows)]
+
+    @classmethod
+    async def daily(cls, user_id: str, days: int = 7, timezone_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        A user's mood and category counts for the last `days` local days, oldest first.
+
+        Args:
+            user_id: The user whose rollups to read
+            days: Number of days, including today
+            timezone_name: The user's IANA timezone
+
+        Returns:
+            List[Dict]: One bucket per day with "period" (YYYY-MM-DD), "total",
+            "moods" and "categories"; days without entries have a total of 0
+        """
+        try:
+            today = datetime.now(get_timezone(timezone_name)).date()
+            return await cls._read(
+                [cls._day_key(user_id, today - timedelta(days=offset)) for offset in reversed(range(days))]
+            )
+        except Exception as e:
+            logger.error(f"Error reading daily journal rollups for user {user_id}: {str(e)}")
+            return []
+
+    @classmethod
+    async def weekly(cls, user_id: str, weeks: int = 4, timezone_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        A user's mood and category counts for the last `weeks` ISO weeks, oldest first.
+
+        Args:
+            user_id: The user whose rollups to read
+            weeks: Number of weeks, including the current one
+            timezone_name: The user's IANA timezone
+
+        Returns:
+            List[Dict]: One bucket per week with "period" (YYYY-Www), "total",
+            "moods" and "categories"
+        """
+        try:
+            today = datetime.now(get_timezone(timezone_name)).date()
+            return await cls._read(
+                [cls._week_key(user_id, today - timedelta(weeks=offset)) for offset in reversed(range(weeks))]
+            )
+        except Exception as e:
+            logger.error(f"Error reading weekly journal rollups for user {user_id}: {str(e)}")
+            return []
+
+    @classmethod
+    async def clear(cls, user_id: Optional[str] = None) -> int:
+        """
+        Delete rollups and per-workflow entries, for one user or everyone.
+
+        Returns:
+            int: Number of keys deleted
+        """
+        redis = await get_redis_client()
+        pattern = f"{cls.KEY_PREFIX}:{_escape_glob(user_id)}:*" if user_id else f"{cls.KEY_PREFIX}:*"
+        deleted = 0
+        batch = []
+        async for key in redis.scan_iter(match=pattern, count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                deleted += await redis.delete(*batch)
+                batch = []
+        if batch:
+            deleted += await redis.delete(*batch)
+        return deleted
+
+    @classmethod
+    async def backfill(cls, user_id: Optional[str] = None, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Rebuild the rollups from the journal analyses in the analysis store.
+
+        Args:
+            user_id: Only rebuild this user's rollups
+            batch_size: Records replayed per pipelined round trip
+
+        Returns:
+            dict: Keys deleted and analyses replayed
+        """
+        from storage.analysis_store import get_analysis_store
+
+        redis = await get_redis_client()
+        script = redis.register_script(_RECORD_SCRIPT)
+        report = {"deleted_keys": await cls.clear(user_id), "replayed": 0, "skipped": 0}
+
+        async def replay(records):
+            async with redis.pipeline(transaction=False) as pipe:
+                for record in records:
+                    keys, args = cls._record_args(
+                        record.user_id, record.workflow_id, record.summary["mood"], record.summary["category"],
+                        record.created_at, record.timezone,
+                    )
+                    await script(keys=keys, args=args, client=pipe)
+                await pipe.execute()
+
+        batch = []
+        async for record in get_analysis_store().scan("journal", user_id=user_id):
+            if not record.user_id or "mood" not in record.summary or "category" not in record.summary:
+                report["skipped"] += 1
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                await replay(batch)
+                report["replayed"] += len(batch)
+                batch = []
+        if batch:
+            await replay(batch)
+            report["replayed"] += len(batch)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backfill", action="store_true", help="Rebuild the rollups from the analysis store")
+    parser.add_argument("--user-id", help="Only rebuild this user's rollups")
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.error("nothing to do; pass --backfill")
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(asyncio.run(JournalMoodRollups.backfill(args.user_id)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
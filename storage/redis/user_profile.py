@@ -0,0 +1,309 @@
+"""
+Per-user long-term profile built from conversation analyses.
+
+Each ConversationAnalyzed is merged into the user's profile: topics and
+emotional needs are decayed-weight counters, so recurring ones outrank a
+single mention, and only the latest session guidance is kept. Merges are
+idempotent per workflow: the profile remembers the sessions it has merged,
+so a re-run analysis is not counted twice. The merged
+profile and its prompt rendering (fitted to USER_PROFILE_TOKEN_BUDGET) are
+stored together in one Redis hash, so the companion reads a ready-made
+prompt section with a single HGET per turn.
+
+Rebuild from the analysis store (e.g. after changing the token budget):
+    python -m storage.redis.user_profile --rebuild [--user-id USER]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, ClassVar, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+from redis.exceptions import WatchError
+
+from config.settings import USER_PROFILE_DECAY, USER_PROFILE_TOKEN_BUDGET, USER_PROFILE_TTL_SECONDS
+from utils.text_features import estimate_tokens
+from .config import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+PROFILE_HEADER = "Long-term user profile (from past sessions; use it naturally, never quote it):"
+
+
+def _normalize(label: str) -> str:
+    return _WHITESPACE_RE.sub(" ", label or "").strip().lower()
+
+
+def _ranked(weights: Dict[str, float]) -> List[str]:
+    return [label for label, _ in sorted(weights.items(), key=lambda item: (-item[1], item[0]))]
+
+
+class UserProfile(BaseModel):
+    """The merged profile of one user."""
+
+    preferred_topics: Dict[str, float] = Field(default_factory=dict)
+    avoided_topics: Dict[str, float] = Field(default_factory=dict)
+    emotional_needs: Dict[str, float] = Field(default_factory=dict)
+    interaction_style: str = ""
+    guidance: List[str] = Field(default_factory=list, description="Latest future_session_guidance first")
+    sessions: int = 0
+    merged_workflows: List[str] = Field(default_factory=list, description="Latest merged workflow_id first")
+    updated_at: Optional[datetime] = None
+
+    MAX_LABELS: ClassVar[int] = 20
+    MAX_GUIDANCE: ClassVar[int] = 3
+    MAX_GUIDANCE_CHARS: ClassVar[int] = 400
+    # Re-analyses follow soon after the first one (scheduler retries), so recent sessions suffice
+    MAX_MERGED_WORKFLOWS: ClassVar[int] = 100
+
+    @classmethod
+    def _merge_weights(cls, weights: Dict[str, float], labels: Iterable[str], decay: float) -> Dict[str, float]:
+        merged = {label: weight * decay for label, weight in weights.items()}
+        for label in {_normalize(label) for label in labels} - {""}:
+            merged[label] = merged.get(label, 0.0) + 1.0
+        return {label: round(merged[label], 4) for label in _ranked(merged)[:cls.MAX_LABELS]}
+
+    def merge_analysis(
+        self,
+        data: Dict[str, Any],
+        decay: float = USER_PROFILE_DECAY,
+        at: Optional[datetime] = None,
+        workflow_id: Optional[str] = None,
+    ) -> bool:
+        """
+        Merge one analysis into the profile.
+
+        Args:
+            data: A ConversationAnalyzed as a dict (model_dump() or a stored record's data)
+            decay: Factor applied to existing weights first, so older sessions fade
+            at: When the analysis was made (defaults to now)
+            workflow_id: The analysed session; an analysis of a session already merged is skipped
+
+        Returns:
+            bool: True if merged, False if the session was already merged
+        """
+        if workflow_id:
+            if workflow_id in self.merged_workflows:
+                return False
+            self.merged_workflows = [workflow_id, *self.merged_workflows][:self.MAX_MERGED_WORKFLOWS]
+        insights = data.get("contextual_insights") or {}
+        emotional = data.get("emotional_profile") or {}
+        recommendations = data.get("recommendations") or {}
+        dynamics = data.get("relationship_dynamics") or {}
+
+        self.preferred_topics = self._merge_weights(self.preferred_topics, insights.get("preferred_topics") or [], decay)
+        self.avoided_topics = self._merge_weights(self.avoided_topics, insights.get("avoided_topics") or [], decay)
+        self.emotional_needs = self._merge_weights(self.emotional_needs, emotional.get("emotional_needs") or [], decay)
+        self.interaction_style = (dynamics.get("interaction_style") or self.interaction_style).strip()
+        guidance = _WHITESPACE_RE.sub(" ", recommendations.get("future_session_guidance") or "").strip()
+        if guidance:
+            guidance = guidance[:self.MAX_GUIDANCE_CHARS]
+            self.guidance = [guidance, *[g for g in self.guidance if g != guidance]][:self.MAX_GUIDANCE]
+        self.sessions += 1
+        self.updated_at = at or datetime.now(timezone.utc)
+        return True
+
+    def render(self, token_budget: int = USER_PROFILE_TOKEN_BUDGET) -> str:
+        """
+        Render the profile as a system prompt section within the token budget.
+
+        Items are added in priority order (latest guidance, topics to avoid,
+        preferred topics, emotional needs, earlier guidance; heaviest first)
+        until the next one would exceed the budget.
+
+        Returns:
+            str: The prompt section, or "" when the profile is empty
+        """
+        if not self.sessions:
+            return ""
+        lines = [PROFILE_HEADER]
+        if self.interaction_style:
+            lines.append(f"- Interaction style: {self.interaction_style}")
+        if estimate_tokens("\n".join(lines)) > token_budget:
+            return ""
+
+        sections = [
+            ("Guidance", self.guidance[:1]),
+            ("Avoid or approach gently", _ranked(self.avoided_topics)),
+            ("Enjoys talking about", _ranked(self.preferred_topics)),
+            ("Emotional needs", _ranked(self.emotional_needs)),
+            ("Earlier guidance", self.guidance[1:]),
+        ]
+        for title, items in sections:
+            kept: List[str] = []
+            for item in items:
+                candidate = lines + [f"- {title}: {'; '.join(kept + [item])}"]
+                if estimate_tokens("\n".join(candidate)) > token_budget:
+                    break
+                kept.append(item)
+            if kept:
+                lines.append(f"- {title}: {'; '.join(kept)}")
+        return "\n".join(lines) if len(lines) > 1 else ""
+
+
+class UserProfileCache:
+    """
+    Redis-backed user profiles.
+
+    Each profile is a hash "user_profile:{user_id}" with the JSON profile and
+    its rendered prompt, expiring USER_PROFILE_TTL_SECONDS after the last merge.
+    """
+
+    KEY_PREFIX = "user_profile:"
+    MAX_MERGE_ATTEMPTS = 5
+
+    @classmethod
+    def _key(cls, user_id: str) -> str:
+        return f"{cls.KEY_PREFIX}{user_id}"
+
+    @staticmethod
+    def _parse(payload: Optional[bytes], user_id: str) -> UserProfile:
+        if not payload:
+            return UserProfile()
+        try:
+            return UserProfile.model_validate_json(payload)
+        except ValidationError as e:
+            logger.warning(f"Discarding invalid profile for user {user_id}: {str(e)}")
+            return UserProfile()
+
+    @classmethod
+    async def get_prompt(cls, user_id: Optional[str]) -> str:
+        """
+        The rendered profile for the companion system prompt.
+
+        Args:
+            user_id: The user whose profile to read
+
+        Returns:
+            str: The prompt section, or "" when there is no profile or on error
+        """
+        if not user_id:
+            return ""
+        try:
+            redis = await get_redis_client()
+            prompt = await redis.hget(cls._key(user_id), "prompt")
+            return prompt.decode() if prompt else ""
+        except Exception as e:
+            logger.error(f"Error reading profile for user {user_id}: {str(e)}")
+            return ""
+
+    @classmethod
+    async def get(cls, user_id: str) -> UserProfile:
+        """
+        The full merged profile.
+
+        Returns:
+            UserProfile: The profile (empty when there is none)
+        """
+        redis = await get_redis_client()
+        return cls._parse(await redis.hget(cls._key(user_id), "profile"), user_id)
+
+    @classmethod
+    async def merge_analysis(
+        cls,
+        user_id: Optional[str],
+        workflow_id: Optional[str],
+        data: Dict[str, Any],
+        at: Optional[datetime] = None,
+    ) -> bool:
+        """
+        Merge a conversation analysis into the user's profile.
+
+        Concurrent merges for the same user are serialized with WATCH, so no
+        analysis is lost; a session that is already merged (e.g. re-analysed
+        by the scheduler) is not counted again.
+
+        Args:
+            user_id: The user the analysis belongs to
+            workflow_id: The analysed session
+            data: The ConversationAnalyzed as a dict
+            at: When the analysis was made (defaults to now)
+
+        Returns:
+            bool: True if merged successfully (or already merged), False otherwise
+        """
+        if not user_id:
+            return False
+        key = cls._key(user_id)
+        try:
+            redis = await get_redis_client()
+            for _ in range(cls.MAX_MERGE_ATTEMPTS):
+                async with redis.pipeline(transaction=True) as pipe:
+                    try:
+                        await pipe.watch(key)
+                        profile = cls._parse(await pipe.hget(key, "profile"), user_id)
+                        if not profile.merge_analysis(data, at=at, workflow_id=workflow_id):
+                            logger.debug(f"Session {workflow_id} already merged into profile of user {user_id}")
+                            return True
+                        pipe.multi()
+                        pipe.hset(key, mapping={"profile": profile.model_dump_json(), "prompt": profile.render()})
+                        pipe.expire(key, USER_PROFILE_TTL_SECONDS)
+                        await pipe.execute()
+                        return True
+                    except WatchError:
+                        continue
+            logger.warning(f"Profile for user {user_id} kept changing; analysis not merged")
+            return False
+        except Exception as e:
+            logger.error(f"Error merging profile for user {user_id}: {str(e)}")
+            return False
+
+    @classmethod
+    async def rebuild(cls, user_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Rebuild profiles by replaying stored conversation analyses in time order.
+
+        Args:
+            user_id: Only rebuild this user's profile
+
+        Returns:
+            dict: Profiles written and analyses replayed
+        """
+        from storage.analysis_store import get_analysis_store
+
+        records: Dict[str, List[Any]] = {}
+        async for record in get_analysis_store().scan("conversation", user_id=user_id):
+            if record.user_id:
+                records.setdefault(record.user_id, []).append((record.created_at, record.workflow_id, record.data))
+
+        redis = await get_redis_client()
+        report = {"profiles": 0, "replayed": 0}
+        for profile_user, analyses in records.items():
+            profile = UserProfile()
+            for created_at, workflow_id, data in sorted(analyses, key=lambda item: item[0]):
+                profile.merge_analysis(data, at=created_at, workflow_id=workflow_id)
+            key = cls._key(profile_user)
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.hset(key, mapping={"profile": profile.model_dump_json(), "prompt": profile.render()})
+                pipe.expire(key, USER_PROFILE_TTL_SECONDS)
+                await pipe.execute()
+            report["profiles"] += 1
+            report["replayed"] += len(analyses)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild profiles from the analysis store")
+    parser.add_argument("--user-id", help="Only rebuild this user's profile")
+    parser.add_argument("--show", metavar="USER_ID", help="Print a user's rendered profile")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.show:
+        print(asyncio.run(UserProfileCache.get_prompt(args.show)) or "(no profile)")
+    elif args.rebuild:
+        print(json.dumps(asyncio.run(UserProfileCache.rebuild(args.user_id)), indent=2))
+    else:
+        parser.error("nothing to do; pass --rebuild or --show")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+# Settings are read at import time; the tests need no real services or keys
+for _name, _value in {
+    "MESSAGE_EXPIRY_SECONDS": "2700",
+    "TRIGGER_OFFSET_MINUTES": "5",
+    "SCHEDULER_INTERVAL_SECONDS": "60",
+    "OPENROUTER_API_KEY": "test",
+    "TRACING_EXPORTER": "none",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """A fakeredis client in place of the shared Redis client (lupa runs the Lua scripts)."""
+    fakeredis = pytest.importorskip("fakeredis")
+    import storage.redis.config as redis_config
+
+    client = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(redis_config, "redis_client", client)
+    return client
+
+
+@pytest.fixture
+def local_analysis_store(tmp_path, monkeypatch):
+    """A LocalAnalysisStore in a temporary directory in place of the configured store."""
+    import storage.analysis_store as analysis_store
+
+    store = analysis_store.LocalAnalysisStore(str(tmp_path / "analyses"))
+    monkeypatch.setattr(analysis_store, "analysis_store", store)
+    return store
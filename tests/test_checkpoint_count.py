@@ -0,0 +1,143 @@
+import asyncio
+import importlib
+import uuid
+
+import pytest
+
+import config.settings as settings
+from langgraph.checkpoint.memory import InMemorySaver
+
+import agents.companion.companion as companion
+import agents.companion.conversation_analyzer as conversation_analyzer
+import agents.journal.journal_analyzer as journal_analyzer
+
+FLOWS = {
+    "companion": {"system": "companion", "agent_name": "companion_agent"},
+    "conversation_analyzer": {"system": "companion", "agent_name": "conversation_analyzer_agent"},
+    "journal": {"system": "journal", "agent_name": None},
+}
+
+
+class CountingSaver(InMemorySaver):
+    """In-memory checkpointer that counts the checkpoints it is asked to save."""
+
+    def __init__(self):
+        super().__init__()
+        self.checkpoint_count = 0
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        self.checkpoint_count += 1
+        return await super().aput(config, checkpoint, metadata, new_versions)
+
+
+async def stub_companion_agent(state):
+    return {"agent_response": "ok", "previous_agent": "companion_agent"}
+
+
+async def stub_conversation_analyzer_agent(state):
+    return {"conversation_analyzed": {"kind": "conversation", "workflow_id": state["workflow_id"]}, "previous_agent": "conversation_analyzer_agent"}
+
+
+async def stub_journal_analyzer_agent(state):
+    return {"journal_analysis": {"kind": "journal", "workflow_id": state["workflow_id"]}, "previous_agent": "journal_analyzer_agent"}
+
+
+def rebuild_graph_modules():
+    """Re-import the graph modules so they pick up the current agents and SUBGRAPH_CHECKPOINTING."""
+    import graphs.companion
+    import graphs.flat
+    import graphs.journal
+    from main import build_graph
+
+    for module in (graphs.companion, graphs.journal, graphs.flat):
+        importlib.reload(module)
+    build_graph.cache_clear()
+    return build_graph
+
+
+@pytest.fixture(params=[False, True], ids=["subgraph_checkpointing_off", "subgraph_checkpointing_on"])
+def build_graph(request, monkeypatch):
+    monkeypatch.setattr(companion, "companion_agent", stub_companion_agent)
+    monkeypatch.setattr(conversation_analyzer, "conversation_analyzer_agent", stub_conversation_analyzer_agent)
+    monkeypatch.setattr(journal_analyzer, "journal_analyzer_agent", stub_journal_analyzer_agent)
+    monkeypatch.setattr(settings, "SUBGRAPH_CHECKPOINTING", request.param)
+    yield rebuild_graph_modules(), request.param
+    monkeypatch.undo()
+    rebuild_graph_modules()
+
+
+def expected_checkpoints(layout, subgraph_checkpointing, durability):
+    if durability == "exit":
+        # Only the final state of the run is saved
+        return 1
+    # input, router/dispatch and agent steps of the top-level graph, plus the
+    # subgraph's own steps when it checkpoints separately
+    return 6 if layout == "nested" and subgraph_checkpointing else 3
+
+
+def invoke(app, flow, thread_id, **kwargs):
+    state = {"user_id": "test", "workflow_id": thread_id, **FLOWS[flow]}
+    return asyncio.run(app.ainvoke(state, {"configurable": {"thread_id": thread_id}}, **kwargs))
+
+
+@pytest.mark.parametrize("flow", list(FLOWS))
+@pytest.mark.parametrize("durability", ["exit", "async", "sync"])
+@pytest.mark.parametrize("layout", ["nested", "flat"])
+def test_checkpoints_per_invocation(build_graph, layout, durability, flow):
+    build, subgraph_checkpointing = build_graph
+    saver = CountingSaver()
+    app = build(layout, sync_durability=durability == "sync").compile(checkpointer=saver)
+    thread_id = str(uuid.uuid4())
+    expected = expected_checkpoints(layout, subgraph_checkpointing, durability)
+
+    result = invoke(app, flow, thread_id, durability=durability)
+    assert result["previous_agent"]
+    assert saver.checkpoint_count == expected
+
+    # A follow-up turn on the same thread costs the same
+    invoke(app, flow, thread_id, durability=durability)
+    assert saver.checkpoint_count == 2 * expected
+
+
+@pytest.mark.parametrize("flow", list(FLOWS))
+@pytest.mark.parametrize("layout", ["nested", "flat"])
+def test_system_durability_defaults_to_one_checkpoint(build_graph, layout, flow, monkeypatch):
+    import main
+
+    build, _ = build_graph
+    monkeypatch.setitem(main.SYSTEM_DURABILITY, "companion", "exit")
+    monkeypatch.setitem(main.SYSTEM_DURABILITY, "journal", "exit")
+    saver = CountingSaver()
+    app = main.with_system_durability(build(layout).compile(checkpointer=saver))
+
+    invoke(app, flow, str(uuid.uuid4()))
+    assert saver.checkpoint_count == 1
+
+
+def test_subgraphs_stay_nodes_unless_runs_use_sync(build_graph):
+    from graphs.companion import companion_graph
+    from graphs.journal import journal_graph
+
+    build, subgraph_checkpointing = build_graph
+    subgraphs = {"companion_graph": companion_graph, "journal_graph": journal_graph}
+
+    nodes = build("nested", sync_durability=False).nodes
+    assert all(nodes[name].runnable is subgraph for name, subgraph in subgraphs.items())
+
+    nodes = build("nested", sync_durability=True).nodes
+    # Only subgraphs that checkpoint themselves can run as nodes under "sync"
+    assert all((nodes[name].runnable is subgraph) == subgraph_checkpointing for name, subgraph in subgraphs.items())
+
+
+def test_sync_run_of_a_graph_not_built_for_it_is_rejected(build_graph):
+    import main
+
+    build, subgraph_checkpointing = build_graph
+    app = main.with_system_durability(build("nested", sync_durability=False).compile(checkpointer=CountingSaver()))
+    thread_id = str(uuid.uuid4())
+
+    if subgraph_checkpointing:
+        assert invoke(app, "companion", thread_id, durability="sync")["previous_agent"]
+    else:
+        with pytest.raises(ValueError, match="sync_durability=True"):
+            invoke(app, "companion", thread_id, durability="sync")
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from pydantic_ai.messages import ModelResponse, SystemPromptPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+import agents.companion.companion as companion
+from agents.companion.history import CompanionAgentHistory
+
+PROFILE = "## About this user\n- Enjoys talking about: gardening\n- Emotional needs: reassurance"
+PAST_SESSIONS = "## Relevant past sessions\n- 2024-05-01: talked about the allotment and tomato seedlings"
+
+
+@pytest.fixture
+def stub_companion(fake_redis, monkeypatch):
+    """Run the companion against a stub model with a stored profile and past sessions."""
+    seen_prompts = []
+
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        seen_prompts.append("\n".join(
+            part.content
+            for part in messages[0].parts
+            if isinstance(part, SystemPromptPart)
+        ))
+        output = {"response": "How was your week?", "confidence": 4}
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, json.dumps(output))])
+
+    async def get_prompt(user_id):
+        return PROFILE
+
+    async def retrieve_past_sessions(user_id, text, exclude_workflow_id=None):
+        return PAST_SESSIONS
+
+    monkeypatch.setattr(companion, "USER_PROFILE_ENABLED", True)
+    monkeypatch.setattr(companion, "RETRIEVAL_ENABLED", True)
+    monkeypatch.setattr(companion.UserProfileCache, "get_prompt", get_prompt)
+    monkeypatch.setattr(companion, "retrieve_past_sessions", retrieve_past_sessions)
+    with companion.agent.override(model=FunctionModel(respond)):
+        yield seen_prompts
+
+
+def run_turns(workflow_id, *messages):
+    async def turns():
+        for message in messages:
+            state = {
+                "user_id": "user-1",
+                "workflow_id": workflow_id,
+                "user_input": {"response": message, "companion_name": "Emma", "companion_gender": "female"},
+            }
+            await companion.companion_agent(state)
+        return await CompanionAgentHistory.load_or_create(workflow_id)
+
+    return asyncio.run(turns())
+
+
+def test_profile_and_past_sessions_reach_the_model(stub_companion):
+    run_turns(str(uuid.uuid4()), "Hi, rough week.", "Work mostly.")
+
+    assert len(stub_companion) == 2
+    for prompt in stub_companion:
+        assert "Enjoys talking about: gardening" in prompt
+        assert "tomato seedlings" in prompt
+        assert "companion_name: Emma" in prompt
+
+
+def test_profile_and_past_sessions_stay_out_of_the_analyzer_transcript(stub_companion):
+    history = run_turns(str(uuid.uuid4()), "Hi, rough week.", "Work mostly.")
+    transcript = history.transcript(assistant_label="Companion")
+
+    assert "gardening" not in transcript
+    assert "tomato seedlings" not in transcript
+    assert "User: Hi, rough week." in transcript
+    assert "User: Work mostly." in transcript
+    assert "Companion: How was your week?" in transcript
+    # The persona is still useful context for the analysis
+    assert "companion_name: Emma" in transcript
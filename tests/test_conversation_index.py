@@ -0,0 +1,76 @@
+import asyncio
+import functools
+import os
+
+import pytest
+
+import storage.conversation_index as conversation_index
+from storage.conversation_index import ConversationIndex
+
+DIMENSIONS = 256
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ConversationIndex(str(tmp_path / "conversation_index"), DIMENSIONS)
+
+
+def vector_rows(index):
+    return os.path.getsize(os.path.join(index.root, "vectors.f16")) // (DIMENSIONS * 2)
+
+
+def test_delete_user_removes_their_rows_from_the_files(index):
+    index.add("alice", "w1", "gardening and tomato seedlings", "alice gardening")
+    index.add("bob", "w2", "gardening with his daughter", "bob gardening")
+    index.add("alice", "w3", "work deadlines and stress", "alice work")
+
+    assert index.delete_user("alice") == 2
+
+    assert vector_rows(index) == 1
+    with open(os.path.join(index.root, "meta.jsonl")) as f:
+        assert "alice" not in f.read()
+    assert index.search("alice", "gardening") == []
+    assert [match["snippet"] for match in index.search("bob", "gardening")] == ["bob gardening"]
+
+
+def test_delete_user_is_seen_by_other_readers(index):
+    reader = ConversationIndex(index.root, DIMENSIONS)
+    index.add("alice", "w1", "gardening and tomato seedlings", "alice gardening")
+    assert reader.search("alice", "gardening")
+
+    index.delete_user("alice")
+
+    assert reader.search("alice", "gardening") == []
+    # Appends after the compaction land in the new files
+    index.add("alice", "w4", "gardening again", "alice gardening again")
+    assert [match["snippet"] for match in reader.search("alice", "gardening")] == ["alice gardening again"]
+
+
+def test_compact_drops_superseded_rows_and_caps_sessions_per_user(index):
+    for i in range(5):
+        index.add("alice", f"w{i}", f"session {i} about gardening", f"alice {i}")
+    # Re-analysed: the second row supersedes the first
+    index.add("alice", "w4", "session 4 about gardening, re-analysed", "alice 4 again")
+
+    assert index.compact(max_sessions_per_user=3) == {"rows_before": 6, "rows_after": 3}
+
+    assert vector_rows(index) == 3
+    snippets = {match["snippet"] for match in index.search("alice", "gardening", k=10, min_score=0)}
+    assert snippets == {"alice 2", "alice 3", "alice 4 again"}
+
+
+def test_index_analysis_compacts_once_half_the_rows_are_dead(index, monkeypatch):
+    monkeypatch.setattr(conversation_index, "conversation_index", index)
+    monkeypatch.setattr(index, "needs_compaction", functools.partial(index.needs_compaction, min_rows=4))
+    data = {"intent_analysis": {"primary_intent": "talk about gardening"}}
+
+    async def analyse(times):
+        for _ in range(times):
+            assert await conversation_index.index_analysis("alice", "w1", data)
+
+    # The same workflow re-analysed: every row but the last is dead
+    asyncio.run(analyse(3))
+    assert vector_rows(index) == 3
+    asyncio.run(analyse(1))
+    assert vector_rows(index) == 1
+    assert len(index.search("alice", "gardening")) == 1
@@ -0,0 +1,64 @@
+import pytest
+
+from agents.companion.crisis import CRISIS_PHRASES, detect_crisis, normalize
+
+PUNCTUATION = ["", "!", "!!!", ".", "?", "...", "?!", ",", ")"]
+
+
+@pytest.mark.parametrize("punctuation", PUNCTUATION)
+@pytest.mark.parametrize("phrase", CRISIS_PHRASES)
+def test_every_phrase_is_detected_with_trailing_punctuation(phrase, punctuation):
+    assert detect_crisis(f"{phrase}{punctuation}")
+    assert detect_crisis(f"Honestly I {phrase}{punctuation} I can't go on")
+    assert detect_crisis(f"{phrase.upper()}{punctuation}")
+
+
+@pytest.mark.parametrize("phrase", CRISIS_PHRASES)
+def test_every_phrase_is_detected_with_leading_punctuation(phrase):
+    assert detect_crisis(f"...{phrase}")
+    assert detect_crisis(f'"{phrase}"')
+
+
+@pytest.mark.parametrize("text", [
+    "I want to die!",
+    "I want to kill myself!",
+    "Suicide!!",
+    "I wanna die!!!",
+    "im going to hurt myself!",
+    "I am suicidal!",
+    "i took an overdose!",
+])
+def test_reported_punctuated_messages(text):
+    assert detect_crisis(text)
+
+
+@pytest.mark.parametrize("text", [
+    "i want to k1ll myself",
+    "su1c1de",
+    "i w@nt to d1e",
+    "h@rm myself",
+    "KILLLLL MYSELF",
+    "end my l1fe",
+    "Suïcide",
+    "don’t want to live",
+])
+def test_disguised_spellings(text):
+    assert detect_crisis(text)
+
+
+@pytest.mark.parametrize("text", [
+    "I killed it at the gym today!",
+    "This homework is killing me",
+    "I'm dying to see that movie!!",
+    "The battery died at 10!",
+    "Let's end it here for today, thanks!",
+    "",
+])
+def test_ordinary_messages_are_not_flagged(text):
+    assert detect_crisis(text) is None
+
+
+def test_substitutions_stay_inside_words():
+    assert normalize("die!") == "die"
+    assert normalize("k1ll") == "kil"
+    assert normalize("I have 10 $ and 3 @ home") == "i have and home"
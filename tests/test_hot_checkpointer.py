@@ -0,0 +1,139 @@
+import asyncio
+import functools
+import operator
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.constants import START, END
+from langgraph.graph import StateGraph
+
+from storage.redis.checkpointer import HotCheckpointFlusher, RedisHotCheckpointer
+
+THREAD = {"configurable": {"thread_id": "thread-1"}}
+
+
+class TurnState(TypedDict):
+    turns: Annotated[List[str], operator.add]
+
+
+async def reply(state: TurnState):
+    return {"turns": [f"reply {len(state['turns'])}"]}
+
+
+def compile_graph(checkpointer):
+    graph = StateGraph(TurnState)
+    graph.add_node("reply", reply)
+    graph.add_edge(START, "reply")
+    graph.add_edge("reply", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+@pytest.fixture
+def hot(fake_redis):
+    return RedisHotCheckpointer(InMemorySaver(), keep_last=2)
+
+
+async def cold_ids(hot, config=THREAD):
+    return [t.config["configurable"]["checkpoint_id"] async for t in hot.cold.alist(config)]
+
+
+async def redis_keys(redis):
+    return sorted(key.decode() for key in await redis.keys("*"))
+
+
+def test_checkpoints_are_written_to_redis_and_read_back(hot, fake_redis):
+    app = compile_graph(hot)
+
+    async def run():
+        await app.ainvoke({"turns": ["hi"]}, THREAD)
+        await app.ainvoke({"turns": ["again"]}, THREAD)
+        return await app.aget_state(THREAD), await cold_ids(hot), await fake_redis.zrange(hot.ACTIVE_THREADS_KEY, 0, -1)
+
+    state, cold, active = asyncio.run(run())
+
+    assert state.values["turns"] == ["hi", "reply 1", "again", "reply 3"]
+    assert cold == []
+    assert active == [b"thread-1"]
+
+
+def test_idle_threads_are_flushed_to_the_cold_saver(hot, fake_redis):
+    app = compile_graph(hot)
+
+    async def run():
+        await app.ainvoke({"turns": ["hi"]}, THREAD)
+        latest = (await app.aget_state(THREAD)).config["configurable"]["checkpoint_id"]
+        # Not idle yet
+        assert (await hot.flush_idle(idle_seconds=600))["threads_idle"] == 0
+        report = await hot.flush_idle(idle_seconds=0)
+        return latest, report
+
+    latest, report = asyncio.run(run())
+
+    assert report["threads_idle"] == 1 and report["threads_failed"] == 0
+    assert report["checkpoints_flushed"] == 2 and report["checkpoints_dropped"] > 0
+    assert asyncio.run(redis_keys(fake_redis)) == []
+    # Only the newest keep_last checkpoints reach the cold saver, and reads now come from there
+    cold = asyncio.run(cold_ids(hot))
+    assert len(cold) == 2 and cold[0] == latest
+    state = asyncio.run(app.aget_state(THREAD))
+    assert state.values["turns"] == ["hi", "reply 1"]
+
+    # The next turn continues from the flushed state and is hot again
+    asyncio.run(app.ainvoke({"turns": ["back"]}, THREAD))
+    assert asyncio.run(app.aget_state(THREAD)).values["turns"] == ["hi", "reply 1", "back", "reply 3"]
+    assert asyncio.run(fake_redis.zrange(hot.ACTIVE_THREADS_KEY, 0, -1)) == [b"thread-1"]
+
+
+def test_a_write_racing_with_the_flush_keeps_the_checkpoint_hot(hot, fake_redis, monkeypatch):
+    """The release script finds the new write and leaves the checkpoint and thread for the next pass."""
+    app = compile_graph(hot)
+    cold_aput = hot.cold.aput
+    raced = []
+
+    async def aput_during_turn(config, checkpoint, metadata, new_versions):
+        stored = await cold_aput(config, checkpoint, metadata, new_versions)
+        if not raced:
+            # A turn writes to this checkpoint after the flush read it
+            raced.append(checkpoint["id"])
+            write_config = {"configurable": {**THREAD["configurable"], "checkpoint_ns": "", "checkpoint_id": checkpoint["id"]}}
+            await hot.aput_writes(write_config, [("turns", ["late"])], task_id="late-task")
+        return stored
+
+    async def run():
+        await app.ainvoke({"turns": ["hi"]}, THREAD)
+        monkeypatch.setattr(hot.cold, "aput", aput_during_turn)
+        first = await hot.flush_idle(idle_seconds=0)
+        still_hot = await fake_redis.hexists(hot._checkpoint_key("thread-1", ""), raced[0])
+        active = await fake_redis.zrange(hot.ACTIVE_THREADS_KEY, 0, -1)
+        second = await hot.flush_idle(idle_seconds=0)
+        cold = await hot.cold.aget_tuple({"configurable": {**THREAD["configurable"], "checkpoint_id": raced[0]}})
+        return first, still_hot, active, second, cold
+
+    first, still_hot, active, second, cold = asyncio.run(run())
+
+    assert first["threads_failed"] == 0
+    assert still_hot and active == [b"thread-1"]
+    # The second pass moves the late write and then releases the thread
+    assert second["writes_flushed"] == 1
+    assert ("late-task", "turns", ["late"]) in cold.pending_writes
+    assert asyncio.run(redis_keys(fake_redis)) == []
+
+
+def test_flusher_flushes_idle_threads_when_stopped(hot, fake_redis, monkeypatch):
+    app = compile_graph(hot)
+    flusher = HotCheckpointFlusher(hot, interval_seconds=3600)
+
+    async def run():
+        await app.ainvoke({"turns": ["hi"]}, THREAD)
+        hot_ids = await fake_redis.zrange(hot.ACTIVE_THREADS_KEY, 0, -1)
+        await flusher.start()
+        await flusher.stop()
+        return hot_ids
+
+    # Idle immediately, as at shutdown once HOT_CHECKPOINT_IDLE_SECONDS has passed
+    monkeypatch.setattr(hot, "flush_idle", functools.partial(hot.flush_idle, idle_seconds=0))
+
+    assert asyncio.run(run()) == [b"thread-1"]
+    assert asyncio.run(redis_keys(fake_redis)) == []
+    assert len(asyncio.run(cold_ids(hot))) == 2
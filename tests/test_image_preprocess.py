@@ -0,0 +1,53 @@
+import io
+
+import pytest
+from cachetools import LRUCache
+
+import utils.image_preprocess as image_preprocess
+from config.settings import IMAGE_CACHE_MAX_BYTES
+from utils.image_preprocess import ImageProfile, prepare_image
+
+Image = pytest.importorskip("PIL.Image")
+
+PROFILE = ImageProfile(max_dimension=64, format="PNG")
+
+
+def png(seed, size=64):
+    image = Image.effect_noise((size, size), 20 + seed)
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def small_cache(monkeypatch):
+    """The image cache with a budget of a few prepared images."""
+    monkeypatch.setattr(image_preprocess, "IMAGE_PREPROCESS_ENABLED", True)
+    size = len(image_preprocess._encode(png(0), PROFILE))
+    cache = LRUCache(maxsize=3 * size, getsizeof=len)
+    monkeypatch.setattr(image_preprocess, "_cache", cache)
+    return cache
+
+
+def test_cache_is_bounded_by_the_bytes_of_the_prepared_images():
+    assert image_preprocess._cache.maxsize == IMAGE_CACHE_MAX_BYTES
+    assert image_preprocess._cache.getsizeof(b"prepared") == len(b"prepared")
+
+
+def test_cache_evicts_the_least_recently_used_images_to_stay_in_budget(small_cache):
+    images = [png(seed) for seed in range(6)]
+    for data in images:
+        prepare_image(data, "image/png", PROFILE)
+
+    assert small_cache.currsize <= small_cache.maxsize
+    assert 0 < len(small_cache) < len(images)
+
+
+def test_image_larger_than_the_budget_is_prepared_but_not_cached(small_cache):
+    data = png(0, size=1024)
+
+    prepared, media_type = prepare_image(data, "image/png", ImageProfile(max_dimension=1024, format="PNG"))
+
+    assert len(prepared) > small_cache.maxsize
+    assert media_type == "image/png"
+    assert len(small_cache) == 0
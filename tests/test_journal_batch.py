@@ -0,0 +1,99 @@
+import asyncio
+import re
+import uuid
+
+import pytest
+from pydantic_ai.messages import ModelResponse, ToolCallPart, UserPromptPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+import agents.journal.batch_analyzer as batch_analyzer
+import agents.journal.journal_analyzer as journal_analyzer
+from agents.journal.batch_analyzer import BATCH_ANALYSIS_VERSION, analyze_journal_entries
+from agents.journal.journal_analyzer import ANALYSIS_VERSION, JournalAnalysis
+from storage.redis.journal_cache import JournalAnalysisCache
+from storage.redis.journal_rollups import JournalMoodRollups
+
+ENTRY_HEADER = re.compile(r"## Entry (\d+)")
+LABELS = [("hopeful", "work"), ("sad", "relationships"), ("calm", "health")]
+
+
+@pytest.fixture
+def batch_model(fake_redis, local_analysis_store, monkeypatch):
+    """Answer batch requests by entry index; single-entry requests get the first labels."""
+    requests = []
+
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        prompt = "".join(str(part.content) for part in messages[-1].parts if isinstance(part, UserPromptPart))
+        indexes = [int(i) for i in ENTRY_HEADER.findall(prompt)]
+        requests.append(indexes)
+        if not indexes:
+            mood, category = LABELS[0]
+            return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"mood": mood, "category": category, "analysis": "single"})])
+        results = [{"index": i, "mood": LABELS[i][0], "category": LABELS[i][1], "analysis": f"entry {i}"} for i in indexes]
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"results": results})])
+
+    monkeypatch.setattr(journal_analyzer, "JOURNAL_FAST_CLASSIFIER_ENABLED", False)
+    monkeypatch.setattr(journal_analyzer, "JOURNAL_ROLLUPS_ENABLED", True)
+    monkeypatch.setattr(journal_analyzer, "JOURNAL_CACHE_ENABLED", True)
+    monkeypatch.setattr(batch_analyzer, "JOURNAL_CACHE_ENABLED", True)
+    model = FunctionModel(respond)
+    with batch_analyzer.batch_journal_agent.override(model=model), journal_analyzer.journal_agent.override(model=model):
+        yield requests
+
+
+def test_batch_results_are_stored_and_counted_in_rollups(batch_model, local_analysis_store):
+    entries = [f"Journal entry number {i}." for i in range(3)]
+    workflow_ids = [str(uuid.uuid4()) for _ in entries]
+
+    async def run():
+        analyses = await analyze_journal_entries(entries, workflow_ids, "user-1", timezone="Europe/London")
+        records = [await local_analysis_store.load("journal", workflow_id) for workflow_id in workflow_ids]
+        today = (await JournalMoodRollups.daily("user-1", days=1, timezone_name="Europe/London"))[0]
+        return analyses, records, today
+
+    analyses, records, today = asyncio.run(run())
+
+    assert batch_model == [[0, 1, 2]]
+    assert [(a.mood, a.category) for a in analyses] == LABELS
+    assert [(r.user_id, r.timezone, r.data["mood"]) for r in records] == [
+        ("user-1", "Europe/London", mood) for mood, _ in LABELS
+    ]
+    assert today["total"] == 3
+    assert today["moods"] == {"hopeful": 1, "sad": 1, "calm": 1}
+
+
+def test_batch_results_are_cached_under_the_batch_version(batch_model):
+    entries = ["Only entry."]
+
+    async def run():
+        await analyze_journal_entries(entries, [str(uuid.uuid4())], "user-1")
+        return (
+            await JournalAnalysisCache.get(entries[0], BATCH_ANALYSIS_VERSION, JournalAnalysis),
+            await JournalAnalysisCache.get(entries[0], ANALYSIS_VERSION, JournalAnalysis),
+        )
+
+    batch_cached, single_cached = asyncio.run(run())
+    assert BATCH_ANALYSIS_VERSION != ANALYSIS_VERSION
+    assert batch_cached.analysis == "entry 0"
+    assert single_cached is None
+
+
+def test_cached_single_entry_results_are_reused_and_stored(batch_model, local_analysis_store):
+    entries = ["Analysed before on its own."]
+    workflow_id = str(uuid.uuid4())
+    earlier = JournalAnalysis(mood="grateful", category="reflection", analysis="earlier")
+
+    async def run():
+        await JournalAnalysisCache.set(entries[0], ANALYSIS_VERSION, earlier, 60)
+        analyses = await analyze_journal_entries(entries, [workflow_id], "user-1")
+        return analyses, await local_analysis_store.load("journal", workflow_id)
+
+    analyses, record = asyncio.run(run())
+    assert batch_model == []
+    assert analyses == [earlier]
+    assert record.data["analysis"] == "earlier"
+
+
+def test_workflow_ids_must_match_entries(batch_model):
+    with pytest.raises(ValueError):
+        asyncio.run(analyze_journal_entries(["a", "b"], ["w1"], "user-1"))
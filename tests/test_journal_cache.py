@@ -0,0 +1,30 @@
+import asyncio
+
+import agents.journal.journal_analyzer as journal_analyzer
+from agents.journal.journal_analyzer import JournalAnalysis, analysis_version
+from prompts.journal.journal_analyzer import journal_analysis_only_prompt, journal_analyzer_prompt
+from storage.redis.journal_cache import JournalAnalysisCache
+
+ENTRY = "Long day at work, but the evening run helped."
+ANALYSIS = JournalAnalysis(mood="hopeful", category="work", analysis="Tired but recovering.")
+
+
+def test_analysis_version_covers_both_single_entry_prompts():
+    assert journal_analyzer.ANALYSIS_VERSION == analysis_version(journal_analyzer_prompt, journal_analysis_only_prompt)
+    assert analysis_version(journal_analyzer_prompt + " Be brief.", journal_analysis_only_prompt) != journal_analyzer.ANALYSIS_VERSION
+    assert analysis_version(journal_analyzer_prompt, journal_analysis_only_prompt + " Be brief.") != journal_analyzer.ANALYSIS_VERSION
+
+
+def test_editing_the_analysis_only_prompt_misses_old_results(fake_redis):
+    edited = analysis_version(journal_analyzer_prompt, journal_analysis_only_prompt + " Be brief.")
+
+    async def lookups():
+        await JournalAnalysisCache.set(ENTRY, journal_analyzer.ANALYSIS_VERSION, ANALYSIS, 60)
+        return (
+            await JournalAnalysisCache.get(ENTRY, journal_analyzer.ANALYSIS_VERSION, JournalAnalysis),
+            await JournalAnalysisCache.get(ENTRY, edited, JournalAnalysis),
+        )
+
+    current, after_edit = asyncio.run(lookups())
+    assert current == ANALYSIS
+    assert after_edit is None
@@ -0,0 +1,191 @@
+import asyncio
+import uuid
+
+import numpy as np
+import pytest
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+import agents.journal.journal_analyzer as journal_analyzer
+from agents.journal.journal_analyzer import new_fast_classifier, predict_fast_labels
+from storage.redis.journal_examples import JournalTrainingExamples
+from utils import metrics
+
+MOODS = ["happy", "sad", "angry", "anxious", "calm"]
+CATEGORIES = ["work", "health", "goals"]
+COMMON_WORDS = [f"word{i}" for i in range(300)]
+THRESHOLD = 0.8
+
+
+def synthetic_entry(rng, mood, category, noise):
+    """40 common words plus three mood and three topic words, each from a random label with probability `noise`."""
+    words = list(rng.choice(COMMON_WORDS, 40))
+    for _ in range(3):
+        words.append(f"{mood if rng.random() > noise else rng.choice(MOODS)}feeling{rng.integers(5)}")
+        words.append(f"{category if rng.random() > noise else rng.choice(CATEGORIES)}topic{rng.integers(5)}")
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def synthetic_examples(classifier, rng, noise, count=2000):
+    examples = []
+    for _ in range(count):
+        mood, category = rng.choice(MOODS), rng.choice(CATEGORIES)
+        features = classifier.featurize(synthetic_entry(rng, mood, category, noise))
+        examples.append({"features": features.tolist(), "mood": mood, "category": category})
+    return examples
+
+
+def trained_classifier(noise, seed=1):
+    classifier = new_fast_classifier()
+    classifier.train(synthetic_examples(classifier, np.random.default_rng(seed), noise))
+    return classifier
+
+
+def confidence_and_accuracy(classifier, rng, noise, count=500):
+    confidences, correct = [], []
+    for _ in range(count):
+        mood, category = rng.choice(MOODS), rng.choice(CATEGORIES)
+        labels = classifier.predict(synthetic_entry(rng, mood, category, noise))
+        confidences.append(labels.confidence)
+        correct.append(labels.mood == mood and labels.category == category)
+    return float(np.mean(confidences)), float(np.mean(correct))
+
+
+@pytest.fixture(scope="module")
+def clear_classifier():
+    """Labels mostly signalled by their own words: confident predictions are usually right."""
+    return trained_classifier(noise=0.1)
+
+
+@pytest.fixture(scope="module")
+def ambiguous_classifier():
+    """Labels often signalled by other labels' words."""
+    return trained_classifier(noise=0.5)
+
+
+def test_confidence_is_calibrated_on_held_out_examples(ambiguous_classifier):
+    rng = np.random.default_rng(2)
+    calibrated_confidence, accuracy = confidence_and_accuracy(ambiguous_classifier, rng, noise=0.5)
+    assert abs(calibrated_confidence - accuracy) < 0.05
+
+    temperatures = ambiguous_classifier.mood_model.temperature, ambiguous_classifier.category_model.temperature
+    assert min(temperatures) > 1
+    ambiguous_classifier.mood_model.temperature = ambiguous_classifier.category_model.temperature = 1.0
+    try:
+        raw_confidence, _ = confidence_and_accuracy(ambiguous_classifier, rng, noise=0.5)
+    finally:
+        ambiguous_classifier.mood_model.temperature, ambiguous_classifier.category_model.temperature = temperatures
+    # Raw naive Bayes posteriors claim far more than the model delivers
+    assert raw_confidence > accuracy + 0.2
+
+
+def test_fast_path_needs_held_out_precision_at_the_threshold(clear_classifier, ambiguous_classifier):
+    assert not new_fast_classifier().ready(min_examples=1, threshold=THRESHOLD)
+    assert clear_classifier.precision_at(THRESHOLD) >= THRESHOLD
+    assert clear_classifier.ready(min_examples=200, threshold=THRESHOLD)
+    assert not clear_classifier.ready(min_examples=100000, threshold=THRESHOLD)
+    assert not ambiguous_classifier.ready(min_examples=200, threshold=THRESHOLD)
+
+
+def test_saved_model_keeps_its_calibration(clear_classifier, tmp_path):
+    path = str(tmp_path / "journal_classifier.npz")
+    clear_classifier.save(path)
+    loaded = new_fast_classifier()
+    assert loaded.load(path)
+    assert loaded.mood_model.temperature == clear_classifier.mood_model.temperature
+    assert loaded.ready(min_examples=200, threshold=THRESHOLD)
+
+    # A model saved before calibration existed loads, but never skips the LLM
+    np.savez_compressed(
+        path,
+        mood_feature_counts=clear_classifier.mood_model.feature_counts,
+        mood_class_counts=clear_classifier.mood_model.class_counts,
+        category_feature_counts=clear_classifier.category_model.feature_counts,
+        category_class_counts=clear_classifier.category_model.class_counts,
+    )
+    legacy = new_fast_classifier()
+    assert legacy.load(path)
+    assert not legacy.ready(min_examples=200, threshold=THRESHOLD)
+
+
+@pytest.fixture
+def fast_path(fake_redis, local_analysis_store, monkeypatch, clear_classifier):
+    """The journal analyzer with the clear classifier loaded and stub models recording which agent ran."""
+    calls = []
+
+    async def labelled(messages, info: AgentInfo) -> ModelResponse:
+        calls.append("journal_agent")
+        output = {"mood": "sad", "category": "health", "analysis": "full analysis"}
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, output)])
+
+    async def text_only(messages, info: AgentInfo) -> ModelResponse:
+        calls.append("journal_text_agent")
+        return ModelResponse(parts=[TextPart("analysis text")])
+
+    metrics.reset()
+    monkeypatch.setattr(journal_analyzer, "_fast_classifier", clear_classifier)
+    monkeypatch.setattr(journal_analyzer, "JOURNAL_FAST_CLASSIFIER_ENABLED", True)
+    monkeypatch.setattr(journal_analyzer, "JOURNAL_FAST_CLASSIFIER_THRESHOLD", THRESHOLD)
+    monkeypatch.setattr(journal_analyzer, "JOURNAL_FAST_CLASSIFIER_MIN_EXAMPLES", 200)
+    monkeypatch.setattr(journal_analyzer, "JOURNAL_CACHE_ENABLED", False)
+    with journal_analyzer.journal_agent.override(model=FunctionModel(labelled)), \
+            journal_analyzer.journal_text_agent.override(model=FunctionModel(text_only)):
+        yield calls
+
+
+CLEAR_ENTRY = "happyfeeling0 happyfeeling1 happyfeeling2 happyfeeling3 worktopic0 worktopic1 worktopic2 worktopic3"
+AMBIGUOUS_ENTRY = "word1 word2 word3 word4 word5 word6"
+
+
+def test_untrained_classifier_is_counted_separately(fast_path, monkeypatch):
+    monkeypatch.setattr(journal_analyzer, "_fast_classifier", new_fast_classifier())
+
+    assert predict_fast_labels(CLEAR_ENTRY) is None
+    assert metrics.get_count("journal_fast_classifier.untrained") == 1
+    assert metrics.get_count("journal_fast_classifier.low_confidence") == 0
+
+
+def test_confident_entries_only_ask_for_the_analysis_text(fast_path):
+    analysis = asyncio.run(journal_analyzer.analyze_journal_entry(CLEAR_ENTRY))
+
+    assert fast_path == ["journal_text_agent"]
+    assert (analysis.mood, analysis.category, analysis.analysis) == ("happy", "work", "analysis text")
+    assert metrics.get_count("journal_fast_classifier.hits") == 1
+
+
+def test_low_confidence_entries_get_the_full_llm_analysis(fast_path, clear_classifier):
+    counts = clear_classifier.mood_model.class_counts.copy()
+
+    async def analyse():
+        analysis = await journal_analyzer.analyze_journal_entry(AMBIGUOUS_ENTRY)
+        return analysis, await JournalTrainingExamples.load_all()
+
+    analysis, examples = asyncio.run(analyse())
+
+    assert fast_path == ["journal_agent"]
+    assert (analysis.mood, analysis.category) == ("sad", "health")
+    assert metrics.get_count("journal_fast_classifier.low_confidence") == 1
+    # Stored for the next offline training run; the loaded model is not changed in place
+    assert [(e["mood"], e["category"]) for e in examples] == [("sad", "health")]
+    assert np.array_equal(clear_classifier.mood_model.class_counts, counts)
+
+
+def test_deferred_reference_matches_the_stored_record(fast_path, local_analysis_store):
+    workflow_id = str(uuid.uuid4())
+    state = {
+        "user_id": "user-1",
+        "workflow_id": workflow_id,
+        "user_input": {"response": CLEAR_ENTRY, "defer_analysis": True, "timezone": "Europe/London"},
+    }
+
+    async def run():
+        result = await journal_analyzer.journal_analyzer_agent(state)
+        await asyncio.gather(*journal_analyzer._deferred_tasks)
+        return result["journal_analysis"], await local_analysis_store.load("journal", workflow_id)
+
+    reference, record = asyncio.run(run())
+
+    assert reference == {**record.reference(), "analysis_pending": True}
+    assert reference["created_at"] == record.created_at.isoformat()
+    assert record.data["analysis"] == "analysis text"
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from storage.analysis_store import AnalysisRecord
+from storage.mongodb.analysis_store import MongoAnalysisStore
+
+
+class FlakyCollection:
+    """An analyses collection whose bulk writes fail while `down` is set."""
+
+    def __init__(self):
+        self.down = True
+        self.documents = {}
+
+    async def create_index(self, keys, name):
+        return name
+
+    async def bulk_write(self, requests, ordered):
+        if self.down:
+            raise AutoReconnect("connection refused")
+        for request in requests:
+            self.documents[request._filter["_id"]] = request._doc
+
+    async def find_one(self, query):
+        return self.documents.get(query["_id"])
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FlakyCollection()
+    monkeypatch.setattr(MongoAnalysisStore, "_collection", property(lambda self: collection))
+    return collection
+
+
+def record(workflow_id):
+    return AnalysisRecord(kind="journal", workflow_id=workflow_id, user_id="user-1", data={"analysis": "text"})
+
+
+def test_save_does_not_raise_when_the_batch_write_fails(collection):
+    async def run():
+        store = MongoAnalysisStore(batch_size=2, flush_ms=10)
+        await store.save(record("w1"))
+        # Fills the buffer: the write fails, but the analysis that triggered it must not
+        await store.save(record("w2"))
+
+        # Still readable, and retried once the database is back
+        assert (await store.load("journal", "w2")).workflow_id == "w2"
+        assert store._flush_task is not None
+        collection.down = False
+        store._flush_task.cancel()
+        assert await store.flush() == 2
+
+    asyncio.run(run())
+    assert set(collection.documents) == {"journal:w1", "journal:w2"}
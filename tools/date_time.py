@@ -1,24 +1,69 @@
 from datetime import datetime
+from functools import lru_cache
+import logging
 import pytz
 
-def get_date() -> str:
+from config.settings import DEFAULT_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=256)
+def get_timezone(name: str = None):
+    """
+    Resolve a timezone name, falling back to DEFAULT_TIMEZONE when it is missing or unknown.
+
+    Args:
+        name: IANA timezone name, e.g. 'Europe/London'
+
+    Returns:
+        tzinfo: Cached pytz timezone object
+    """
+    if name:
+        try:
+            return pytz.timezone(name)
+        except pytz.UnknownTimeZoneError:
+            logger.warning(f"Unknown timezone '{name}', falling back to {DEFAULT_TIMEZONE}")
+    return pytz.timezone(DEFAULT_TIMEZONE)
+
+def current_time_context(timezone_name: str = None) -> str:
+    """
+    Build the date/time context injected into the companion system prompt.
+
+    Args:
+        timezone_name: The user's IANA timezone name
+
+    Returns:
+        str: Current date and time in the user's timezone
+    """
+    tz = get_timezone(timezone_name)
+    current_time = datetime.now(tz)
+    return (
+        f"Current date: {current_time.strftime('%A, %d-%m-%Y')}\n"
+        f"Current time: {current_time.strftime('%I:%M %p')} ({tz.zone})"
+    )
+
+def get_date(timezone_name: str = None) -> str:
     """
     Get the current date.
     
+    Args:
+        timezone_name: IANA timezone name (defaults to DEFAULT_TIMEZONE)
+
     Returns:
         str: Current date in format 'DD-MM-YYYY'
     """
-    ist = pytz.timezone('Asia/Kolkata')
-    current_time = datetime.now(ist)
+    current_time = datetime.now(get_timezone(timezone_name))
     return current_time.strftime("%d-%m-%Y")
 
-def get_time() -> str:
+def get_time(timezone_name: str = None) -> str:
     """
     Get the current time with AM/PM format.
     
+    Args:
+        timezone_name: IANA timezone name (defaults to DEFAULT_TIMEZONE)
+
     Returns:
         str: Current time in format 'HH:MM:SS AM/PM'
     """
-    ist = pytz.timezone('Asia/Kolkata')
-    current_time = datetime.now(ist)
+    current_time = datetime.now(get_timezone(timezone_name))
     return current_time.strftime("%I:%M %p")
@@ -1,11 +1,30 @@
-import base64
+import binascii
+import logging
 import mimetypes
+import os
 import asyncio
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 
 from pydantic_ai import BinaryContent, DocumentUrl, ImageUrl
 
+from config.settings import ATTACHMENT_MAX_BYTES
+from utils import metrics
+from utils.image_preprocess import DEFAULT_IMAGE_PROFILE, ImageProfile, prepare_image
+from utils.text_extract import can_extract, extract_attachment_text
+from utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+
+class AttachmentTooLargeError(ValueError):
+    """Raised when an attachment exceeds ATTACHMENT_MAX_BYTES."""
+
+    def __init__(self, size: int, limit: int = ATTACHMENT_MAX_BYTES):
+        super().__init__(f"Attachment of {size} bytes exceeds the {limit} byte limit")
+        self.size = size
+        self.limit = limit
+
 
 def _guess_media_type(path: Union[str, Path], default: str = "application/octet-stream") -> str:
     """Guess the media type from a file path or URL."""
@@ -13,35 +32,131 @@ def _guess_media_type(path: Union[str, Path], default: str = "application/octet-
     return mime or default
 
 
+def _check_size(size: int) -> None:
+    if size > ATTACHMENT_MAX_BYTES:
+        raise AttachmentTooLargeError(size)
+
+
+def _decoded_size_upper_bound(data: str) -> int:
+    """Largest possible decoded size of a base64 string, without decoding it."""
+    return (len(data) + 3) // 4 * 3
+
+
+def _read_file(path: Path) -> bytes:
+    """
+    Read a local file into a single buffer, enforcing the size cap before reading.
+
+    The file is read with one pre-sized read of the size reported by fstat, so
+    the returned bytes object is the only copy of the contents held in memory
+    and bytes appended after the check are never read.
+
+    Raises:
+        AttachmentTooLargeError: If the file exceeds the cap
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        _check_size(size)
+        return f.read(size)
+
+
 def _bytes_from_maybe_base64(data: Union[str, bytes, bytearray]) -> bytes:
-    """Decode base64 if a string is provided, otherwise return raw bytes."""
+    """
+    Decode base64 if a string is provided, otherwise return raw bytes.
+
+    The decoded size is bounded from the string length before anything is
+    allocated. Decoding reads the string's ASCII buffer directly into one output
+    buffer, skipping the full-size ASCII copy `base64.b64decode` makes of a str.
+
+    Raises:
+        AttachmentTooLargeError: If the (decoded) payload exceeds the cap
+    """
     if isinstance(data, (bytes, bytearray)):
+        _check_size(len(data))
         return bytes(data)
     if isinstance(data, str):
+        _check_size(_decoded_size_upper_bound(data))
         # Try base64 decode; if it fails, treat as raw text bytes
         try:
-            return base64.b64decode(data, validate=False)
-        except Exception:
-            return data.encode()
+            return binascii.a2b_base64(data)
+        except (binascii.Error, ValueError):
+            encoded = data.encode()
+            _check_size(len(encoded))
+            return encoded
+
+
+def attachment_placeholder(content: BinaryContent) -> str:
+    """
+    Short text standing in for a binary attachment in stored history.
 
+    The model saw the attachment on the turn it was sent; later turns (and the
+    conversation analyzer) replay this note instead of the base64 payload.
+    """
+    kind = "image" if content.media_type.startswith("image/") else "file"
+    return f"[{kind} attachment: {content.media_type}, {max(1, round(len(content.data) / 1024))} KB]"
+
+
+async def _local_part(data: bytes, media_type: str, name: Optional[str], image_profile: ImageProfile) -> Union[str, BinaryContent]:
+    """
+    Turn local bytes into a prompt part.
 
-async def file_to_prompt_parts(text: str, file_info: Optional[Union[Dict[str, Any], str, Path]]) -> List[Any]:
+    Text-like documents become a plain text part (so history keeps the text, not
+    the binary); images are downscaled and re-encoded for the target model.
+    """
+    if can_extract(media_type):
+        text = await asyncio.to_thread(extract_attachment_text, data, media_type, name)
+        if text is not None:
+            return text
+    if media_type.startswith("image/"):
+        data, media_type = await asyncio.to_thread(prepare_image, data, media_type, image_profile)
+    return BinaryContent(data=data, media_type=media_type)
+
+
+@traced("file_to_prompt_parts")
+async def file_to_prompt_parts(
+    text: str,
+    file_info: Optional[Union[Dict[str, Any], str, Path]],
+    image_profile: ImageProfile = DEFAULT_IMAGE_PROFILE,
+) -> List[Any]:
     """
     Build a list of prompt parts for PydanticAI from text + optional file info.
 
     Supported file_info shapes:
     - {"url": str}
     - {"path": str, "media_type"?: str}
-    - {"bytes": (bytes|bytearray|base64_str), "media_type": str}
+    - {"bytes": (bytes|bytearray|base64_str), "media_type": str, "name"?: str}
     - str or Path: treated as local path if not an http(s) URL, otherwise URL
 
     If the URL/path appears to be an image (image/*), ImageUrl is used.
     Otherwise, DocumentUrl for URLs, and BinaryContent for local bytes.
+
+    Local files and raw bytes larger than ATTACHMENT_MAX_BYTES are rejected
+    before they are read or decoded; the attachment is dropped and a short note
+    is added so the model can tell the user.
+
+    Local image bytes are downscaled and re-encoded according to `image_profile`
+    (see utils/image_preprocess.py); image URLs are passed through unchanged.
+    Local text-like documents (txt, md, csv, json, html, pdf) are extracted to
+    text within ATTACHMENT_TEXT_TOKEN_BUDGET (see utils/text_extract.py), so the
+    provider does not re-parse them and follow-up turns replay only the text.
     """
     parts: List[Any] = [text]
     if not file_info:
         return parts
 
+    try:
+        return await _append_file_part(parts, file_info, image_profile)
+    except AttachmentTooLargeError as e:
+        metrics.increment("attachments.rejected_too_large")
+        logger.warning(f"Dropping attachment: {str(e)}")
+        parts.append(f"[The attached file was not processed because it is larger than the {ATTACHMENT_MAX_BYTES / (1024 * 1024):g} MB limit.]")
+        return parts
+
+
+async def _append_file_part(
+    parts: List[Any],
+    file_info: Union[Dict[str, Any], str, Path],
+    image_profile: ImageProfile,
+) -> List[Any]:
     # Accept plain string or Path objects for convenience
     if isinstance(file_info, (str, Path)):
         # URL or local path?
@@ -56,9 +171,9 @@ async def file_to_prompt_parts(text: str, file_info: Optional[Union[Dict[str, An
         # Local path
         p = Path(s)
         if p.exists() and p.is_file():
-            data = await asyncio.to_thread(p.read_bytes)
+            data = await asyncio.to_thread(_read_file, p)
             media_type = _guess_media_type(p)
-            parts.append(BinaryContent(data=data, media_type=media_type))
+            parts.append(await _local_part(data, media_type, p.name, image_profile))
         return parts
 
     # URL case
@@ -76,9 +191,9 @@ async def file_to_prompt_parts(text: str, file_info: Optional[Union[Dict[str, An
     if isinstance(path, str) and path:
         p = Path(path)
         if p.exists() and p.is_file():
-            data = await asyncio.to_thread(p.read_bytes)
+            data = await asyncio.to_thread(_read_file, p)
             media_type = file_info.get("media_type") or _guess_media_type(p)
-            parts.append(BinaryContent(data=data, media_type=media_type))
+            parts.append(await _local_part(data, media_type, p.name, image_profile))
             return parts
         else:
             # If path is invalid, just fall back to text-only
@@ -88,7 +203,7 @@ async def file_to_prompt_parts(text: str, file_info: Optional[Union[Dict[str, An
     if "bytes" in file_info:
         media_type = file_info.get("media_type") or "application/octet-stream"
         data = _bytes_from_maybe_base64(file_info["bytes"])  # type: ignore[index]
-        parts.append(BinaryContent(data=data, media_type=media_type))
+        parts.append(await _local_part(data, media_type, file_info.get("name"), image_profile))
         return parts
 
     # Unknown structure -> ignore
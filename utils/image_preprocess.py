@@ -0,0 +1,124 @@
+import hashlib
+import io
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Tuple
+
+from cachetools import LRUCache
+
+from config.settings import (
+    IMAGE_PREPROCESS_ENABLED,
+    IMAGE_MAX_DIMENSION,
+    IMAGE_FORMAT,
+    IMAGE_QUALITY,
+    IMAGE_CACHE_MAX_BYTES,
+)
+from utils import metrics
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; images are then sent unchanged
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+_MEDIA_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+@dataclass(frozen=True)
+class ImageProfile:
+    """
+    Image preprocessing knobs for one model.
+
+    Attributes:
+        max_dimension: Longest side in pixels after downscaling
+        format: Output format, JPEG, WEBP or PNG
+        quality: Encoder quality for JPEG/WEBP (1-100)
+    """
+    max_dimension: int = IMAGE_MAX_DIMENSION
+    format: str = IMAGE_FORMAT
+    quality: int = IMAGE_QUALITY
+
+    @property
+    def media_type(self) -> str:
+        return _MEDIA_TYPES[self.format]
+
+
+DEFAULT_IMAGE_PROFILE = ImageProfile()
+
+# Prepared images keyed by (content hash, profile), bounded by their total size; shared by the worker threads
+_cache: LRUCache = LRUCache(maxsize=IMAGE_CACHE_MAX_BYTES, getsizeof=len)
+_cache_lock = threading.Lock()
+
+
+def preprocessing_available() -> bool:
+    """Whether image preprocessing is enabled and Pillow is installed."""
+    return IMAGE_PREPROCESS_ENABLED and Image is not None
+
+
+def _encode(data: bytes, profile: ImageProfile) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        if getattr(image, "n_frames", 1) > 1:
+            raise ValueError("animated images are sent unchanged")
+        # Let the JPEG decoder scale down by a power of two while decoding
+        image.draft(image.mode, (profile.max_dimension, profile.max_dimension))
+        # Apply the EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((profile.max_dimension, profile.max_dimension), Image.Resampling.LANCZOS)
+
+        if profile.format == "JPEG" and image.mode not in ("RGB", "L"):
+            # JPEG has no alpha channel: flatten onto white
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+
+        # Saving without exif/icc_profile/pnginfo drops the original metadata
+        output = io.BytesIO()
+        image.save(output, format=profile.format, quality=profile.quality, optimize=True)
+        return output.getvalue()
+
+
+def prepare_image(data: bytes, media_type: str, profile: ImageProfile = DEFAULT_IMAGE_PROFILE) -> Tuple[bytes, str]:
+    """
+    Downscale, strip metadata from and re-encode an image before it is sent to a model.
+
+    CPU bound; call it from a worker thread. Results are cached by content hash
+    and profile, so re-sent images are not decoded again.
+
+    Args:
+        data: The original image bytes
+        media_type: The original media type
+        profile: Preprocessing knobs of the target model
+
+    Returns:
+        Tuple[bytes, str]: The prepared bytes and media type, or the originals
+        when preprocessing is unavailable or the image cannot be decoded
+    """
+    if not preprocessing_available():
+        return data, media_type
+
+    key = (hashlib.sha256(data).hexdigest(), profile)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None:
+        metrics.increment("image_preprocess.cache_hits")
+        return cached, profile.media_type
+
+    try:
+        prepared = _encode(data, profile)
+    except Exception as e:
+        logger.warning(f"Sending {media_type} image unchanged, preprocessing failed: {str(e)}")
+        metrics.increment("image_preprocess.failures")
+        return data, media_type
+
+    # An image larger than the whole budget is not cached (LRUCache rejects it)
+    if len(prepared) <= _cache.maxsize:
+        with _cache_lock:
+            _cache[key] = prepared
+    metrics.increment("image_preprocess.images")
+    metrics.increment("image_preprocess.bytes_saved", len(data) - len(prepared))
+    logger.debug(f"Prepared {media_type} image: {len(data)} -> {len(prepared)} bytes")
+    return prepared, profile.media_type
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Dict, Tuple
+
+# In-process counters and timings, read by status endpoints and benchmarks
+_counters: Counter = Counter()
+_timings: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+
+def increment(name: str, value: int = 1) -> None:
+    """Increment the named counter."""
+    with _lock:
+        _counters[name] += value
+
+
+def get_count(name: str) -> int:
+    """Return the current value of the named counter."""
+    with _lock:
+        return _counters[name]
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record a duration for the named timing (count, total and max are kept)."""
+    with _lock:
+        timing = _timings.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        timing["count"] += 1
+        timing["total_seconds"] += seconds
+        timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+
+async def timed(name: str, awaitable: Awaitable[Any]) -> Tuple[Any, float]:
+    """
+    Await something and record how long it took.
+
+    Returns:
+        Tuple[Any, float]: The awaited result and the elapsed seconds
+    """
+    start = time.perf_counter()
+    result = await awaitable
+    elapsed = time.perf_counter() - start
+    observe(name, elapsed)
+    return result, elapsed
+
+
+async def gather_timed(prefix: str, **steps: Awaitable[Any]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Run independent steps concurrently, recording a timing for each under `prefix.name`.
+
+    Returns:
+        Tuple[Dict, Dict]: Results by step name and elapsed seconds by step name
+    """
+    names = list(steps)
+    outcomes = await asyncio.gather(*(timed(f"{prefix}.{name}", steps[name]) for name in names))
+    results = {name: outcome[0] for name, outcome in zip(names, outcomes)}
+    timings = {name: outcome[1] for name, outcome in zip(names, outcomes)}
+    return results, timings
+
+
+def snapshot() -> Dict[str, Any]:
+    """Return a copy of all counters and timings."""
+    with _lock:
+        return {
+            **_counters,
+            **{f"{name}.timing": dict(timing) for name, timing in _timings.items()},
+        }
+
+
+def reset() -> None:
+    """Reset all counters and timings (for tests and benchmarks)."""
+    with _lock:
+        _counters.clear()
+        _timings.clear()
@@ -0,0 +1,183 @@
+import hashlib
+import io
+import json
+import logging
+import re
+import threading
+from html.parser import HTMLParser
+from typing import List, Optional
+
+from cachetools import LRUCache
+
+from config.settings import (
+    TEXT_EXTRACT_ENABLED,
+    ATTACHMENT_TEXT_TOKEN_BUDGET,
+    TEXT_EXTRACT_CACHE_MAX_ENTRIES,
+)
+from utils import metrics
+from utils.text_features import estimate_tokens
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pypdf is optional; PDFs are then sent as binaries
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+# Characters per token, matching utils.text_features.estimate_tokens
+_CHARS_PER_TOKEN = 4
+
+TEXT_MEDIA_TYPES = {
+    "text/plain", "text/markdown", "text/x-markdown", "text/csv",
+    "text/html", "application/json", "application/pdf",
+}
+
+# Extracted (already budgeted) text keyed by (content hash, media type, budget)
+_cache: LRUCache = LRUCache(maxsize=TEXT_EXTRACT_CACHE_MAX_ENTRIES)
+_cache_lock = threading.Lock()
+
+
+def can_extract(media_type: str) -> bool:
+    """Whether attachments of this media type are turned into text locally."""
+    if not TEXT_EXTRACT_ENABLED or media_type not in TEXT_MEDIA_TYPES:
+        return False
+    return media_type != "application/pdf" or PdfReader is not None
+
+
+class _HTMLTextParser(HTMLParser):
+    """Collects visible text, dropping scripts and styles and breaking lines at block tags."""
+
+    _SKIP = {"script", "style", "noscript", "template", "head"}
+    _BLOCK = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "pre", "table"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skip_depth += 1
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+_SPACES_RE = re.compile(r"[ \t\r\f\v]+")
+
+
+def _clean(text: str) -> str:
+    text = _SPACES_RE.sub(" ", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def _decode(data: bytes) -> str:
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        from charset_normalizer import from_bytes
+        match = from_bytes(data).best()
+        return str(match) if match is not None else data.decode("utf-8", errors="replace")
+
+
+def _pdf_text(data: bytes, max_chars: int) -> str:
+    reader = PdfReader(io.BytesIO(data))
+    if reader.is_encrypted and not reader.decrypt(""):
+        raise ValueError("encrypted PDF")
+    pages, total = [], 0
+    for page in reader.pages:
+        # Stop parsing once the budget is filled; later pages would be trimmed anyway
+        if total > max_chars:
+            break
+        text = page.extract_text() or ""
+        pages.append(text)
+        total += len(text)
+    return "\n\n".join(pages)
+
+
+def _raw_text(data: bytes, media_type: str, max_chars: int) -> str:
+    if media_type == "application/pdf":
+        return _pdf_text(data, max_chars)
+    text = _decode(data)
+    if media_type == "text/html":
+        parser = _HTMLTextParser()
+        parser.feed(text)
+        return "".join(parser.parts)
+    if media_type == "application/json":
+        try:
+            # Compact separators: indentation costs tokens without adding meaning
+            return json.dumps(json.loads(text), ensure_ascii=False, separators=(",", ":"))
+        except ValueError:
+            return text
+    return text
+
+
+def fit_to_token_budget(text: str, token_budget: int) -> str:
+    """
+    Trim text to the token budget, cutting at the last line break that fits.
+
+    Returns:
+        str: The text, with a truncation note when it was cut
+    """
+    if estimate_tokens(text) <= token_budget:
+        return text
+    max_chars = max(1, token_budget * _CHARS_PER_TOKEN)
+    cut = text.rfind("\n", 0, max_chars)
+    kept = text[:cut if cut > max_chars // 2 else max_chars].rstrip()
+    return f"{kept}\n[Truncated to about {token_budget} tokens]"
+
+
+def extract_attachment_text(
+    data: bytes,
+    media_type: str,
+    name: Optional[str] = None,
+    token_budget: int = ATTACHMENT_TEXT_TOKEN_BUDGET,
+) -> Optional[str]:
+    """
+    Turn a text-like attachment into a prompt-ready text part.
+
+    CPU bound; call it from a worker thread. Results are cached by content hash,
+    so re-sent files are not parsed again.
+
+    Args:
+        data: The attachment bytes
+        media_type: The attachment media type (see TEXT_MEDIA_TYPES)
+        name: Optional file name shown to the model
+        token_budget: Maximum estimated tokens of extracted text
+
+    Returns:
+        Optional[str]: Header plus extracted text, or None when the type is not
+        supported or extraction fails (the caller sends the binary instead)
+    """
+    if not can_extract(media_type):
+        return None
+
+    key = (hashlib.sha256(data).hexdigest(), media_type, token_budget)
+    with _cache_lock:
+        text = _cache.get(key)
+    if text is not None:
+        metrics.increment("text_extract.cache_hits")
+    else:
+        try:
+            text = fit_to_token_budget(_clean(_raw_text(data, media_type, token_budget * _CHARS_PER_TOKEN)), token_budget)
+        except Exception as e:
+            logger.warning(f"Sending {media_type} attachment as binary, text extraction failed: {str(e)}")
+            metrics.increment("text_extract.failures")
+            return None
+        with _cache_lock:
+            _cache[key] = text
+        metrics.increment("text_extract.documents")
+
+    if not text:
+        return None
+    return f"[Attached file: {name or 'attachment'} ({media_type})]\n{text}"
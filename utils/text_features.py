@@ -0,0 +1,47 @@
+import re
+import zlib
+from typing import List
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+# Hashed feature space shared by the local classifiers and retrieval index
+DEFAULT_N_FEATURES = 2 ** 16
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token estimate (~4 characters per token) used for prompt budgeting."""
+    return len(text) // 4 + 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens plus adjacent-word bigrams."""
+    words = _TOKEN_RE.findall((text or "").lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def hash_features(text: str, n_features: int = DEFAULT_N_FEATURES) -> np.ndarray:
+    """
+    Map text to hashed feature indices (the hashing trick).
+
+    crc32 is used instead of hash() so indices are stable across processes.
+
+    Args:
+        text: Input text
+        n_features: Size of the hashed feature space
+
+    Returns:
+        np.ndarray: int64 feature indices, one per token (repeats allowed)
+    """
+    return np.fromiter(
+        (zlib.crc32(token.encode()) % n_features for token in tokenize(text)),
+        dtype=np.int64,
+    )
+
+
+def hashed_vector(text: str, n_features: int = DEFAULT_N_FEATURES) -> np.ndarray:
+    """Dense L2-normalized float32 bag-of-words vector in the hashed feature space."""
+    vector = np.bincount(hash_features(text, n_features), minlength=n_features).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
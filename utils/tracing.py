@@ -0,0 +1,195 @@
+import asyncio
+import functools
+import logging
+import os
+from typing import Any, Callable
+
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind
+
+from config.settings import TRACING_EXPORTER, TRACING_FILE_PATH, TRACING_SERVICE_NAME
+
+logger = logging.getLogger(__name__)
+
+# Proxy tracer: spans go to whichever provider setup_tracing() installs (no-op until then)
+tracer = trace.get_tracer("generalchatbot")
+
+_configured = False
+
+
+def tracing_enabled() -> bool:
+    """Whether an exporter is configured via TRACING_EXPORTER."""
+    return TRACING_EXPORTER != "none"
+
+
+def _build_exporter():
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if TRACING_EXPORTER == "console":
+        return ConsoleSpanExporter()
+    if TRACING_EXPORTER == "file":
+        os.makedirs(os.path.dirname(TRACING_FILE_PATH) or ".", exist_ok=True)
+        # One JSON span per line, so traces can be inspected offline
+        return ConsoleSpanExporter(
+            out=open(TRACING_FILE_PATH, "a"),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+    if TRACING_EXPORTER == "otlp":
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    raise ValueError(f"Unknown TRACING_EXPORTER '{TRACING_EXPORTER}' (expected none, console, file or otlp)")
+
+
+def setup_tracing() -> bool:
+    """
+    Install the OpenTelemetry SDK tracer provider and exporter selected by TRACING_EXPORTER.
+
+    Also turns on pydantic-ai instrumentation so every LLM request gets a span
+    with token usage attributes (message content is not recorded).
+
+    Returns:
+        bool: True if tracing was configured by this call, False otherwise
+    """
+    global _configured
+    if _configured or not tracing_enabled():
+        return False
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        exporter = _build_exporter()
+    except ImportError as e:
+        logger.warning(f"Tracing disabled, missing OpenTelemetry package: {str(e)}")
+        return False
+    except Exception as e:
+        logger.error(f"Tracing disabled, failed to create exporter: {str(e)}")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+    from pydantic_ai import Agent
+    from pydantic_ai.models.instrumented import InstrumentationSettings
+    Agent.instrument_all(InstrumentationSettings(tracer_provider=provider, include_content=False))
+
+    _configured = True
+    logger.info(f"Tracing enabled with '{TRACING_EXPORTER}' exporter")
+    return True
+
+
+# SystemState keys copied onto node spans so the spans of one turn can be correlated
+_STATE_ATTRIBUTES = ("workflow_id", "user_id", "system", "agent_name")
+
+
+def _span_attributes(attributes: dict, args: tuple) -> dict:
+    if args and isinstance(args[0], dict):
+        state = args[0]
+        return {
+            **attributes,
+            **{f"state.{key}": state[key] for key in _STATE_ATTRIBUTES if isinstance(state.get(key), str)},
+        }
+    return attributes
+
+
+def traced(name: str = None, **attributes: Any) -> Callable:
+    """
+    Decorator that wraps a sync or async function in a span.
+
+    When the first argument is a state dict (graph nodes and routers), its
+    workflow_id, user_id, system and agent_name are added as attributes.
+
+    Args:
+        name: Span name (defaults to the function's qualified name)
+        **attributes: Static span attributes
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(span_name, attributes=_span_attributes(attributes, args)):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(span_name, attributes=_span_attributes(attributes, args)):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def record_usage(usage: Any) -> None:
+    """Attach LLM token usage from a pydantic-ai run to the current span."""
+    span = trace.get_current_span()
+    span.set_attribute("llm.requests", usage.requests)
+    span.set_attribute("llm.input_tokens", usage.input_tokens)
+    span.set_attribute("llm.output_tokens", usage.output_tokens)
+
+
+def instrument_redis(client: Any) -> Any:
+    """
+    Wrap a redis.asyncio client so every command and pipeline gets a client span.
+
+    Args:
+        client: redis.asyncio.Redis instance
+
+    Returns:
+        The same client, instrumented in place
+    """
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    async def traced_execute_command(*args, **options):
+        command = str(args[0]).upper() if args else "UNKNOWN"
+        with tracer.start_as_current_span(
+            f"redis.{command}",
+            kind=SpanKind.CLIENT,
+            attributes={"db.system": "redis", "db.operation": command},
+        ):
+            return await execute_command(*args, **options)
+
+    def traced_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def traced_execute(*execute_args, **execute_kwargs):
+            with tracer.start_as_current_span(
+                "redis.PIPELINE",
+                kind=SpanKind.CLIENT,
+                attributes={"db.system": "redis", "db.redis.pipeline_length": len(pipe.command_stack)},
+            ):
+                return await execute(*execute_args, **execute_kwargs)
+
+        pipe.execute = traced_execute
+        return pipe
+
+    client.execute_command = traced_execute_command
+    client.pipeline = traced_pipeline
+    return client
+
+
+def instrument_checkpointer(checkpointer: Any) -> Any:
+    """
+    Wrap a LangGraph checkpointer's write methods (put/put_writes and async variants) in spans.
+
+    Args:
+        checkpointer: A BaseCheckpointSaver instance
+
+    Returns:
+        The same checkpointer, instrumented in place
+    """
+    for method_name in ("put", "put_writes", "aput", "aput_writes"):
+        method = getattr(checkpointer, method_name, None)
+        if method is None:
+            continue
+        setattr(checkpointer, method_name, traced(
+            f"checkpoint.{method_name}",
+            **{"checkpointer": type(checkpointer).__name__},
+        )(method))
+    return checkpointer
@@ -0,0 +1,30 @@
+"""
+Custom HTTP app for the LangGraph API server (see "http" in langgraph.json).
+
+It adds no routes; its lifespan is merged into the server's, so analyses the
+journal analyzer buffered in this process (storage.analysis_store) are written
+before a restart or redeploy instead of being lost.
+"""
+
+import logging
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    yield
+    from storage.analysis_store import close_analysis_store
+    from storage.mongodb.config import close_mongo_clients
+
+    try:
+        await close_analysis_store()
+    except Exception as e:
+        logger.error(f"Error flushing analysis store: {str(e)}")
+    await close_mongo_clients()
+
+
+app = Starlette(lifespan=lifespan)